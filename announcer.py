@@ -0,0 +1,175 @@
+import hashlib
+import os
+import queue
+import tempfile
+import threading
+import wave
+from collections import OrderedDict
+
+from profiler import PROFILER
+
+
+class GTTSSynthesizer:
+    extension = '.mp3'
+
+    def synthesize(self, text, lang, path):
+        # Imported on first use: gtts pulls in requests, which is slow to load at startup
+        from gtts import gTTS
+        gTTS(text=text, lang=lang).save(path)
+
+
+class Pyttsx3Synthesizer:
+    """Offline speech through the local pyttsx3 engine."""
+
+    extension = '.wav'
+
+    def __init__(self):
+        self.engine = None
+
+    def synthesize(self, text, lang, path):
+        if self.engine is None:
+            # Created on the announcer thread, which is also the one that drives it
+            import pyttsx3
+            self.engine = pyttsx3.init()
+        self.engine.save_to_file(text, path)
+        self.engine.runAndWait()
+
+
+class SilentSynthesizer:
+    """Writes a short silent clip; a stand-in for tests and machines without audio."""
+
+    extension = '.wav'
+
+    def __init__(self, duration=0.1, rate=8000):
+        self.frames = b'\x00\x00' * int(duration * rate)
+        self.rate = rate
+
+    def synthesize(self, text, lang, path):
+        with wave.open(path, 'wb') as clip:
+            clip.setnchannels(1)
+            clip.setsampwidth(2)
+            clip.setframerate(self.rate)
+            clip.writeframes(self.frames)
+
+
+class AudioCache:
+    """On-disk LRU cache of synthesized clips, keyed by text and language."""
+
+    def __init__(self, directory, max_bytes=50 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+
+        os.makedirs(directory, exist_ok=True)
+        clips = []
+        for entry in os.scandir(directory):
+            if entry.is_file() and not entry.name.startswith('.'):
+                stat = entry.stat()
+                clips.append((stat.st_mtime, entry.path, stat.st_size))
+        for _, path, size in sorted(clips):
+            self.entries[path] = size
+            self.total_bytes += size
+
+    def path_for(self, text, lang, extension):
+        digest = hashlib.sha1(f"{lang}\0{text}".encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest + extension)
+
+    def get(self, text, lang, extension):
+        path = self.path_for(text, lang, extension)
+        with self.lock:
+            if path in self.entries and os.path.exists(path):
+                self.entries.move_to_end(path)
+                self.hits += 1
+                os.utime(path)
+                return path
+            self.entries.pop(path, None)
+            self.misses += 1
+            return None
+
+    def put(self, text, lang, extension, synthesize):
+        path = self.path_for(text, lang, extension)
+        # Synthesize into a private temp file so concurrent writers never share a filename
+        fd, tmp_path = tempfile.mkstemp(suffix=extension, dir=self.directory, prefix='.')
+        os.close(fd)
+        try:
+            synthesize(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        size = os.path.getsize(path)
+        with self.lock:
+            self.total_bytes += size - self.entries.pop(path, 0)
+            self.entries[path] = size
+            self.evict()
+        return path
+
+    def evict(self):
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            path, size = self.entries.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class Announcer:
+    """Background worker that synthesizes and plays announcements queued by the UI thread."""
+
+    def __init__(self, synthesizer=None, cache=None, player=None):
+        self.synthesizer = synthesizer or GTTSSynthesizer()
+        self.cache = cache or AudioCache('tts_cache')
+        self.player = player
+        self.queue = queue.Queue()
+        self.busy = False
+        self.thread = threading.Thread(target=self.run, name='announcer', daemon=True)
+        self.thread.start()
+
+    def announce(self, text, lang='si'):
+        self.queue.put((text, lang))
+
+    @property
+    def depth(self):
+        return self.queue.qsize() + (1 if self.busy else 0)
+
+    def run(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            self.busy = True
+            try:
+                self.play(*job)
+            except Exception as e:
+                print(f"Voice error: {e}")
+            finally:
+                self.busy = False
+                self.queue.task_done()
+
+    def play(self, text, lang):
+        extension = self.synthesizer.extension
+        path = self.cache.get(text, lang, extension)
+        if path is None:
+            with PROFILER.timed('synthesize'):
+                path = self.cache.put(text, lang, extension,
+                                      lambda target: self.synthesizer.synthesize(text, lang, target))
+        if self.player is None:
+            from playsound import playsound
+            self.player = playsound
+        with PROFILER.timed('playback'):
+            self.player(path)
+
+    def close(self):
+        self.queue.put(None)
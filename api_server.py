@@ -0,0 +1,318 @@
+"""Embedded HTTP/JSON API for queue displays and check-in kiosks.
+
+    python api_server.py [--db customers.db] [--host 127.0.0.1] [--port 8765]
+
+Endpoints:
+    POST /customers              {"name": "..."} -> the registered customer
+    GET  /customers/search       ?name=&id=&seq=&limit=
+    GET  /customers/today
+    GET  /stats                  {"total": n, "today": n}
+    GET  /events                 server-sent events, one per new registration
+
+Reads run on a small pool of threads with one connection each; registrations
+go through a group-commit writer thread, the same way the desktop app
+registers, so a burst of kiosk check-ins shares one commit.
+
+POST bodies must be sent as application/json, which a web page can only do
+cross-origin after a CORS preflight. No origin is allowed unless one is given
+with --allow-origin, so other pages open in a browser on the same machine
+cannot register customers.
+"""
+import argparse
+import asyncio
+import json
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from repository import CUSTOMER_FIELDS, DB_PATH, ChangeFeed, CustomerRepository, connect
+from write_queue import GroupCommitWriter
+
+MAX_BODY = 64 * 1024
+# Longest wait, in seconds, between attempts to reopen the event feed after a database error
+FEED_RETRY_MAX = 30
+REASONS = {200: 'OK', 201: 'Created', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found',
+           405: 'Method Not Allowed', 413: 'Payload Too Large', 415: 'Unsupported Media Type',
+           500: 'Internal Server Error'}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def customer_json(row):
+    return dict(zip(CUSTOMER_FIELDS, row))
+
+
+class ApiServer:
+    def __init__(self, db_path=DB_PATH, host='127.0.0.1', port=8765, readers=4, announcer=None,
+                 feed_interval=0.5, commit_window=0.0, allow_origin=None):
+        self.db_path = db_path
+        self.host = host
+        self.port = port
+        self.announcer = announcer
+        self.feed_interval = feed_interval
+        self.allow_origin = allow_origin
+        self.local = threading.local()
+        self.readers = ThreadPoolExecutor(readers, thread_name_prefix='api-read')
+        self.writer = GroupCommitWriter(lambda: connect(db_path), window=commit_window)
+        self.subscribers = set()
+        self.server = None
+        self.loop = None
+
+    def repo(self):
+        # One connection per pool thread, created on first use in that thread
+        if not hasattr(self.local, 'repo'):
+            self.local.repo = CustomerRepository(connect(self.db_path))
+        return self.local.repo
+
+    async def read(self, function, *args):
+        return await self.loop.run_in_executor(self.readers, lambda: function(self.repo(), *args))
+
+    async def register(self, name):
+        # Resolves once the batch holding this registration is committed
+        return await asyncio.wrap_future(self.writer.submit(name))
+
+    # Handlers
+
+    async def add_customer(self, query, body):
+        try:
+            name = str(json.loads(body or b'{}').get('name') or '').strip()
+        except (ValueError, AttributeError):
+            raise HttpError(400, "Body must be a JSON object")
+        if not name:
+            raise HttpError(400, "name is required")
+        customer_id, daily_sequence, created_at = await self.register(name)
+        if self.announcer is not None:
+            self.announcer.announce(f"{name} පැමිණෙන්න.", lang='si')
+        return 201, customer_json((daily_sequence, customer_id, name, created_at))
+
+    async def search(self, query, body):
+        criteria = {'name': query.get('name', ''), 'customer_id': query.get('id', '')}
+        try:
+            criteria['daily_sequence'] = int(query['seq']) if query.get('seq') else None
+            limit = min(int(query.get('limit', 100)), 1000)
+        except ValueError:
+            raise HttpError(400, "seq and limit must be numbers")
+        if not criteria['name'] and not criteria['customer_id'] and criteria['daily_sequence'] is None:
+            raise HttpError(400, "Give at least one of name, id or seq")
+        rows = await self.read(lambda repo: repo.search(limit=max(1, limit), **criteria))
+        return 200, {'customers': [customer_json(row) for row in rows]}
+
+    async def today(self, query, body):
+        rows = await self.read(lambda repo: repo.today_customers())
+        return 200, {'customers': [customer_json(row) for row in rows]}
+
+    async def stats(self, query, body):
+        total, today = await self.read(lambda repo: repo.counts())
+        return 200, {'total': total, 'today': today}
+
+    ROUTES = {
+        ('POST', '/customers'): add_customer,
+        ('GET', '/customers/search'): search,
+        ('GET', '/customers/today'): today,
+        ('GET', '/stats'): stats,
+    }
+
+    # HTTP plumbing
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                request_line, *header_lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = request_line.split(' ', 2)
+                except ValueError:
+                    await self.respond(writer, 400, {'error': "Malformed request line"}, keep_alive=False)
+                    return
+                headers = {}
+                for line in header_lines:
+                    if ':' in line:
+                        key, value = line.split(':', 1)
+                        headers[key.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    await self.respond(writer, 400, {'error': "Bad Content-Length"}, keep_alive=False)
+                    return
+                if length > MAX_BODY:
+                    await self.respond(writer, 413, {'error': "Body too large"}, keep_alive=False)
+                    return
+                try:
+                    body = await reader.readexactly(length) if length else b''
+                except asyncio.IncompleteReadError:
+                    return
+
+                url = urlsplit(target)
+                if method == 'GET' and url.path == '/events':
+                    await self.stream_events(writer)
+                    return
+
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version.upper() == 'HTTP/1.1')
+                if method == 'OPTIONS':
+                    await self.respond_preflight(writer, keep_alive)
+                else:
+                    status, payload = await self.dispatch(method, url, body, headers)
+                    await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, url, body, headers):
+        handler = self.ROUTES.get((method, url.path))
+        if handler is None:
+            allowed = any(path == url.path for _, path in self.ROUTES)
+            return (405, {'error': "Method not allowed"}) if allowed else (404, {'error': "Not found"})
+        # A form or text/plain POST needs no preflight, so any web page could send one
+        content_type = headers.get('content-type', '').split(';')[0].strip().lower()
+        if method == 'POST' and content_type != 'application/json':
+            return 415, {'error': "Content-Type must be application/json"}
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            return await handler(self, query, body)
+        except HttpError as e:
+            return e.status, {'error': str(e)}
+        except sqlite3.Error as e:
+            return 500, {'error': f"Database error: {e}"}
+
+    def cors_headers(self):
+        return f"Access-Control-Allow-Origin: {self.allow_origin}\r\n" if self.allow_origin else ""
+
+    async def respond(self, writer, status, payload, keep_alive=True):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        writer.write((f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                      f"Content-Type: application/json; charset=utf-8\r\n"
+                      f"Content-Length: {len(body)}\r\n"
+                      f"{self.cors_headers()}"
+                      f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode('latin-1') + body)
+        await writer.drain()
+
+    async def respond_preflight(self, writer, keep_alive=True):
+        # Without --allow-origin the browser sees no allowed origin and refuses the request
+        allow = ("Access-Control-Allow-Methods: GET, POST\r\n"
+                 "Access-Control-Allow-Headers: Content-Type\r\n") if self.allow_origin else ""
+        writer.write((f"HTTP/1.1 204 No Content\r\n{self.cors_headers()}{allow}Content-Length: 0\r\n"
+                      f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode('latin-1'))
+        await writer.drain()
+
+    # Server-sent events
+
+    async def stream_events(self, writer):
+        events = asyncio.Queue(maxsize=1000)
+        self.subscribers.add(events)
+        try:
+            writer.write((f"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                          f"{self.cors_headers()}Connection: keep-alive\r\n\r\n").encode('latin-1'))
+            await writer.drain()
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.get(), timeout=15)
+                    writer.write(f"event: customer\ndata: {json.dumps(event, ensure_ascii=False)}\n\n".encode('utf-8'))
+                except asyncio.TimeoutError:
+                    writer.write(b": keep-alive\n\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.subscribers.discard(events)
+
+    async def watch_registrations(self):
+        # One feed for every registration source: this API, desktop stations and imports.
+        # It needs its own connection, since data_version ignores the connection's own commits;
+        # the calls are awaited one at a time, so sharing it across pool threads is safe.
+        conn = feed = None
+        retry = self.feed_interval
+        while True:
+            await asyncio.sleep(self.feed_interval)
+            try:
+                if feed is None:
+                    conn = await self.loop.run_in_executor(
+                        self.readers, lambda: connect(self.db_path, check_same_thread=False))
+                    feed = await self.loop.run_in_executor(self.readers, ChangeFeed, conn)
+                if not self.subscribers:
+                    await self.loop.run_in_executor(self.readers, feed.reset)
+                    continue
+                changes = await self.loop.run_in_executor(self.readers, feed.poll)
+            except sqlite3.Error as e:
+                # A busy or half-migrated database must not end the feed: reconnect with a backoff
+                print(f"Event feed error, retrying in {retry:.1f}s: {e}")
+                if conn is not None:
+                    conn.close()
+                conn = feed = None
+                await asyncio.sleep(retry)
+                retry = min(retry * 2, FEED_RETRY_MAX)
+                continue
+            retry = self.feed_interval
+            if changes is None:
+                continue
+            for row in changes[0]:
+                event = customer_json(row)
+                for subscriber in list(self.subscribers):
+                    if not subscriber.full():
+                        subscriber.put_nowait(event)
+
+    # Lifecycle
+
+    async def serve(self, ready=None):
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port, backlog=512)
+        self.port = self.server.sockets[0].getsockname()[1]
+        watcher = asyncio.create_task(self.watch_registrations())
+        if ready is not None:
+            ready.set()
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            watcher.cancel()
+
+    def start_in_thread(self):
+        """Run the server on its own event loop thread next to the Tk main loop."""
+        ready = threading.Event()
+        thread = threading.Thread(target=lambda: asyncio.run(self.serve(ready)), name='api-server', daemon=True)
+        thread.start()
+        ready.wait(5)
+        return thread
+
+    def stop(self):
+        if self.loop is not None and self.server is not None:
+            self.loop.call_soon_threadsafe(self.server.close)
+        self.writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Customer queue HTTP/JSON API")
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--commit-window-ms', type=float, default=0,
+                        help="how long a registration may wait for others to share its commit")
+    parser.add_argument('--allow-origin', help="web origin allowed to call the API from a browser, "
+                                               "e.g. http://display.local (default: none)")
+    args = parser.parse_args()
+
+    CustomerRepository(connect(args.db)).create_database()
+    server = ApiServer(args.db, args.host, args.port, args.readers,
+                       commit_window=args.commit_window_ms / 1000, allow_origin=args.allow_origin)
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
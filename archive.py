@@ -0,0 +1,280 @@
+"""Moves customers older than a horizon out of customers.db into per-year (or per-month) archives.
+
+    python archive.py --days 90 [--granularity year|month] [--db customers.db]
+
+Everyday views only read the hot customers table, so its size stays bounded by
+the horizon. daily_stats and hourly_stats keep the archived days' counts, so
+totals and the dashboard still cover the full history. Searching with history
+fans out to the archive files.
+"""
+import argparse
+import glob
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+from migrations import migrate
+from repository import DB_PATH, IN_CHUNK, connect, existing_ids
+from search_engine import CustomerSearch
+
+ARCHIVE_COLUMNS = ('id', 'name', 'created_at', 'daily_sequence', 'date_added', 'customer_ref')
+
+
+def rows_by_id(conn, ids):
+    """{id: row} for the customers in `conn` with one of `ids`."""
+    found = {}
+    for start in range(0, len(ids), IN_CHUNK):
+        chunk = ids[start:start + IN_CHUNK]
+        found.update((row[0], row) for row in conn.execute(
+            f"SELECT {', '.join(ARCHIVE_COLUMNS)} FROM customers WHERE id IN ({', '.join('?' * len(chunk))})", chunk))
+    return found
+
+
+def archive_directory(db_path=DB_PATH):
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), 'archive')
+
+
+class Archiver:
+    def __init__(self, db_path=DB_PATH, horizon_days=90, granularity='year', directory=None):
+        if granularity not in ('year', 'month'):
+            raise ValueError("granularity must be 'year' or 'month'")
+        self.db_path = db_path
+        self.horizon_days = horizon_days
+        self.granularity = granularity
+        self.directory = directory or archive_directory(db_path)
+        self.prepared = set()
+        # {day: reason} for days the last pass could not move; later days are archived anyway
+        self.failed = {}
+
+    def archive_path(self, day):
+        period = day[:4] if self.granularity == 'year' else day[:7]
+        return os.path.join(self.directory, f"customers-{period}.db")
+
+    def cutoff(self, today=None):
+        return ((today or date.today()) - timedelta(days=self.horizon_days)).strftime("%Y-%m-%d")
+
+    def prepare(self, path):
+        if path not in self.prepared:
+            os.makedirs(self.directory, exist_ok=True)
+            archive = sqlite3.connect(path)
+            try:
+                migrate(archive)
+            finally:
+                archive.close()
+            self.prepared.add(path)
+
+    def next_day(self, conn, cutoff, after=''):
+        # MIN over the (date_added, daily_sequence) index is a single seek
+        return conn.execute('''
+            SELECT MIN(date_added) FROM customers WHERE date_added > ? AND date_added < ?
+        ''', (after, cutoff)).fetchone()[0]
+
+    def archive_day(self, conn, day):
+        """Move one day's customers into its archive; returns how many rows moved.
+
+        The rows are committed to the archive first and checked there before they
+        are deleted from customers.db in a second transaction: SQLite does not commit
+        a WAL database and an attached file atomically, so a crash in between must
+        leave the rows in both places rather than in neither. A customer whose ID
+        the archive already holds for a different customer stops the move.
+        """
+        path = self.archive_path(day)
+        self.prepare(path)
+        columns = ', '.join(ARCHIVE_COLUMNS)
+        rows = conn.execute(f"SELECT {columns} FROM customers WHERE date_added = ?", (day,)).fetchall()
+        counter = conn.execute("SELECT last_sequence FROM daily_counters WHERE date_added = ?", (day,)).fetchone()
+        if not rows:
+            return 0
+        ids = [row[0] for row in rows]
+
+        archive = sqlite3.connect(path)
+        try:
+            archive.execute("BEGIN IMMEDIATE")
+            try:
+                # Rows already there from an earlier run that stopped before the delete are kept as they are
+                archived = rows_by_id(archive, ids)
+                clashes = [row for row in rows if row[0] in archived and archived[row[0]] != row]
+                if clashes:
+                    raise sqlite3.IntegrityError(
+                        f"{len(clashes)} customer(s) from {day} have IDs that {path} already holds for "
+                        f"other customers (e.g. {clashes[0][0]}); nothing was archived for that day")
+                archive.executemany(f"INSERT INTO customers ({columns}) VALUES ({', '.join('?' * len(ARCHIVE_COLUMNS))})",
+                                    [row for row in rows if row[0] not in archived])
+                if counter is not None:
+                    archive.execute('''
+                        INSERT INTO daily_counters (date_added, last_sequence) VALUES (?, ?)
+                        ON CONFLICT (date_added) DO UPDATE SET last_sequence = MAX(last_sequence, excluded.last_sequence)
+                    ''', (day, counter[0]))
+                archive.commit()
+            except BaseException:
+                archive.rollback()
+                raise
+            archived = rows_by_id(archive, ids)
+        finally:
+            archive.close()
+        if any(archived.get(row[0]) != row for row in rows):
+            raise sqlite3.DatabaseError(f"{path} is missing customers from {day} after copying; nothing was deleted")
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Archived days keep their counts in the hot stats tables so totals still add up
+            stats = conn.execute("SELECT customers FROM daily_stats WHERE date_added = ?", (day,)).fetchone()
+            hours = conn.execute("SELECT hour, customers FROM hourly_stats WHERE date_added = ?", (day,)).fetchall()
+            # Only the rows copied above; any added to the day since are moved next time
+            moved = 0
+            for start in range(0, len(ids), IN_CHUNK):
+                chunk = ids[start:start + IN_CHUNK]
+                moved += conn.execute(f"DELETE FROM customers WHERE id IN ({', '.join('?' * len(chunk))})",
+                                      chunk).rowcount
+            if stats is not None:
+                conn.execute("UPDATE daily_stats SET customers = ? WHERE date_added = ?", (stats[0], day))
+            conn.executemany("UPDATE hourly_stats SET customers = ? WHERE date_added = ? AND hour = ?",
+                             [(customers, day, hour) for hour, customers in hours])
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return moved
+
+    def run_once(self, conn, should_stop=None, pause=0.0):
+        """Archive every day past the horizon, one day per transaction; returns (days, rows) moved.
+
+        A day whose rows cannot be moved (an ID clash, or rows missing after the copy) is
+        recorded in `failed` and skipped, so one bad day does not hold back every later one.
+        Each pass tries it again.
+        """
+        cutoff = self.cutoff()
+        days = rows = 0
+        failed = {}
+        day = ''
+        while not (should_stop and should_stop()):
+            day = self.next_day(conn, cutoff, after=day)
+            if day is None:
+                break
+            try:
+                rows += self.archive_day(conn, day)
+            except sqlite3.DatabaseError as e:
+                if isinstance(e, sqlite3.OperationalError):
+                    # Busy, disk full and the like are not the day's fault; stop the pass
+                    self.failed = failed
+                    raise
+                failed[day] = str(e)
+                continue
+            days += 1
+            if pause:
+                # Let registrations in between steps
+                time.sleep(pause)
+        self.failed = failed
+        return days, rows
+
+
+class IdleArchiver:
+    """Runs an Archiver on a background thread whenever the app has been idle for a while."""
+
+    def __init__(self, archiver, is_idle, check_every=60, pause=0.2):
+        self.archiver = archiver
+        self.is_idle = is_idle
+        self.check_every = check_every
+        self.pause = pause
+        self.days_moved = 0
+        self.rows_moved = 0
+        # Latest problem for the app to show, or None; only ever replaced from the archiver thread
+        self.problem = None
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='archiver', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        conn = connect(self.archiver.db_path)
+        try:
+            while not self.stop_event.wait(self.check_every):
+                if not self.is_idle():
+                    continue
+                try:
+                    days, rows = self.archiver.run_once(
+                        conn, should_stop=lambda: self.stop_event.is_set() or not self.is_idle(), pause=self.pause)
+                except sqlite3.Error as e:
+                    self.problem = f"Archiving stopped: {e}"
+                    continue
+                self.days_moved += days
+                self.rows_moved += rows
+                failed = self.archiver.failed
+                if failed:
+                    first = min(failed)
+                    self.problem = f"{len(failed)} day(s) could not be archived: {failed[first]}"
+                else:
+                    self.problem = None
+        finally:
+            conn.close()
+
+
+class ArchiveSet:
+    """Search and ID lookups across archive files, newest first."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.connections = {}
+
+    def paths(self):
+        return sorted(glob.glob(os.path.join(self.directory, 'customers-*.db')), reverse=True)
+
+    def connection(self, path):
+        conn = self.connections.get(path)
+        if conn is None:
+            # Files last written by an older version are brought up to the current schema first
+            conn = self.connections[path] = sqlite3.connect(path)
+            migrate(conn)
+        return conn
+
+    def close(self):
+        for conn in self.connections.values():
+            conn.close()
+        self.connections.clear()
+
+    def search(self, limit, **criteria):
+        rows = []
+        for path in self.paths():
+            if len(rows) >= limit:
+                break
+            rows.extend(CustomerSearch(self.connection(path)).search(limit=limit - len(rows), **criteria))
+        return rows
+
+    def existing_ids(self, ids):
+        """The subset of `ids` held by any archive file."""
+        ids = list(ids)
+        found = set()
+        for path in self.paths():
+            found |= existing_ids(self.connection(path), ids)
+        return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive customers older than a horizon")
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--days', type=int, default=90, help="keep this many days in customers.db")
+    parser.add_argument('--granularity', choices=['year', 'month'], default='year')
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    migrate(conn)
+    archiver = Archiver(args.db, args.days, args.granularity)
+    began = time.perf_counter()
+    days, rows = archiver.run_once(conn)
+    print(f"Archived {rows:,} customers from {days} day(s) before {archiver.cutoff()} "
+          f"into {archiver.directory} in {time.perf_counter() - began:.1f}s")
+    for day, reason in sorted(archiver.failed.items()):
+        print(f"Skipped {day}: {reason}", file=sys.stderr)
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
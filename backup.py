@@ -0,0 +1,205 @@
+"""Online backups of customers.db into rotated, optionally gzip-compressed snapshots.
+
+    python backup.py [--keep 7] [--compress] [--db customers.db]
+    python backup.py --verify backups/customers-20261018-093000.db.gz
+
+Snapshots are copied with SQLite's online backup API a few hundred pages per
+step, pausing between steps so registrations get the disk and the GIL. The
+copy holds one read transaction from start to finish: under WAL that pins a
+consistent snapshot and never blocks the writer, where otherwise every
+commit from another connection would restart the copy from the first page.
+A snapshot must pass PRAGMA integrity_check before it is renamed into place,
+and only the newest `keep` are kept.
+"""
+import argparse
+import glob
+import gzip
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from repository import DB_PATH, connect
+
+PAGES_PER_STEP = 256
+STEP_PAUSE = 0.005
+COMPRESS_CHUNK = 1024 * 1024
+# Level 1 compresses about four times faster than the default for a file only ~10% larger
+COMPRESS_LEVEL = 1
+
+
+class BackupCancelled(Exception):
+    pass
+
+
+class BackupResult:
+    def __init__(self, path, size, stored, seconds):
+        self.path = path
+        self.size = size
+        self.stored = stored
+        self.seconds = seconds
+        self.finished = datetime.now()
+
+    @property
+    def rate(self):
+        return self.size / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        compressed = f", {self.stored / 1e6:,.1f} MB compressed" if self.stored != self.size else ""
+        return (f"Backed up {self.size / 1e6:,.1f} MB in {self.seconds:.1f}s "
+                f"({self.rate / 1e6:,.1f} MB/s{compressed})")
+
+
+def backup_directory(db_path=DB_PATH):
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), 'backups')
+
+
+def online_backup(conn, path, pages=PAGES_PER_STEP, pause=STEP_PAUSE, on_progress=None, cancelled=None):
+    """Copy the database behind `conn` to a new file at `path`; returns the bytes copied."""
+    target = sqlite3.connect(path)
+    try:
+        conn.execute("BEGIN")
+        conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        try:
+            size = conn.execute("PRAGMA page_count").fetchone()[0] * conn.execute("PRAGMA page_size").fetchone()[0]
+
+            def step(status, remaining, total):
+                if cancelled and cancelled():
+                    raise BackupCancelled()
+                if on_progress:
+                    on_progress(1 - remaining / total if total else 1.0)
+                time.sleep(pause)
+
+            conn.backup(target, pages=pages, progress=step)
+        finally:
+            conn.rollback()
+        # The copy inherits WAL mode; a snapshot should be one self-contained file
+        target.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        target.close()
+    return size
+
+
+def check_integrity(path):
+    snapshot = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        problems = [row[0] for row in snapshot.execute("PRAGMA integrity_check")]
+    finally:
+        snapshot.close()
+    if problems != ['ok']:
+        raise sqlite3.DatabaseError(f"{path} failed integrity_check: {'; '.join(problems[:5])}")
+
+
+def compress(path, gz_path, cancelled=None):
+    with open(path, 'rb') as source, gzip.open(gz_path, 'wb', compresslevel=COMPRESS_LEVEL) as target:
+        while True:
+            if cancelled and cancelled():
+                raise BackupCancelled()
+            chunk = source.read(COMPRESS_CHUNK)
+            if not chunk:
+                break
+            target.write(chunk)
+
+
+def verify(path):
+    """Raise sqlite3.DatabaseError unless the snapshot (plain or .gz) passes integrity_check."""
+    if not path.endswith('.gz'):
+        check_integrity(path)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = os.path.join(tmp, 'snapshot.db')
+        with gzip.open(path, 'rb') as source, open(plain, 'wb') as target:
+            shutil.copyfileobj(source, target, COMPRESS_CHUNK)
+        check_integrity(plain)
+
+
+class Backups:
+    """Timestamped snapshots of one database in a directory, newest `keep` kept."""
+
+    def __init__(self, db_path=DB_PATH, directory=None, keep=7, compressed=False,
+                 pages=PAGES_PER_STEP, pause=STEP_PAUSE):
+        if keep < 1:
+            raise ValueError("keep must be at least 1")
+        self.db_path = db_path
+        self.directory = directory or backup_directory(db_path)
+        self.keep = keep
+        self.compressed = compressed
+        self.pages = pages
+        self.pause = pause
+        self.last = None
+
+    def paths(self):
+        """Finished snapshots, newest first."""
+        return sorted((path for path in glob.glob(os.path.join(self.directory, 'customers-*.db*'))
+                       if not path.endswith('.partial')), reverse=True)
+
+    def snapshot_path(self, now=None):
+        name = f"customers-{(now or datetime.now()).strftime('%Y%m%d-%H%M%S')}.db"
+        return os.path.join(self.directory, name + ('.gz' if self.compressed else ''))
+
+    def run(self, on_progress=None, cancelled=None, now=None):
+        """Take, verify and rotate in one snapshot; returns a BackupResult, or None if cancelled."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.snapshot_path(now)
+        copy_path = path.removesuffix('.gz') + '.partial'
+        gz_path = path + '.partial'
+        started = time.perf_counter()
+        conn = connect(self.db_path)
+        try:
+            for stale in (copy_path, gz_path):
+                if os.path.exists(stale):
+                    os.remove(stale)
+            size = online_backup(conn, copy_path, self.pages, self.pause, on_progress, cancelled)
+            check_integrity(copy_path)
+            if self.compressed:
+                compress(copy_path, gz_path, cancelled)
+                os.replace(gz_path, path)
+                os.remove(copy_path)
+            else:
+                os.replace(copy_path, path)
+        except BackupCancelled:
+            return None
+        finally:
+            conn.close()
+            for partial in (copy_path, gz_path):
+                if os.path.exists(partial):
+                    os.remove(partial)
+        self.rotate()
+        self.last = BackupResult(path, size, os.path.getsize(path), time.perf_counter() - started)
+        return self.last
+
+    def rotate(self):
+        """Delete all but the newest `keep` snapshots; returns the deleted paths."""
+        removed = self.paths()[self.keep:]
+        for path in removed:
+            os.remove(path)
+        return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Back up customers.db while it is in use")
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--dir', help="snapshot directory (default: backups/ next to the database)")
+    parser.add_argument('--keep', type=int, default=7, help="how many snapshots to keep")
+    parser.add_argument('--compress', action='store_true', help="gzip the snapshots")
+    parser.add_argument('--verify', metavar='SNAPSHOT', help="only check an existing snapshot")
+    args = parser.parse_args()
+
+    if args.verify:
+        try:
+            verify(args.verify)
+        except (sqlite3.DatabaseError, OSError) as e:
+            sys.exit(f"{args.verify}: {e}")
+        print(f"{args.verify}: ok")
+        return
+
+    backups = Backups(args.db, args.dir, keep=args.keep, compressed=args.compress)
+    result = backups.run()
+    print(f"{result.summary()} -> {result.path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Insert throughput and file growth of time-ordered vs random customer IDs.
+
+    python benchmarks/bench_customer_ids.py --rows 2000000 [--batch 10000]
+
+Each scheme fills its own fresh database in committed batches, the way an
+import or a busy day of registrations would, and then times single
+registrations on the full table. The search index is left out since it costs
+the same for both schemes.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from customer_ids import ID_GENERATORS
+from migrations import migrate
+from registration import register_customer
+from repository import connect
+from synthetic import generate_customers
+
+SEGMENTS = 10
+
+
+def index_usage(conn, name):
+    try:
+        pages, used, unused = conn.execute(
+            "SELECT COUNT(*), SUM(pgsize), SUM(unused) FROM dbstat WHERE name = ?", (name,)).fetchone()
+    except Exception:
+        return None
+    return pages, used, 1 - (unused or 0) / used if used else 0.0
+
+
+def run(scheme, path, rows, batch, singles):
+    new_id = ID_GENERATORS[scheme]()
+    conn = connect(path)
+    migrate(conn)
+    conn.execute("DROP TRIGGER customers_fts_insert")
+
+    rates = []
+    records = generate_customers(rows, max(1, rows // 1000))
+    segment = max(batch, rows // SEGMENTS)
+    inserted = marked = 0
+    began = segment_began = time.perf_counter()
+    while inserted < rows:
+        chunk = [(new_id(), name, created_at, sequence, day)
+                 for _, (_, name, created_at, sequence, day) in zip(range(min(batch, rows - inserted)), records)]
+        conn.execute("BEGIN")
+        conn.executemany('''
+            INSERT INTO customers (id, name, created_at, daily_sequence, date_added) VALUES (?, ?, ?, ?, ?)
+        ''', chunk)
+        conn.commit()
+        inserted += len(chunk)
+        if inserted - marked >= segment or inserted == rows:
+            now = time.perf_counter()
+            rates.append((inserted - marked) / (now - segment_began))
+            marked, segment_began = inserted, now
+    bulk_seconds = time.perf_counter() - began
+
+    samples = []
+    for i in range(singles):
+        started = time.perf_counter()
+        register_customer(conn, new_id(), f"Customer {i}", new_id=new_id)
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+
+    file_bytes = os.path.getsize(path)
+    wal = path + '-wal'
+    index = index_usage(conn, 'sqlite_autoindex_customers_1')
+    conn.close()
+    return {
+        'rate': rows / bulk_seconds,
+        'first_segment_rate': rates[0],
+        'last_segment_rate': rates[-1],
+        'single_p50_ms': samples[len(samples) // 2] * 1000 if samples else 0.0,
+        'single_p99_ms': samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000 if samples else 0.0,
+        'file_mb': file_bytes / 1e6,
+        'wal_mb': os.path.getsize(wal) / 1e6 if os.path.exists(wal) else 0.0,
+        'index': index,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--batch', type=int, default=10_000)
+    parser.add_argument('--singles', type=int, default=2000, help="single registrations timed at the end")
+    parser.add_argument('--schemes', default='random,time')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for scheme in args.schemes.split(','):
+            result = run(scheme, os.path.join(tmp, f'{scheme}.db'), args.rows, args.batch, args.singles)
+            print(f"{scheme:>7}: {result['rate']:>9,.0f} rows/s overall "
+                  f"({result['first_segment_rate']:,.0f} first 10%, {result['last_segment_rate']:,.0f} last 10%)")
+            print(f"         single registration p50 {result['single_p50_ms']:.2f} ms, "
+                  f"p99 {result['single_p99_ms']:.2f} ms")
+            print(f"         file {result['file_mb']:.1f} MB (+{result['wal_mb']:.1f} MB WAL)", end='')
+            if result['index'] is not None:
+                pages, used, fill = result['index']
+                print(f", id index {used / 1e6:.1f} MB in {pages:,} pages, {fill:.0%} full")
+            else:
+                print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""Registrations per second through the group-commit writer at different batch windows.
+
+    python benchmarks/bench_group_commit.py [--stations 16] [--seconds 3] [--windows 0,1,2,5,10]
+
+Each station is a thread that registers a customer and waits for the
+confirmation before registering the next, like a kiosk or a burst of API
+requests. The baseline registers every customer in its own transaction
+through one shared writer, as the app did before; the other rows send the
+same load through GroupCommitWriter with the given window in milliseconds.
+Both are measured with synchronous=FULL, which is what the writer confirms
+against, and with NORMAL for comparison.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import migrate
+from registration import register_customer
+from repository import connect, generate_customer_id
+from write_queue import GroupCommitWriter
+
+
+class SerialWriter:
+    """One transaction per registration behind a lock, for comparison."""
+
+    def __init__(self, path, durable):
+        self.conn = connect(path, check_same_thread=False)
+        if durable:
+            self.conn.execute("PRAGMA synchronous = FULL")
+        self.lock = threading.Lock()
+
+    def register(self, name):
+        with self.lock:
+            return register_customer(self.conn, generate_customer_id(), name, new_id=generate_customer_id)
+
+    def close(self):
+        self.conn.close()
+
+
+class GroupWriter:
+    def __init__(self, path, durable, window):
+        self.writer = GroupCommitWriter(lambda: connect(path), window=window, durable=durable)
+
+    def register(self, name):
+        return self.writer.submit(name).result()
+
+    def close(self):
+        self.writer.close()
+
+
+def run(writer, stations, seconds):
+    latencies = [[] for _ in range(stations)]
+    deadline = time.perf_counter() + seconds
+
+    def station(number):
+        samples = latencies[number]
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            writer.register(f"Station {number} customer {len(samples)}")
+            samples.append(time.perf_counter() - started)
+
+    began = time.perf_counter()
+    threads = [threading.Thread(target=station, args=(n,)) for n in range(stations)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+    samples = sorted(s for station_samples in latencies for s in station_samples)
+    return {
+        'rate': len(samples) / elapsed,
+        'p50_ms': samples[len(samples) // 2] * 1000,
+        'p99_ms': samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000,
+    }
+
+
+def check(path):
+    conn = connect(path)
+    gaps = conn.execute('''
+        SELECT COUNT(*) FROM (SELECT date_added, COUNT(*) AS n, MAX(daily_sequence) AS top,
+                                     COUNT(DISTINCT daily_sequence) AS distinct_n
+                              FROM customers GROUP BY date_added)
+        WHERE n != top OR n != distinct_n
+    ''').fetchone()[0]
+    conn.close()
+    return gaps == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stations', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=3)
+    parser.add_argument('--windows', default='0,1,2,5,10', help="batch windows in milliseconds")
+    parser.add_argument('--synchronous', default='FULL,NORMAL')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for synchronous in args.synchronous.split(','):
+            durable = synchronous.upper() == 'FULL'
+            print(f"synchronous={synchronous.upper()}, {args.stations} stations")
+            configs = [('per-row commit', None)] + [(f"{w} ms window", float(w)) for w in args.windows.split(',')]
+            for label, window in configs:
+                path = os.path.join(tmp, f"{synchronous}-{label.split()[0]}.db")
+                conn = connect(path)
+                migrate(conn)
+                conn.close()
+                if window is None:
+                    writer = SerialWriter(path, durable)
+                else:
+                    writer = GroupWriter(path, durable, window / 1000)
+                result = run(writer, args.stations, args.seconds)
+                batches = ''
+                if window is not None:
+                    stats = writer.writer.stats()
+                    batches = f", {stats['average_batch']:.1f} per commit"
+                writer.close()
+                ok = '' if check(path) else '  DAILY NUMBERS BROKEN'
+                print(f"  {label:>15}: {result['rate']:>8,.0f} registrations/s, "
+                      f"p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms{batches}{ok}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Before/after timings of the hot customer queries around the schema migrations.
+
+    python benchmarks/bench_migrations.py --rows 1000000
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import configure_connection, create_customers_table, migrate
+from synthetic import generate_customers
+
+
+def build_legacy_database(path, rows, days):
+    conn = sqlite3.connect(path)
+    create_customers_table(conn.cursor())
+    conn.executemany('''
+        INSERT INTO customers (id, name, created_at, daily_sequence, date_added)
+        VALUES (?, ?, ?, ?, ?)
+    ''', generate_customers(rows, days))
+    conn.commit()
+    last_day = conn.execute("SELECT MAX(date_added) FROM customers").fetchone()[0]
+    return conn, last_day
+
+
+def time_query(conn, sql, params, repeat):
+    samples = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        samples.append(time.perf_counter() - began)
+    return sorted(samples)[len(samples) // 2] * 1000
+
+
+def run_queries(conn, day, repeat):
+    newest = conn.execute("SELECT created_at, id FROM customers ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET 500").fetchone()
+    queries = {
+        'next daily sequence': ("SELECT COALESCE(MAX(daily_sequence), 0) FROM customers WHERE date_added = ?", (day,)),
+        'today count': ("SELECT COUNT(*) FROM customers WHERE date_added = ?", (day,)),
+        'today listing': ("SELECT daily_sequence, id, name, created_at FROM customers WHERE date_added = ? "
+                          "ORDER BY daily_sequence ASC", (day,)),
+        'directory first page': ("SELECT daily_sequence, id, name, created_at FROM customers "
+                                 "ORDER BY created_at DESC, id DESC LIMIT 100", ()),
+        'directory keyset page': ("SELECT daily_sequence, id, name, created_at FROM customers "
+                                  "WHERE (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT 100", newest),
+    }
+    return {name: time_query(conn, sql, params, repeat) for name, (sql, params) in queries.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--days', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=9)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'customers.db')
+        began = time.perf_counter()
+        conn, day = build_legacy_database(path, args.rows, args.days)
+        print(f"Built {args.rows:,} rows over {args.days} days in {time.perf_counter() - began:.1f}s")
+
+        before = run_queries(conn, day, args.repeat)
+
+        began = time.perf_counter()
+        configure_connection(conn)
+        version = migrate(conn)
+        print(f"Migrated to schema version {version} in {time.perf_counter() - began:.1f}s")
+
+        after = run_queries(conn, day, args.repeat)
+        conn.close()
+
+    print(f"\n{'query':<24}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name in before:
+        speedup = before[name] / after[name] if after[name] else float('inf')
+        print(f"{name:<24}{before[name]:>12.2f}{after[name]:>12.3f}{speedup:>9.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Build time, memory and lookup latency of the duplicate-name index.
+
+    python benchmarks/bench_name_index.py --names 1000000 [--queries 2000]
+
+Names are a first name, sometimes a second one, and a surname, each drawn
+with Zipf-like frequencies from vocabularies assembled from syllables
+(3,000 given names and 8,000 surnames by default). Common words are very
+common, as in real registers, and most full names are distinct, which is
+the hard case for a name index. Queries are what a typist produces on the
+way to an existing name (prefixes) and near misses of it (one character
+dropped, doubled or swapped).
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from name_index import NameIndex
+
+SYLLABLES = ["ka", "ma", "la", "ni", "sa", "ru", "wan", "dhi", "tha", "ri", "ndu", "pri", "ya", "cha",
+             "min", "da", "ku", "su", "nil", "an", "ra", "ga", "me", "ja", "so", "na", "sin", "ghe",
+             "we", "tne", "ban", "di", "se", "pe", "re", "fer", "nan", "do", "ha", "gu", "wi", "lo"]
+
+
+def vocabulary(rng, size, shortest, longest):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(shortest, longest))).capitalize())
+    words = sorted(words)
+    rng.shuffle(words)
+    # Zipf-like: the n-th most common word is drawn about 1/n as often as the first
+    return words, list(itertools.accumulate(1 / rank for rank in range(1, size + 1)))
+
+
+def name_generator(rng, given=3000, surnames=8000):
+    first, first_weights = vocabulary(rng, given, 2, 3)
+    last, last_weights = vocabulary(rng, surnames, 2, 4)
+
+    def name():
+        words = rng.choices(first, cum_weights=first_weights, k=2)
+        surname = rng.choices(last, cum_weights=last_weights)[0]
+        if rng.random() < 0.3:
+            return f"{words[0]} {words[1]} {surname}"
+        return f"{words[0]} {surname}"
+    return name
+
+
+def typo(rng, name):
+    i = rng.randrange(1, len(name) - 1)
+    kind = rng.randrange(3)
+    if kind == 0:
+        return name[:i] + name[i + 1:]
+    if kind == 1:
+        return name[:i] + name[i] + name[i:]
+    return name[:i - 1] + name[i] + name[i - 1] + name[i + 1:]
+
+
+def timed(index, queries):
+    samples = []
+    found = 0
+    for query in queries:
+        started = time.perf_counter()
+        matches = index.matches(query)
+        samples.append(time.perf_counter() - started)
+        found += bool(matches)
+    samples.sort()
+    return (samples[len(samples) // 2] * 1000, samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000,
+            samples[-1] * 1000, found / len(queries))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--names', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    name = name_generator(rng)
+    rows = [(i % 300 + 1, f"C{i:08X}", name(), f"2024-{i % 12 + 1:02d}-01") for i in range(args.names)]
+    started = time.perf_counter()
+    index = NameIndex(rows)
+    built = time.perf_counter() - started
+    print(f"{len(index):,} customers, {len(index.names):,} distinct names, {len(index.words):,} words: "
+          f"built in {built:.1f} s ({len(index) / built:,.0f}/s), ~{index.memory() / len(index):.0f} B/customer")
+
+    targets = [rng.choice(rows)[2] for _ in range(args.queries)]
+    for label, queries in (("exact", targets),
+                           ("typo", [typo(rng, name) for name in targets]),
+                           ("prefix", [name[:rng.randint(3, len(name))] for name in targets])):
+        p50, p99, worst, found = timed(index, queries)
+        print(f"  {label:>6}: p50 {p50:.2f} ms, p99 {p99:.2f} ms, max {worst:.2f} ms, {found:.0%} with a match")
+
+    started = time.perf_counter()
+    for i in range(10_000):
+        index.add(1, f"N{i:08X}", name(), "2024-12-31")
+    print(f"  add: {(time.perf_counter() - started) / 10_000 * 1e6:.1f} µs per customer")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""Headless benchmarks of the CustomerRepository data path.
+
+    python benchmarks/bench_repository.py --sizes 10000,100000,1000000 --days 1000
+    python benchmarks/bench_repository.py --compare benchmarks/results/<earlier>.json
+
+Measures bulk build time, startup, insert throughput, search latency
+percentiles and listing cost per database size, and writes the results as
+JSON so runs can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from repository import CustomerRepository, connect
+from synthetic import FIRST_NAMES, LAST_NAMES, populate
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+VISIBLE_PAGE = 85
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+
+    def pick(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {'p50_ms': pick(0.50), 'p90_ms': pick(0.90), 'p99_ms': pick(0.99), 'max_ms': ordered[-1] * 1000}
+
+
+def timed(function, *args, **kwargs):
+    began = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - began
+
+
+def search_terms(repo, rng, count):
+    ids = [row[0] for row in repo.conn.execute("SELECT id FROM customers ORDER BY random() LIMIT 20")]
+    names = FIRST_NAMES + LAST_NAMES
+    terms = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.4:
+            terms.append({'name': rng.choice(names)})
+        elif kind < 0.7:
+            name = rng.choice(names)
+            start = rng.randrange(max(1, len(name) - 3))
+            terms.append({'name': name[start:start + 3]})
+        elif kind < 0.85:
+            terms.append({'name': f"{rng.choice(FIRST_NAMES)[:3]} {rng.choice(LAST_NAMES)[:3]}"})
+        elif ids:
+            terms.append({'customer_id': rng.choice(ids)[:4]})
+        else:
+            terms.append({'name': rng.choice(names)[:2]})
+    return terms
+
+
+def bench_size(directory, size, days, inserts, searches, seed):
+    rng = random.Random(seed)
+    path = os.path.join(directory, f'customers-{size}.db')
+    repo = CustomerRepository(connect(path))
+    repo.create_database()
+    build = timed(populate, repo.conn, size, days, seed=seed)
+    repo.close()
+
+    began = time.perf_counter()
+    repo = CustomerRepository.open(path)
+    repo.create_database()
+    repo.counts()
+    repo.directory_query().first(VISIBLE_PAGE)
+    startup = time.perf_counter() - began
+
+    last_day = repo.conn.execute("SELECT MAX(date_added) FROM daily_stats").fetchone()[0]
+    query = repo.directory_query()
+    middle = query.at(size // 2, 1)[0][1]
+    listing = {
+        'today_listing_ms': timed(repo.today_customers, last_day) * 1000,
+        'directory_first_page_ms': timed(query.first, VISIBLE_PAGE) * 1000,
+        'directory_keyset_page_ms': timed(query.after, middle, VISIBLE_PAGE) * 1000,
+        'directory_offset_jump_ms': timed(query.at, size // 2, VISIBLE_PAGE) * 1000,
+        'counts_ms': timed(repo.counts, last_day) * 1000,
+    }
+
+    search_samples = [timed(repo.search, **terms) for terms in search_terms(repo, rng, searches)]
+
+    began = time.perf_counter()
+    for _ in range(inserts):
+        repo.add_customer(f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}")
+    insert_seconds = time.perf_counter() - began
+
+    repo.close()
+    return {
+        'customers': size,
+        'days': days,
+        'build_seconds': build,
+        'file_bytes': os.path.getsize(path),
+        'startup_ms': startup * 1000,
+        'inserts_per_second': inserts / insert_seconds,
+        'search': percentiles(search_samples),
+        'listing': listing,
+    }
+
+
+def flatten(prefix, value, into):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            flatten(f"{prefix}.{key}" if prefix else key, item, into)
+    else:
+        into[prefix] = value
+    return into
+
+
+def compare(previous, current, threshold):
+    before = {run['customers']: flatten('', run, {}) for run in previous['runs']}
+    regressions = 0
+    for run in current['runs']:
+        old = before.get(run['customers'])
+        if not old:
+            continue
+        print(f"\n{run['customers']:,} customers vs {previous['timestamp']}")
+        for key, value in flatten('', run, {}).items():
+            if key not in old or not isinstance(value, (int, float)) or not old[key]:
+                continue
+            change = (value - old[key]) / old[key]
+            # Throughput regresses when it drops; everything else when it grows
+            worse = -change if key == 'inserts_per_second' else change
+            flag = '  REGRESSION' if worse > threshold and key.endswith(('_ms', '_second')) else ''
+            regressions += bool(flag)
+            print(f"  {key:<36}{old[key]:>14.3f}{value:>14.3f}{change:>+9.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000',
+                        help="comma separated customer counts, e.g. 10000,1000000,5000000")
+    parser.add_argument('--days', type=int, default=1000)
+    parser.add_argument('--inserts', type=int, default=500)
+    parser.add_argument('--searches', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="results file (default: benchmarks/results/repository-<time>.json)")
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="relative slowdown reported as a regression")
+    args = parser.parse_args()
+
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'runs': [],
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for size in (int(s) for s in args.sizes.split(',')):
+            run = bench_size(directory, size, args.days, args.inserts, args.searches, args.seed)
+            results['runs'].append(run)
+            print(f"{size:>10,} customers: build {run['build_seconds']:.1f}s, startup {run['startup_ms']:.1f} ms, "
+                  f"{run['inserts_per_second']:,.0f} inserts/s, search p50 {run['search']['p50_ms']:.2f} ms "
+                  f"p99 {run['search']['p99_ms']:.2f} ms, today {run['listing']['today_listing_ms']:.2f} ms")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"repository-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Load test for the customer HTTP API.
+
+    python benchmarks/load_test_api.py                      # starts a server on a temp database
+    python benchmarks/load_test_api.py --url http://127.0.0.1:8765 --duration 10
+
+Opens keep-alive connections that issue a mix of searches, today listings,
+stats reads and registrations, then reports requests per second and latency
+percentiles per endpoint.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from urllib.parse import quote, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_server import ApiServer
+from repository import CustomerRepository, connect
+from synthetic import FIRST_NAMES, LAST_NAMES, populate
+
+MIX = [('search', 0.45), ('stats', 0.25), ('today', 0.15), ('register', 0.15)]
+
+
+def build_request(kind, host, rng):
+    if kind == 'register':
+        body = json.dumps({'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"}).encode('utf-8')
+        head = (f"POST /customers HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n")
+        return head.encode('latin-1') + body
+    path = {'search': f"/customers/search?name={quote(rng.choice(FIRST_NAMES + LAST_NAMES)[:4])}&limit=20",
+            'stats': "/stats",
+            'today': "/customers/today"}[kind]
+    return f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode('latin-1')
+
+
+async def read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = 0
+    for line in head.split(b'\r\n'):
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':', 1)[1])
+    await reader.readexactly(length)
+    return status
+
+
+async def client(host, port, deadline, samples, errors, seed):
+    rng = random.Random(seed)
+    kinds, weights = zip(*MIX)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            kind = rng.choices(kinds, weights)[0]
+            began = time.perf_counter()
+            writer.write(build_request(kind, host, rng))
+            await writer.drain()
+            status = await read_response(reader)
+            samples[kind].append(time.perf_counter() - began)
+            if status >= 400:
+                errors[kind] += 1
+    finally:
+        writer.close()
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+
+async def run(host, port, connections, duration):
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    deadline = time.perf_counter() + duration
+    began = time.perf_counter()
+    await asyncio.gather(*(client(host, port, deadline, samples, errors, seed)
+                           for seed in range(connections)))
+    elapsed = time.perf_counter() - began
+
+    total = sum(len(s) for s in samples.values())
+    print(f"{total:,} requests over {connections} connections in {elapsed:.1f}s: {total / elapsed:,.0f} req/s")
+    print(f"{'endpoint':<10}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    for kind, _ in MIX:
+        ordered = sorted(samples[kind])
+        if ordered:
+            print(f"{kind:<10}{len(ordered):>8}{errors[kind]:>8}{percentile(ordered, 0.5):>10.2f}"
+                  f"{percentile(ordered, 0.9):>10.2f}{percentile(ordered, 0.99):>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="running server; default starts one on a temporary database")
+    parser.add_argument('--customers', type=int, default=100000, help="size of the temporary database")
+    parser.add_argument('--connections', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+        else:
+            path = os.path.join(directory, 'customers.db')
+            repo = CustomerRepository(connect(path))
+            repo.create_database()
+            populate(repo.conn, args.customers, 365)
+            repo.close()
+            server = ApiServer(path, port=0)
+            server.start_in_thread()
+            host, port = server.host, server.port
+        asyncio.run(run(host, port, args.connections, args.duration))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Concurrent registration stress test: N processes register customers against one database.
+
+    python benchmarks/stress_registration.py --processes 8 --per-process 500
+
+Checks that every day's daily numbers run 1..count with no gaps or duplicates
+and reports overall throughput.
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import configure_connection, migrate
+from registration import register_customer
+
+
+def worker(path, station, count, start_event):
+    conn = configure_connection(sqlite3.connect(path, timeout=30))
+    start_event.wait()
+    for i in range(count):
+        register_customer(conn, uuid.uuid4().hex[:12].upper(), f"Station {station} customer {i}")
+    conn.close()
+
+
+def verify(conn):
+    problems = []
+    days = conn.execute('''
+        SELECT date_added, COUNT(*), COUNT(DISTINCT daily_sequence), MIN(daily_sequence), MAX(daily_sequence)
+        FROM customers GROUP BY date_added
+    ''').fetchall()
+    for day, count, distinct, low, high in days:
+        if distinct != count:
+            problems.append(f"{day}: {count - distinct} duplicate daily numbers")
+        if low != 1 or high != count:
+            problems.append(f"{day}: numbers span {low}..{high} for {count} customers")
+        counter = conn.execute("SELECT last_sequence FROM daily_counters WHERE date_added = ?", (day,)).fetchone()
+        if counter is None or counter[0] != high:
+            problems.append(f"{day}: counter {counter} does not match highest number {high}")
+    return days, problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--per-process', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'customers.db')
+        conn = configure_connection(sqlite3.connect(path))
+        migrate(conn)
+
+        start_event = multiprocessing.Event()
+        processes = [multiprocessing.Process(target=worker, args=(path, n, args.per_process, start_event))
+                     for n in range(args.processes)]
+        for process in processes:
+            process.start()
+        began = time.perf_counter()
+        start_event.set()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - began
+
+        failed = [p.exitcode for p in processes if p.exitcode]
+        total = conn.execute("SELECT COUNT(*) FROM customers").fetchone()[0]
+        days, problems = verify(conn)
+        conn.close()
+
+    expected = args.processes * args.per_process
+    print(f"{total:,} of {expected:,} registrations from {args.processes} processes in {elapsed:.2f}s "
+          f"({total / elapsed:,.0f}/s) across {len(days)} day(s)")
+    if failed:
+        problems.append(f"{len(failed)} worker process(es) failed")
+    if total != expected:
+        problems.append(f"expected {expected} customers, found {total}")
+    for problem in problems:
+        print(f"FAIL {problem}")
+    if problems:
+        sys.exit(1)
+    print("OK no gaps or duplicates")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Synthetic customer data for benchmarks."""
+import random
+import string
+from datetime import datetime, timedelta
+
+from bulk_import import deferred_search_index
+
+FIRST_NAMES = ["Nimal", "Kamal", "Sunil", "Saman", "Ruwan", "Chaminda", "Dilani", "Kumari",
+               "Anura", "Priya", "Tharindu", "Sanduni", "නිමල්", "කමල්", "සුනිල්", "කුමාරි"]
+LAST_NAMES = ["Perera", "Silva", "Fernando", "Jayasuriya", "Bandara", "Wickramasinghe",
+              "Dissanayake", "Gunawardena", "පෙරේරා", "සිල්වා", "බණ්ඩාර"]
+ID_ALPHABET = string.ascii_uppercase + string.digits
+
+
+def random_name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def generate_customers(count, days, start=None, seed=42):
+    """Yield (id, name, created_at, daily_sequence, date_added) spread evenly over `days` days."""
+    rng = random.Random(seed)
+    start = start or datetime(2020, 1, 1, 8, 0, 0)
+    per_day = max(1, -(-count // days))
+    seconds_apart = max(1, 10 * 3600 // per_day)
+    for i in range(count):
+        day, sequence = divmod(i, per_day)
+        created = start + timedelta(days=day, seconds=sequence * seconds_apart)
+        yield (''.join(rng.choices(ID_ALPHABET, k=8)) + f"{i:x}", random_name(rng),
+               created.strftime("%Y-%m-%d %H:%M:%S"), sequence + 1, created.strftime("%Y-%m-%d"))
+
+
+def populate(conn, count, days, start=None, seed=42):
+    """Bulk-load synthetic customers into a migrated database and sync daily_counters."""
+    conn.execute("BEGIN")
+    with deferred_search_index(conn):
+        conn.executemany('''
+            INSERT INTO customers (id, name, created_at, daily_sequence, date_added)
+            VALUES (?, ?, ?, ?, ?)
+        ''', generate_customers(count, days, start, seed))
+    conn.execute('''
+        INSERT OR REPLACE INTO daily_counters (date_added, last_sequence)
+        SELECT date_added, MAX(daily_sequence) FROM customers GROUP BY date_added
+    ''')
+    conn.commit()
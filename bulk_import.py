@@ -0,0 +1,216 @@
+"""Streaming bulk import of customers from CSV or JSONL.
+
+    python bulk_import.py customers.csv [--db customers.db] [--batch-size 50000]
+
+CSV files need a header with at least a `name` column; `id` and `created_at`
+are optional. JSONL files hold one object per line with the same keys; lines
+that are not valid JSON are skipped like invalid CSV rows. Within each batch
+daily numbers follow created_at, continuing after the day's last number, so
+a file sorted by time is numbered in time order.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import islice
+
+from archive import ArchiveSet, archive_directory
+from migrations import FTS_INSERT_TRIGGER, migrate
+from repository import DB_PATH, IN_CHUNK, connect, existing_ids, generate_customer_id
+
+DEFAULT_BATCH_SIZE = 50000
+# Page cache (KiB, as a negative cache_size) while importing; index pages for random keys stay hot
+IMPORT_CACHE_KIB = 200000
+
+
+class ImportProgress:
+    def __init__(self, total_bytes):
+        self.total_bytes = total_bytes
+        self.bytes_read = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.skipped = 0
+        self.started = time.perf_counter()
+
+    @property
+    def fraction(self):
+        return min(1.0, self.bytes_read / self.total_bytes) if self.total_bytes else 1.0
+
+    @property
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.imported / elapsed if elapsed else 0.0
+
+    def summary(self):
+        return (f"Imported {self.imported:,} customers ({self.duplicates:,} duplicate IDs, "
+                f"{self.skipped:,} invalid rows skipped) at {self.rate:,.0f} rows/s")
+
+
+def normalize_created_at(value, now):
+    if not value:
+        return now
+    try:
+        return datetime.fromisoformat(str(value).strip()).strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+
+
+def parse_json_lines(lines):
+    """Yield the object on each non-blank line, or None where the line is not valid JSON."""
+    for line in lines:
+        try:
+            text = line.decode('utf-8-sig')
+            if text.strip():
+                yield json.loads(text)
+        except ValueError:
+            yield None
+
+
+def read_records(path, progress, fmt=None):
+    """Yield (id or None, name, created_at) tuples, or None for an unusable row."""
+    fmt = fmt or ('jsonl' if path.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv')
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    with open(path, 'rb') as raw:
+        # Decode line by line from the binary file so tell() keeps working for progress
+        if fmt == 'jsonl':
+            objects = parse_json_lines(raw)
+        else:
+            objects = csv.DictReader(line.decode('utf-8-sig') for line in raw)
+
+        for obj in objects:
+            progress.bytes_read = raw.tell()
+            if not isinstance(obj, dict):
+                yield None
+                continue
+            name = str(obj.get('name') or '').strip()
+            created_at = normalize_created_at(obj.get('created_at'), now)
+            if not name or created_at is None:
+                yield None
+                continue
+            customer_id = str(obj.get('id') or '').strip() or None
+            yield customer_id, name, created_at
+
+
+@contextmanager
+def deferred_search_index(conn):
+    """Index rows added inside the block with one INSERT ... SELECT instead of a trigger per row.
+
+    Must run inside a transaction so other connections never see the trigger missing.
+    """
+    last_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM customers").fetchone()[0]
+    conn.execute("DROP TRIGGER IF EXISTS customers_fts_insert")
+    yield
+    conn.execute('''
+        INSERT INTO customers_fts (rowid, name, id, customer_ref)
+        SELECT rowid, name, id, customer_ref FROM customers WHERE rowid > ?
+    ''', (last_rowid,))
+    conn.execute(FTS_INSERT_TRIGGER)
+
+
+def insert_batch(conn, batch, progress, new_id=generate_customer_id, archives=None):
+    records = [record for record in batch if record is not None]
+    progress.skipped += len(batch) - len(records)
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Provided IDs that already exist are duplicates, archived ones included (the archiver would
+        # refuse their day); generated ones that collide are redrawn
+        ids = [customer_id or new_id() for customer_id, _, _ in records]
+        taken = existing_ids(conn, ids)
+        if archives is not None:
+            taken |= archives.existing_ids(ids)
+        days = sorted({created_at[:10] for _, _, created_at in records})
+        counters = dict.fromkeys(days, 0)
+        for start in range(0, len(days), IN_CHUNK):
+            chunk = days[start:start + IN_CHUNK]
+            counters.update(conn.execute(
+                f"SELECT date_added, last_sequence FROM daily_counters WHERE date_added IN ({', '.join('?' * len(chunk))})",
+                chunk).fetchall())
+
+        rows = []
+        # Number each day's customers in the order they arrived, not the order of the file
+        for (provided_id, name, created_at), customer_id in sorted(zip(records, ids), key=lambda pair: pair[0][2]):
+            if customer_id in taken:
+                if provided_id:
+                    progress.duplicates += 1
+                    continue
+                customer_id = new_id()
+                while customer_id in taken or existing_ids(conn, [customer_id]):
+                    customer_id = new_id()
+            taken.add(customer_id)
+            day = created_at[:10]
+            counters[day] += 1
+            rows.append((customer_id, name, created_at, counters[day], day))
+
+        with deferred_search_index(conn):
+            conn.executemany('''
+                INSERT INTO customers (id, name, created_at, daily_sequence, date_added)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+        conn.executemany('''
+            INSERT INTO daily_counters (date_added, last_sequence) VALUES (?, ?)
+            ON CONFLICT (date_added) DO UPDATE SET last_sequence = excluded.last_sequence
+        ''', [(day, counters[day]) for day in days])
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    progress.imported += len(rows)
+
+
+def import_customers(conn, path, batch_size=DEFAULT_BATCH_SIZE, on_progress=None, cancelled=None, fmt=None,
+                     archives=None):
+    """Stream `path` into the database in batched transactions; returns the final ImportProgress.
+
+    Pass the ArchiveSet of the database's archive directory so IDs already moved to an
+    archive count as duplicates too; otherwise the archiver could never move their day.
+    """
+    progress = ImportProgress(os.path.getsize(path))
+    records = read_records(path, progress, fmt)
+    cache_size = conn.execute("PRAGMA cache_size").fetchone()[0]
+    conn.execute(f"PRAGMA cache_size = {-IMPORT_CACHE_KIB}")
+    try:
+        while not (cancelled and cancelled()):
+            batch = list(islice(records, batch_size))
+            if not batch:
+                break
+            insert_batch(conn, batch, progress, archives=archives)
+            if on_progress:
+                on_progress(progress)
+    finally:
+        conn.execute(f"PRAGMA cache_size = {cache_size}")
+    return progress
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import customers from CSV or JSONL")
+    parser.add_argument('path', help="CSV (with a header row) or JSONL file")
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--format', choices=['csv', 'jsonl'], help="default: guessed from the file extension")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    migrate(conn)
+
+    def report(progress):
+        print(f"\r{progress.fraction:6.1%}  {progress.imported:,} rows  {progress.rate:,.0f}/s", end='', file=sys.stderr)
+
+    archives = ArchiveSet(archive_directory(args.db))
+    try:
+        progress = import_customers(conn, args.path, args.batch_size, on_progress=report, fmt=args.format,
+                                    archives=archives)
+    finally:
+        archives.close()
+    print(file=sys.stderr)
+    print(progress.summary())
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,62 @@
+import time
+STARTED = time.perf_counter()
+
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
+import argparse
+import csv
+import os
 import sqlite3
-import random
-import string
 from datetime import datetime, date
-from gtts import gTTS
-from playsound import playsound
-import os
+from archive import Archiver, ArchiveSet, IdleArchiver, archive_directory
+from backup import Backups
+from announcer import Announcer, GTTSSynthesizer, Pyttsx3Synthesizer, SilentSynthesizer
+from bulk_import import import_customers
+from dashboard import VolumeDashboard
+from export import export_rows, select_all, select_date_range, select_search
+from jobs import BackgroundJob
+from name_index import MIN_QUERY_LENGTH, NameIndex
+from profiler import PROFILER, ProfiledConnection, StartupTimer, profiled
+from repository import DB_PATH, CUSTOMER_COLUMNS, CUSTOMER_ID, CustomerRepository, connect
+from row_cache import CacheSource, RowCache, sequence_label
+from search_engine import BackgroundSearch
+from stats import VolumeStats
+from ui_scheduler import UiScheduler
+from virtual_list import VirtualTreeview
+from write_queue import GroupCommitWriter
+
+SYNTHESIZERS = {
+    'gtts': GTTSSynthesizer,
+    'pyttsx3': Pyttsx3Synthesizer,
+    'silent': SilentSynthesizer,
+}
 
 class CustomerApp:
-    def __init__(self, root):
+    SEARCH_DEBOUNCE_MS = 250
+    SEARCH_POLL_MS = 30
+    SYNC_MAX_ROWS = 500
+    # Imports and the archiver commit in batches; views reload at most this often while they run
+    SYNC_RELOAD_SECONDS = 5
+    REGISTRATION_POLL_MS = 10
+    ARCHIVE_IDLE_SECONDS = 120
+    TIMED_OPERATIONS = ('add_customer', 'registration_confirmed', 'duplicate_check', 'load_customers',
+                        'search_customers', 'search_results', 'show_today_customers', 'update_customer_count',
+                        'sort_by', 'synthesize', 'playback')
+    # The directory is copied into memory for sorting by heading up to this many rows
+    ROW_CACHE_MAX_ROWS = 250_000
+    # Larger directories get a key every this many rows instead, so scrollbar jumps stay cheap
+    ANCHOR_STEP = 1000
+    # Uncached sorts of more rows than this run on a worker thread; the slowest key (name) sorts
+    # 5,000 rows in about 5 ms, well inside a 16 ms frame, where 20,000 took about 30 ms
+    SORT_INLINE_ROWS = 5_000
+    HEADINGS = {'Daily#': ('daily_sequence', 'Daily #'), 'ID': ('id', 'Customer ID'),
+                'Name': ('name', 'Customer Name'), 'Date Added': ('created_at', 'Date & Time Added')}
+
+    def __init__(self, root, announcer=None, startup=None, commit_window=0.0):
         self.root = root
+        self.announcer = announcer or Announcer()
+        self.startup = startup
+        self.ui = UiScheduler(root)
         self.root.title("Customer Management System")
         self.root.state('zoomed')
         self.root.minsize(1200, 800)
@@ -44,8 +90,57 @@ class CustomerApp:
         # Configure styles FIRST, before creating any widgets
         self.configure_modern_styles()
 
-        self.conn = sqlite3.connect('customers.db')
-        self.create_database()
+        # Opened once the background load has migrated customers.db; see start_initial_load
+        self.repo = None
+        self.background_search = BackgroundSearch(
+            self.open_connection, archives=lambda: ArchiveSet(archive_directory(DB_PATH)))
+        self.search_history = tk.BooleanVar(value=False)
+        self.archiver = None
+        self.archive_problem = None
+        # (host, port, allow_origin) once the API is asked for; it starts after the migration
+        self.api_settings = None
+        self.api_server = None
+        self.backups = Backups(DB_PATH)
+        self.backup_job = None
+        self.backup_every_ms = None
+        self.last_activity = time.monotonic()
+        self.show_timings = tk.BooleanVar(value=False)
+        self.search_started = None
+        self.row_cache = None
+        self.row_cache_generation = 0
+        self.row_cache_job = None
+        self.sort_job = None
+        self.natural_descending = True
+        self.sort_column = None
+        self.sort_descending = False
+        self.search_job = None
+        self.search_generation = None
+        self.last_search_criteria = None
+        self.explicit_search = False
+        self.view = 'all'
+        self.today_view_day = None
+        self.import_job = None
+        self.export_job = None
+        self.change_feed = None
+        self.writer = None
+        self.commit_window = commit_window
+        self.dashboard = None
+        self.name_index = None
+        self.name_index_job = None
+        self.duplicate_query = None
+        self.duplicate_positions = []
+        self.local_ids = set()
+        # The subset of local_ids the writer has not confirmed yet
+        self.pending_ids = set()
+        self.live_sync = tk.BooleanVar(value=True)
+        # Another station changed something the view or counts skipped while live sync was off
+        self.sync_missed = False
+        self.sync_reload_pending = False
+        self.sync_reload_index = False
+        self.last_sync_reload = 0.0
+        self.total_count = 0
+        self.today_count = 0
+        self.counts_day = None
 
         self.create_modern_header()
 
@@ -60,6 +155,14 @@ class CustomerApp:
         self.create_modern_search_section()
         self.create_modern_customer_list()
         self.create_modern_status_bar()
+        self.mark_startup("widgets built")
+        self.root.bind_all('<Key>', self.note_activity, add='+')
+        self.root.bind_all('<Button>', self.note_activity, add='+')
+        self.root.bind('<F12>', lambda e: self.toggle_timings())
+        self.root.bind('<Control-F12>', lambda e: self.dump_timings())
+
+    def open_connection(self):
+        return connect(DB_PATH, factory=ProfiledConnection)
 
     def configure_modern_styles(self):
         style = ttk.Style()
@@ -178,6 +281,12 @@ class CustomerApp:
                        background=self.colors['gray_800'],
                        foreground=self.colors['white'], 
                        font=('Segoe UI', 10))
+        style.configure('StatusBar.TCheckbutton',
+                       background=self.colors['gray_800'],
+                       foreground=self.colors['white'],
+                       font=('Segoe UI', 10))
+        style.map('StatusBar.TCheckbutton',
+                 background=[('active', self.colors['gray_700'])])
 
     def create_modern_header(self):
         # Header with gradient-like effect using multiple frames
@@ -203,53 +312,84 @@ class CustomerApp:
         self.customer_count_label.grid(row=0, column=0, sticky=tk.E, padx=(0, 20))
 
         self.today_count_label = ttk.Label(stats_frame, text="📅 Today: 0", style='HeaderStats.TLabel')
-        self.today_count_label.grid(row=0, column=1, sticky=tk.E)
+        self.today_count_label.grid(row=0, column=1, sticky=tk.E, padx=(0, 20))
 
-    def create_database(self):
-        cursor = self.conn.cursor()
-        
-        cursor.execute("PRAGMA table_info(customers)")
-        columns = [column[1] for column in cursor.fetchall()]
-        
-        if not columns:
-            cursor.execute('''
-                CREATE TABLE customers (
-                    id TEXT PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    created_at TEXT NOT NULL,
-                    daily_sequence INTEGER NOT NULL,
-                    date_added TEXT NOT NULL
-                )
-            ''')
-        else:
-            if 'daily_sequence' not in columns:
-                cursor.execute('ALTER TABLE customers ADD COLUMN daily_sequence INTEGER DEFAULT 0')
-            if 'date_added' not in columns:
-                cursor.execute('ALTER TABLE customers ADD COLUMN date_added TEXT DEFAULT ""')
-                cursor.execute('''
-                    UPDATE customers 
-                    SET date_added = substr(created_at, 1, 10) 
-                    WHERE date_added = ""
-                ''')
-        
-        self.conn.commit()
+        ttk.Button(stats_frame, text="📈 Dashboard", command=self.open_dashboard,
+                   style='ModernSecondary.TButton').grid(row=0, column=2, sticky=tk.E)
+
+        self.backup_button = ttk.Button(stats_frame, text="💾 Backup", command=self.backup_now,
+                                        style='ModernSecondary.TButton')
+        self.backup_button.grid(row=0, column=3, sticky=tk.E, padx=(10, 0))
+
+    def mark_startup(self, phase):
+        if self.startup is not None:
+            self.startup.mark(phase)
+
+    def start_initial_load(self):
+        # The window draws while customers.db is migrated and the first page is read on a worker
+        # thread, so time-to-interactive does not depend on how many customers there are
+        page_size = self.directory.visible + self.directory.buffer_rows
+
+        def work(report, cancelled):
+            conn = self.open_connection()
+            try:
+                repo = CustomerRepository(conn)
+                repo.create_database()
+                self.mark_startup("database migrated")
+                # One read snapshot, so the change feed resumes exactly after the rows shown
+                conn.execute("BEGIN")
+                last_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM customers").fetchone()[0]
+                today = date.today().strftime("%Y-%m-%d")
+                counts = repo.counts(today)
+                query = repo.directory_query()
+                rows = query.first(page_size)
+                total = query.count()
+                conn.rollback()
+                self.mark_startup("first page read")
+                return last_rowid, today, counts, total, rows
+            finally:
+                conn.close()
+
+        self.update_status("Opening customers.db...", "info")
+        BackgroundJob(self.root, work, on_done=self.finish_initial_load, on_error=self.fail_initial_load,
+                      errors=(sqlite3.Error,), poll_ms=20).start()
+
+    def finish_initial_load(self, result):
+        last_rowid, today, (total_count, today_count), total, rows = result
+        self.repo = CustomerRepository(self.open_connection())
+        self.writer = GroupCommitWriter(self.open_connection, window=self.commit_window)
+        self.change_feed = self.repo.change_feed()
+        self.change_feed.last_rowid = last_rowid
+        self.change_feed.data_version = None
+        self.total_count, self.today_count, self.counts_day = total_count, today_count, today
+        self.show_customer_counts()
+        self.directory.set_source(self.repo.directory_query(), total=total, rows=rows)
+        self.view = 'all'
+        self.update_status(f"Loaded {total} customers", "success")
+        self.mark_startup("customers shown")
+        if self.startup is not None:
+            print(self.startup.report())
+        self.start_row_cache_load(total)
+        self.start_name_index_load()
+        if self.api_settings is not None:
+            self.start_api()
+
+    def fail_initial_load(self, error):
+        messagebox.showerror("Database Error", f"Error opening customers.db: {str(error)}", parent=self.root)
+        self.update_status("Error opening customers.db", "error")
+
+    def is_loaded(self):
+        if self.repo is None:
+            self.update_status("Still opening customers.db...", "warning")
+            return False
+        return True
 
     def generate_customer_id(self):
-        return ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+        return self.repo.generate_customer_id()
 
     def get_next_daily_sequence(self):
-        today = date.today().strftime("%Y-%m-%d")
-        cursor = self.conn.cursor()
-        
         try:
-            cursor.execute('''
-                SELECT COALESCE(MAX(daily_sequence), 0) 
-                FROM customers 
-                WHERE date_added = ?
-            ''', (today,))
-            
-            result = cursor.fetchone()[0]
-            return result + 1  # Always increment by 1, starting from 1
+            return self.repo.get_next_daily_sequence()
             
         except sqlite3.Error as e:
             print(f"Error getting daily sequence: {str(e)}")
@@ -282,9 +422,29 @@ class CustomerApp:
 
         clear_button = ttk.Button(button_frame, text="🗑️ Clear", 
                                  command=self.clear_entry, style='ModernWarning.TButton')
-        clear_button.grid(row=0, column=1)
+        clear_button.grid(row=0, column=1, padx=(0, 10))
+
+        self.import_button = ttk.Button(button_frame, text="📥 Import",
+                                        command=self.import_customers, style='ModernPrimary.TButton')
+        self.import_button.grid(row=0, column=2)
+
+        # Customers already on file with a similar name, refreshed as the name is typed
+        self.duplicate_label = ttk.Label(entry_card, text="Already registered?", style='CardLabel.TLabel')
+        self.duplicate_label.grid(row=2, column=0, padx=(0, 15), sticky=(tk.W, tk.N))
+        self.duplicate_list = tk.Listbox(entry_card, height=4, font=('Segoe UI', 11), activestyle='none',
+                                         relief='flat', highlightthickness=1,
+                                         highlightbackground=self.colors['gray_300'],
+                                         selectbackground=self.colors['primary_light'])
+        self.duplicate_list.grid(row=2, column=1, columnspan=3, pady=(0, 8), sticky=(tk.W, tk.E))
+        self.hide_duplicates()
 
         self.name_entry.bind('<Return>', lambda e: self.add_customer())
+        self.name_entry.bind('<KeyRelease>', lambda e: self.ui.refresh('duplicates', self.check_duplicates))
+        self.name_entry.bind('<Down>', self.focus_duplicates)
+        self.duplicate_list.bind('<Return>', lambda e: self.reuse_customer())
+        self.duplicate_list.bind('<Double-Button-1>', lambda e: self.reuse_customer())
+        self.duplicate_list.bind('<Escape>', lambda e: self.leave_duplicates())
+        self.duplicate_list.bind('<Up>', self.leave_duplicates_at_top)
 
     def create_modern_search_section(self):
         search_card = ttk.LabelFrame(self.main_container, text="  🔍 Search & Filter  ", 
@@ -325,10 +485,16 @@ class CustomerApp:
         ttk.Button(button_container, text="📋 Show All", command=self.show_all_customers, 
                   style='ModernSecondary.TButton').grid(row=0, column=1, padx=(0, 10))
         ttk.Button(button_container, text="📅 Today Only", command=self.show_today_customers, 
-                  style='ModernSecondary.TButton').grid(row=0, column=2)
+                  style='ModernSecondary.TButton').grid(row=0, column=2, padx=(0, 10))
+        self.export_button = ttk.Button(button_container, text="📤 Export", command=self.export_customers,
+                                        style='ModernSecondary.TButton')
+        self.export_button.grid(row=0, column=3, padx=(0, 10))
+        ttk.Checkbutton(button_container, text="🗄️ Include archive", variable=self.search_history,
+                        command=self.toggle_search_history).grid(row=0, column=4)
 
-        # Bind enter key to all search fields
+        # Search as you type; Enter searches immediately
         for entry in [self.name_search, self.id_search, self.seq_search]:
+            entry.bind('<KeyRelease>', self.schedule_search)
             entry.bind('<Return>', lambda e: self.search_customers())
 
     def create_modern_customer_list(self):
@@ -353,28 +519,28 @@ class CustomerApp:
         self.customer_tree = ttk.Treeview(tree_container, columns=columns, show='headings', 
                                          height=35, style='Modern.Treeview')
 
-        # Configure columns with enhanced sizing
-        self.customer_tree.heading('Daily#', text='Daily #')
+        # Configure columns with enhanced sizing; clicking a heading sorts by it
+        for heading in columns:
+            self.customer_tree.heading(heading, text=self.HEADINGS[heading][1],
+                                       command=lambda heading=heading: self.sort_by(heading))
         self.customer_tree.column('Daily#', width=120, anchor='center')  # Increased from 100
-        
-        self.customer_tree.heading('ID', text='Customer ID')
         self.customer_tree.column('ID', width=180, anchor='center')  # Increased from 150
-        
-        self.customer_tree.heading('Name', text='Customer Name')
         self.customer_tree.column('Name', width=400, anchor='center')  # Increased from 350
-        
-        self.customer_tree.heading('Date Added', text='Date & Time Added')
         self.customer_tree.column('Date Added', width=220, anchor='center')  # Increased from 200
 
         self.customer_tree.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
 
         # Modern scrollbar
-        scrollbar = ttk.Scrollbar(tree_container, orient=tk.VERTICAL, command=self.customer_tree.yview)
+        scrollbar = ttk.Scrollbar(tree_container, orient=tk.VERTICAL)
         scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S), padx=(10, 0))
-        self.customer_tree.configure(yscrollcommand=scrollbar.set)
 
-        self.load_customers()
-        self.update_customer_count()
+        self.customer_tree.tag_configure('evenrow', background=self.colors['gray_50'])
+        self.customer_tree.tag_configure('oddrow', background=self.colors['white'])
+
+        # Only the visible window of rows lives in the Treeview; pages are fetched as it scrolls
+        row_height = int(ttk.Style().lookup('Modern.Treeview', 'rowheight') or 40)
+        self.directory = VirtualTreeview(self.customer_tree, scrollbar, self.format_customer_row, row_height)
+        self.start_initial_load()
 
     def create_modern_status_bar(self):
         self.status_frame = ttk.Frame(self.root, style='StatusBar.TFrame', padding="12")
@@ -384,217 +550,1041 @@ class CustomerApp:
         self.status_label = ttk.Label(self.status_frame, text="🟢 Ready", style='StatusBar.TLabel')
         self.status_label.grid(row=0, column=0, sticky=tk.W)
 
+        self.audio_label = ttk.Label(self.status_frame, text="", style='StatusBar.TLabel')
+        self.audio_label.grid(row=0, column=1, sticky=tk.E, padx=(0, 20))
+
+        # Progress of a running backup, then when the last one finished and how fast it went
+        self.backup_label = ttk.Label(self.status_frame, text="", style='StatusBar.TLabel')
+        self.backup_label.grid(row=0, column=2, sticky=tk.E, padx=(0, 20))
+
+        self.live_sync_check = ttk.Checkbutton(self.status_frame, text="🔄 Live sync", variable=self.live_sync,
+                                               command=self.toggle_live_sync, style='StatusBar.TCheckbutton')
+        self.live_sync_check.grid(row=0, column=3, sticky=tk.E, padx=(0, 20))
+
+        ttk.Checkbutton(self.status_frame, text="⏱️ Timings", variable=self.show_timings,
+                        command=self.show_timings_overlay,
+                        style='StatusBar.TCheckbutton').grid(row=0, column=4, sticky=tk.E, padx=(0, 20))
+
         self.time_label = ttk.Label(self.status_frame, text="", style='StatusBar.TLabel')
-        self.time_label.grid(row=0, column=1, sticky=tk.E)
+        self.time_label.grid(row=0, column=5, sticky=tk.E)
+
+        # p50/p99 overlay, shown under the status line while "Timings" is ticked (F12)
+        self.timings_label = ttk.Label(self.status_frame, text="", style='StatusBar.TLabel')
+        self.timings_label.grid(row=1, column=0, columnspan=6, sticky=tk.W, pady=(6, 0))
+        self.timings_label.grid_remove()
         self.update_time()
 
     def update_time(self):
-        current_time = datetime.now().strftime("🕐 %Y-%m-%d %H:%M:%S")
-        self.time_label.config(text=current_time)
+        self.ui.set_text(self.time_label, datetime.now().strftime("🕐 %Y-%m-%d %H:%M:%S"))
+        cache = self.announcer.cache
+        self.ui.set_text(self.audio_label, f"🔊 Queue: {self.announcer.depth} | Cache hits: {cache.hit_rate:.0%}")
+        # Runs whether or not live sync is on: the name index needs every row
+        self.sync_changes()
+        if self.archiver is not None:
+            self.show_archive_problem()
+        if self.show_timings.get():
+            self.update_timings()
         self.root.after(1000, self.update_time)
 
+    def toggle_timings(self):
+        self.show_timings.set(not self.show_timings.get())
+        self.show_timings_overlay()
+
+    def show_timings_overlay(self):
+        if self.show_timings.get():
+            self.update_timings()
+            self.timings_label.grid()
+        else:
+            self.timings_label.grid_remove()
+
+    def update_timings(self):
+        parts = []
+        sql = PROFILER.sql_stats()
+        if sql is not None:
+            parts.append(f"SQL {sql['p50']:.1f}/{sql['p99']:.1f}")
+        for name in self.TIMED_OPERATIONS:
+            stats = PROFILER.stats(name)
+            if stats is not None:
+                parts.append(f"{name} {stats['p50']:.1f}/{stats['p99']:.1f}")
+        slow = len(PROFILER.slow_log)
+        text = " | ".join(parts) if parts else "No timings yet"
+        saved = self.ui.saved
+        self.ui.set_text(self.timings_label, f"⏱️ p50/p99 ms: {text} | Slow ops: {slow} | Redraws saved: {saved:,} "
+                                             f"(Ctrl+F12 saves JSON)")
+
+    def dump_timings(self):
+        path = f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+        try:
+            PROFILER.dump(path, ui_scheduler=self.ui.stats())
+        except OSError as e:
+            messagebox.showerror("Profiler", f"Could not save timings: {str(e)}", parent=self.root)
+            return
+        self.update_status(f"Timings saved to {path}", "success")
+
+    def sync_changes(self):
+        # Idle cost is one PRAGMA data_version; work is proportional to rows other stations added
+        if self.change_feed is None:
+            return
+        try:
+            changes = self.change_feed.poll(self.SYNC_MAX_ROWS)
+        except sqlite3.Error as e:
+            print(f"Error syncing customers: {str(e)}")
+            return
+        if changes is None:
+            return
+
+        rows, overflowed = changes
+        if overflowed:
+            self.forget_local_ids()
+            self.schedule_sync_reload(rebuild_index=True)
+            return
+
+        added = 0
+        for *row, row_id in rows:
+            # Every registration reaches the name index through here, this station's included
+            if self.name_index is not None:
+                self.name_index.add(row[0], row[1], row[2], row[3][:10])
+            if row[1] in self.local_ids:
+                self.local_ids.discard(row[1])
+                continue
+            if not self.live_sync.get():
+                self.sync_missed = True
+                continue
+            self.show_new_customer(tuple(row), row_id)
+            self.count_new_customer(row[3][:10])
+            added += 1
+        if added:
+            self.update_status(f"{added} customer(s) added at another station", "info")
+        elif not rows:
+            # Something other than a registration changed (e.g. days moved to the archive)
+            self.schedule_sync_reload()
+
+    def schedule_sync_reload(self, rebuild_index=False):
+        # finish_import reloads everything once this station's own import is done
+        if self.import_job is not None and self.import_job.running:
+            return
+        self.sync_reload_index = self.sync_reload_index or rebuild_index
+        if self.sync_reload_pending:
+            return
+        self.sync_reload_pending = True
+        wait = max(0.0, self.last_sync_reload + self.SYNC_RELOAD_SECONDS - time.monotonic())
+        self.ui.later('sync-reload', int(wait * 1000), self.reload_after_sync)
+
+    def forget_local_ids(self):
+        # After the feed skips ahead, rows already committed will never come through it, but
+        # registrations still in flight may, and must still be recognised as this station's
+        self.local_ids &= self.pending_ids
+
+    def reload_after_sync(self):
+        if self.pending_ids:
+            # A reload that reads a row before poll_registration shows it would show it twice
+            self.ui.later('sync-reload', self.REGISTRATION_POLL_MS, self.reload_after_sync)
+            return
+        self.sync_reload_pending = False
+        self.last_sync_reload = time.monotonic()
+        if self.sync_reload_index:
+            self.sync_reload_index = False
+            self.start_name_index_load()
+            self.update_status("Reloaded after changes from another station", "info")
+        if not self.live_sync.get():
+            self.sync_missed = True
+            return
+        self.refresh_view()
+        self.request_counts()
+
+    def toggle_live_sync(self):
+        # Catch up on whatever other stations did while the view was left alone
+        if self.live_sync.get() and self.sync_missed:
+            self.sync_missed = False
+            self.refresh_view()
+            self.request_counts()
+
+    def refresh_view(self):
+        # Search results stay as they are until the next search
+        top = self.directory.top
+        if self.view == 'all':
+            self.load_customers()
+        elif self.view == 'today':
+            self.show_cached_rows(RowCache(row for row, _ in self.repo.day_query(self.today_view_day).first(-1)),
+                                  descending=False)
+        else:
+            return
+        self.directory.scroll_to(top)
+
+    def note_activity(self, event=None):
+        self.last_activity = time.monotonic()
+
+    def is_idle(self):
+        # Read from the archiver thread; plain attribute reads are enough here
+        busy = any(job is not None and job.running for job in (self.import_job, self.export_job))
+        return not busy and time.monotonic() - self.last_activity >= self.ARCHIVE_IDLE_SECONDS
+
+    def start_archiver(self, horizon_days, granularity='year'):
+        """Move days older than `horizon_days` into archive files whenever the app is idle."""
+        self.archiver = IdleArchiver(Archiver(DB_PATH, horizon_days, granularity), self.is_idle).start()
+
+    def show_archive_problem(self):
+        # Each new problem once; the archiver keeps reporting it while it lasts
+        problem = self.archiver.problem
+        if problem != self.archive_problem:
+            self.archive_problem = problem
+            if problem is not None:
+                self.update_status(problem, "warning")
+
+    def serve_api(self, host, port, allow_origin=None):
+        """Serve the HTTP/JSON API as soon as customers.db has been migrated."""
+        self.api_settings = (host, port, allow_origin)
+        if self.repo is not None:
+            self.start_api()
+
+    def start_api(self):
+        # Kiosk registrations reach this window through live sync like any other station
+        from api_server import ApiServer
+        host, port, allow_origin = self.api_settings
+        self.api_server = ApiServer(DB_PATH, host, port, announcer=self.announcer, allow_origin=allow_origin)
+        self.api_server.start_in_thread()
+        self.update_status(f"API listening on http://{host}:{port}", "info")
+
+    def configure_backups(self, keep=7, compressed=False, every_minutes=None):
+        """Keep `keep` snapshots in backups/, taking one every `every_minutes` as well as on demand."""
+        self.backups = Backups(DB_PATH, keep=keep, compressed=compressed)
+        if every_minutes:
+            self.backup_every_ms = int(every_minutes * 60_000)
+            self.ui.later('backup', self.backup_every_ms, self.run_scheduled_backup)
+
+    def run_scheduled_backup(self):
+        self.ui.later('backup', self.backup_every_ms, self.run_scheduled_backup)
+        # Skipped while customers.db is still being migrated or the last backup is still running
+        if self.repo is not None and not (self.backup_job is not None and self.backup_job.running):
+            self.start_backup(scheduled=True)
+
+    def backup_now(self):
+        if not self.is_loaded():
+            return
+        if self.backup_job is not None and self.backup_job.running:
+            self.backup_job.cancel()
+            self.update_status("Cancelling backup...", "warning")
+            return
+        self.start_backup(scheduled=False)
+
+    def start_backup(self, scheduled):
+        backups = self.backups
+
+        def work(report, cancelled):
+            # The copy runs in small page steps on its own connection; registrations carry on meanwhile
+            return backups.run(on_progress=report, cancelled=cancelled)
+
+        self.backup_job = BackgroundJob(
+            self.root, work, on_progress=self.show_backup_progress,
+            on_done=lambda result: self.finish_backup(result, scheduled),
+            on_error=lambda error: self.fail_backup(error, scheduled),
+            errors=(sqlite3.Error, OSError)).start()
+        self.backup_button.config(text="⏹ Cancel Backup")
+        self.ui.set_text(self.backup_label, "💾 Backing up...")
+
+    def show_backup_progress(self, fraction):
+        # integrity_check (and gzip, if enabled) run after the last page is copied
+        text = f"💾 Backing up... {fraction:.0%}" if fraction < 1 else "💾 Verifying backup..."
+        self.ui.set_text(self.backup_label, text)
+
+    def show_last_backup(self):
+        last = self.backups.last
+        text = "" if last is None else (f"💾 Last backup {last.finished:%H:%M}: {last.size / 1e6:,.0f} MB "
+                                         f"in {last.seconds:.1f}s ({last.rate / 1e6:,.1f} MB/s)")
+        self.ui.set_text(self.backup_label, text)
+
+    def finish_backup(self, result, scheduled):
+        self.backup_button.config(text="💾 Backup")
+        self.show_last_backup()
+        if result is None:
+            self.update_status("Backup cancelled", "warning")
+        elif not scheduled:
+            self.update_status(f"{result.summary()} to {os.path.basename(result.path)}", "success")
+
+    def fail_backup(self, error, scheduled):
+        self.backup_button.config(text="💾 Backup")
+        self.ui.set_text(self.backup_label, "💾 Last backup failed")
+        self.update_status("Error backing up customers.db", "error")
+        if not scheduled:
+            messagebox.showerror("Backup Error", f"Error backing up customers.db: {str(error)}", parent=self.root)
+        else:
+            print(f"Backup error: {error}")
+
     def update_status(self, message, status_type="info"):
         if hasattr(self, 'status_label'):
             icons = {"info": "ℹ️", "success": "✅", "warning": "⚠️", "error": "❌"}
             icon = icons.get(status_type, "ℹ️")
-            self.status_label.config(text=f"{icon} {message}")
-            self.root.after(4000, lambda: self.status_label.config(text="🟢 Ready"))
+            self.ui.set_text(self.status_label, f"{icon} {message}")
+            # One reset timer at a time, so an older one never clears a newer message
+            self.ui.later('status-reset', 4000, lambda: self.ui.set_text(self.status_label, "🟢 Ready"))
+
+    def show_progress(self, text):
+        # Progress stays up until the job reports its outcome
+        self.ui.cancel('status-reset')
+        self.ui.set_text(self.status_label, text)
+
+    def request_counts(self):
+        self.ui.refresh('counts', self.update_customer_count)
 
+    @profiled('update_customer_count')
     def update_customer_count(self):
+        if self.repo is None:
+            return
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('SELECT COUNT(*) FROM customers')
-            total_count = cursor.fetchone()[0]
-            self.customer_count_label.config(text=f"📊 Total: {total_count}")
-            
             today = date.today().strftime("%Y-%m-%d")
-            cursor.execute('SELECT COUNT(*) FROM customers WHERE date_added = ?', (today,))
-            today_count = cursor.fetchone()[0]
-            self.today_count_label.config(text=f"📅 Today: {today_count}")
+            self.total_count, self.today_count = self.repo.counts(today)
+            self.counts_day = today
+            self.show_customer_counts()
             
         except sqlite3.Error as e:
             print(f"Error counting customers: {str(e)}")
 
+    def show_customer_counts(self):
+        self.ui.set_text(self.customer_count_label, f"📊 Total: {self.total_count}")
+        self.ui.set_text(self.today_count_label, f"📅 Today: {self.today_count}")
+        if self.dashboard is not None:
+            self.ui.refresh('dashboard', self.refresh_dashboard)
+
+    def open_dashboard(self):
+        if not self.is_loaded():
+            return
+        if self.dashboard is not None:
+            self.dashboard.lift()
+            return
+        self.dashboard = VolumeDashboard(self.root, VolumeStats(self.repo.conn), self.colors,
+                                         on_close=self.close_dashboard)
+
+    def refresh_dashboard(self):
+        # The window may have been closed since the refresh was queued
+        if self.dashboard is not None:
+            self.dashboard.reload()
+
+    def close_dashboard(self):
+        self.dashboard = None
+
+    def count_new_customer(self, day):
+        if day != self.counts_day:
+            self.request_counts()
+            return
+        self.total_count += 1
+        self.today_count += 1
+        self.show_customer_counts()
+
+    def show_new_customer(self, row, row_id):
+        # Place just the new row instead of reloading the current view; row_id is the row's own
+        # id, which differs from the customer ID it shows for a repeat visit
+        daily_sequence, customer_id, name, created_at = row
+        if self.view == 'all' and self.row_cache is None:
+            self.directory.prepend(row, (created_at, row_id))
+        elif self.view == 'all' or (self.view == 'today' and created_at[:10] == self.today_view_day):
+            index = self.row_cache.append(row)
+            if self.sort_column is not None:
+                self.directory.refresh()
+            elif self.natural_descending:
+                self.directory.prepend(row, (index,))
+            else:
+                self.directory.append(row, (index,))
+
     def clear_entry(self):
         self.name_entry.delete(0, tk.END)
         self.name_entry.focus()
+        self.hide_duplicates()
+
+    def start_name_index_load(self):
+        # Rebuilt from scratch after imports and sync overflows; sync_changes adds every other row
+        if self.name_index_job is not None:
+            self.name_index_job.cancel()
+        self.name_index = None
+        self.hide_duplicates()
+        # Rows after this one reach the index through the change feed
+        last_rowid = self.change_feed.last_rowid
+
+        def work(report, cancelled):
+            conn = self.open_connection()
+            try:
+                cursor = conn.execute(f'''
+                    SELECT daily_sequence, {CUSTOMER_ID}, name, date_added FROM customers WHERE rowid <= ? ORDER BY rowid
+                ''', (last_rowid,))
+                index = NameIndex()
+                while not cancelled():
+                    rows = cursor.fetchmany(5000)
+                    if not rows:
+                        return index
+                    index.extend(rows)
+                return None
+            finally:
+                conn.close()
+
+        def done(index):
+            if index is None or self.name_index_job is not job:
+                return
+            # Rows the change feed passed on while the index was being built
+            index.extend(self.repo.conn.execute(f'''
+                SELECT daily_sequence, {CUSTOMER_ID}, name, date_added FROM customers
+                WHERE rowid > ? AND rowid <= ? ORDER BY rowid
+            ''', (last_rowid, self.change_feed.last_rowid)))
+            self.name_index = index
+            self.ui.refresh('duplicates', self.check_duplicates)
+
+        job = self.name_index_job = BackgroundJob(
+            self.root, work, on_done=done, errors=(sqlite3.Error,),
+            on_error=lambda e: print(f"Error indexing customer names: {str(e)}")).start()
+
+    @profiled('duplicate_check')
+    def check_duplicates(self):
+        text = self.name_entry.get().lstrip()
+        if self.name_index is None or len(text.strip()) < MIN_QUERY_LENGTH:
+            self.hide_duplicates()
+            return
+        if text == self.duplicate_query:
+            return
+        self.duplicate_query = text
+        matches = self.name_index.matches(text)
+        if not matches:
+            self.hide_duplicates()
+            self.duplicate_query = text
+            return
+
+        today = date.today().strftime("%Y-%m-%d")
+        self.duplicate_positions = [position for _, position in matches]
+        self.duplicate_list.delete(0, tk.END)
+        for score, position in matches:
+            daily_sequence, customer_id, name, day = self.name_index.customer(position)
+            when = "⚠️ today" if day == today else day
+            self.duplicate_list.insert(tk.END, f"{name}   ·   {customer_id}   ·   "
+                                               f"#{daily_sequence:02d} {when}   ·   {score:.0%} match")
+        self.duplicate_list.config(height=len(matches))
+        self.duplicate_label.grid()
+        self.duplicate_list.grid()
+
+    def hide_duplicates(self):
+        self.duplicate_query = None
+        self.duplicate_positions = []
+        self.duplicate_label.grid_remove()
+        self.duplicate_list.grid_remove()
+
+    def focus_duplicates(self, event=None):
+        if not self.duplicate_positions:
+            return None
+        self.duplicate_list.focus_set()
+        self.duplicate_list.selection_clear(0, tk.END)
+        self.duplicate_list.selection_set(0)
+        self.duplicate_list.activate(0)
+        return 'break'
+
+    def leave_duplicates(self):
+        query = self.duplicate_query
+        self.hide_duplicates()
+        # Stays hidden until the name changes
+        self.duplicate_query = query
+        self.name_entry.focus()
+
+    def leave_duplicates_at_top(self, event=None):
+        if self.duplicate_list.curselection() == (0,):
+            self.duplicate_list.selection_clear(0, tk.END)
+            self.name_entry.focus()
+            return 'break'
+        return None
+
+    def reuse_customer(self):
+        """Register the selected existing customer again today instead of adding a duplicate."""
+        selection = self.duplicate_list.curselection()
+        if not selection or not self.is_loaded():
+            return
+        position = self.duplicate_positions[selection[0]]
+        _, customer_id, name, _ = self.name_index.customer(position)
+        try:
+            # Every visit links to the customer's first registration, which keeps its own day
+            customer = self.repo.customer_of(customer_id)
+            visit = self.repo.visit_on(customer)
+        except sqlite3.Error as e:
+            messagebox.showerror("Database Error", f"Error registering customer: {str(e)}", parent=self.root)
+            self.update_status("Error registering customer", "error")
+            return
+        self.clear_entry()
+        if visit is not None:
+            self.update_status(f"{name} is already registered today as #{visit[0]:02d}", "warning")
+            return
+
+        # The visit is a row of its own but shows, and is synced, under the customer's ID
+        visit_id = self.repo.generate_customer_id()
+        self.local_ids.add(customer)
+        self.pending_ids.add(customer)
+        future = self.writer.submit(name, customer_id=visit_id, customer_ref=customer)
+        self.show_progress(f"Saving {name}...")
+        self.poll_registration(future, name, visit_id, time.perf_counter(), customer_ref=customer)
+
+    def registered_today(self, name):
+        """(daily_sequence, customer_id) of a customer with exactly this name registered today, if any."""
+        if self.name_index is None:
+            return None
+        today = date.today().strftime("%Y-%m-%d")
+        for position in self.name_index.named(name):
+            daily_sequence, customer_id, _, day = self.name_index.customer(position)
+            if day == today:
+                return daily_sequence, customer_id
+        return None
 
     def show_all_customers(self):
+        if not self.is_loaded():
+            return
+        self.cancel_search()
         self.name_search.delete(0, tk.END)
         self.id_search.delete(0, tk.END)
         self.seq_search.delete(0, tk.END)
         self.load_customers()
         self.update_status("Showing all customers", "info")
 
+    @profiled('show_today_customers')
     def show_today_customers(self):
+        if not self.is_loaded():
+            return
+        self.cancel_search()
         self.name_search.delete(0, tk.END)
         self.id_search.delete(0, tk.END)
         self.seq_search.delete(0, tk.END)
         
         today = date.today().strftime("%Y-%m-%d")
         
-        for item in self.customer_tree.get_children():
-            self.customer_tree.delete(item)
-        
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                SELECT daily_sequence, id, name, created_at 
-                FROM customers 
-                WHERE date_added = ? 
-                ORDER BY daily_sequence ASC
-            ''', (today,))
-            
-            rows = cursor.fetchall()
-            for i, row in enumerate(rows):
-                formatted_row = (f"#{row[0]:02d}", row[1], row[2], row[3])
-                tags = ('evenrow',) if i % 2 == 0 else ('oddrow',)
-                self.customer_tree.insert('', 'end', values=formatted_row, tags=tags)
+            count = self.show_cached_rows(RowCache(row for row, _ in self.repo.day_query(today).first(-1)),
+                                          descending=False)
+            self.view = 'today'
+            self.today_view_day = today
             
-            self.customer_tree.tag_configure('evenrow', background=self.colors['gray_50'])
-            self.customer_tree.tag_configure('oddrow', background=self.colors['white'])
-            
-            if not rows:
+            if not count:
                 messagebox.showinfo("Today's Customers", "No customers added today yet.", parent=self.root)
                 self.update_status("No customers found for today", "warning")
             else:
-                self.update_status(f"Showing {len(rows)} customer(s) from today", "success")
+                self.update_status(f"Showing {count} customer(s) from today", "success")
                 
         except sqlite3.Error as e:
             messagebox.showerror("Database Error", f"Error loading today's customers: {str(e)}", parent=self.root)
             self.update_status("Error loading today's customers", "error")
 
+    @profiled('add_customer')
     def add_customer(self):
+        if not self.is_loaded():
+            return
         name = self.name_entry.get().strip()
         if not name:
             messagebox.showerror("Input Required", "Please enter a customer name to continue.", parent=self.root)
             self.name_entry.focus()
             return
+        existing = self.registered_today(name)
+        if existing is not None and not messagebox.askyesno(
+                "Already Registered",
+                f"'{name}' is already registered today as #{existing[0]:02d} ({existing[1]}).\n\n"
+                f"Register a new customer with the same name anyway?", parent=self.root):
+            self.name_entry.focus()
+            return
 
-        customer_id = self.generate_customer_id()
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        today = date.today().strftime("%Y-%m-%d")
-        daily_sequence = self.get_next_daily_sequence()
+        # Known before the commit, so live sync skips the row whichever sees it first
+        customer_id = self.repo.generate_customer_id()
+        self.local_ids.add(customer_id)
+        self.pending_ids.add(customer_id)
+        future = self.writer.submit(name, customer_id=customer_id)
+        self.name_entry.delete(0, tk.END)
+        self.hide_duplicates()
+        self.show_progress(f"Saving {name}...")
+        self.poll_registration(future, name, customer_id, time.perf_counter())
+
+    def poll_registration(self, future, name, requested_id, submitted, customer_ref=None):
+        if not future.done():
+            self.root.after(self.REGISTRATION_POLL_MS, self.poll_registration,
+                            future, name, requested_id, submitted, customer_ref)
+            return
+        PROFILER.record('registration_confirmed', time.perf_counter() - submitted)
+        self.pending_ids.discard(customer_ref or requested_id)
 
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                INSERT INTO customers (id, name, created_at, daily_sequence, date_added) 
-                VALUES (?, ?, ?, ?, ?)
-            ''', (customer_id, name, current_time, max(1, daily_sequence), today))
-            self.conn.commit()
+            customer_id, daily_sequence, current_time = future.result()
+        except Exception as e:
+            # The writer hands any failure of the batch to every future in it
+            self.local_ids.discard(customer_ref or requested_id)
+            messagebox.showerror("Database Error", f"Error adding customer: {str(e)}", parent=self.root)
+            self.update_status("Error adding customer", "error")
+            if not self.name_entry.get():
+                self.name_entry.insert(0, name)
+            return
+        if customer_id != requested_id and customer_ref is None:
+            # The ID was taken and the writer drew another one
+            self.local_ids.discard(requested_id)
+            self.local_ids.add(customer_id)
+        # Index the new row now rather than on the next clock tick
+        self.sync_changes()
 
-            try:
-                tts = gTTS(text=f"{name} පැමිණෙන්න.", lang='si')
-                tts.save("sinhala.mp3")
-                playsound("sinhala.mp3")
-                os.remove("sinhala.mp3")
-            except Exception as e:
-                print(f"Voice error: {e}")
+        self.announcer.announce(f"{name} පැමිණෙන්න.", lang='si')
 
+        if customer_ref is None:
             messagebox.showinfo("✅ Success!", 
                 f"Customer '{name}' has been added successfully!\n\n"
                 f"🆔 Customer ID: {customer_id}\n"
                 f"🎯 Daily Number: #{daily_sequence:02d}\n"
                 f"📅 Date: {current_time}", 
                 parent=self.root)
-            
-            self.name_entry.delete(0, tk.END)
-            self.load_customers()
-            self.update_customer_count()
-            self.update_status(f"Added customer: {name} (#{daily_sequence:02d})", "success")
-            self.name_entry.focus()
+            status = f"Added customer: {name} (#{daily_sequence:02d})"
+        else:
+            messagebox.showinfo("✅ Welcome back!",
+                f"Customer '{name}' has been registered again.\n\n"
+                f"🆔 Customer ID: {customer_ref}\n"
+                f"🎯 Daily Number: #{daily_sequence:02d}\n"
+                f"📅 Date: {current_time}",
+                parent=self.root)
+            status = f"Registered {name} again (#{daily_sequence:02d})"
 
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error adding customer: {str(e)}", parent=self.root)
-            self.update_status("Error adding customer", "error")
+        self.show_new_customer((daily_sequence, customer_ref or customer_id, name, current_time), customer_id)
+        self.count_new_customer(current_time[:10])
+        self.update_status(status, "success")
+        self.name_entry.focus()
+
+    def import_customers(self):
+        if not self.is_loaded():
+            return
+        if self.import_job is not None and self.import_job.running:
+            self.import_job.cancel()
+            self.update_status("Cancelling import...", "warning")
+            return
+
+        path = filedialog.askopenfilename(
+            parent=self.root, title="Import Customers",
+            filetypes=[("Customer files", "*.csv *.jsonl *.ndjson"), ("All files", "*.*")])
+        if not path:
+            return
 
+        def work(report, cancelled):
+            # Runs on the worker thread with its own connection
+            conn = self.open_connection()
+            archives = ArchiveSet(archive_directory(DB_PATH))
+            try:
+                return import_customers(conn, path, on_progress=report, cancelled=cancelled, archives=archives)
+            finally:
+                archives.close()
+                conn.close()
+
+        self.import_job = BackgroundJob(self.root, work, on_progress=self.show_import_progress,
+                                        on_done=self.finish_import, on_error=self.fail_import,
+                                        errors=(sqlite3.Error, OSError, ValueError, csv.Error)).start()
+        self.import_button.config(text="⏹ Cancel Import")
+        self.update_status("Importing customers...", "info")
+
+    def show_import_progress(self, progress):
+        self.show_progress(f"📥 Importing... {progress.fraction:.0%} "
+                                      f"({progress.imported:,} rows, {progress.rate:,.0f}/s)")
+
+    def finish_import(self, result):
+        self.import_button.config(text="📥 Import")
+        self.change_feed.reset()
+        self.forget_local_ids()
+        self.start_name_index_load()
+        self.load_customers()
+        self.request_counts()
+        if self.import_job.cancelled:
+            self.update_status(f"Import cancelled after {result.imported:,} customers", "warning")
+        else:
+            messagebox.showinfo("Import Complete", result.summary(), parent=self.root)
+            self.update_status(result.summary(), "success")
+
+    def fail_import(self, error):
+        self.import_button.config(text="📥 Import")
+        self.change_feed.reset()
+        self.forget_local_ids()
+        self.start_name_index_load()
+        self.load_customers()
+        self.request_counts()
+        messagebox.showerror("Import Error", f"Error importing customers: {str(error)}", parent=self.root)
+        self.update_status("Error importing customers", "error")
+
+    def ask_export_scope(self):
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Export Customers")
+        dialog.transient(self.root)
+        dialog.resizable(False, False)
+        frame = ttk.Frame(dialog, padding="20")
+        frame.grid(row=0, column=0)
+
+        scope = tk.StringVar(value='view')
+        today = date.today().strftime("%Y-%m-%d")
+        ttk.Radiobutton(frame, text="Current view", variable=scope, value='view').grid(row=0, column=0, columnspan=4, sticky=tk.W)
+        ttk.Radiobutton(frame, text="All customers", variable=scope, value='all').grid(row=1, column=0, columnspan=4, sticky=tk.W)
+        ttk.Radiobutton(frame, text="Date range", variable=scope, value='range').grid(row=2, column=0, sticky=tk.W)
+        first_day = ttk.Entry(frame, width=12)
+        first_day.insert(0, today)
+        first_day.grid(row=2, column=1, padx=(10, 5))
+        ttk.Label(frame, text="to").grid(row=2, column=2)
+        last_day = ttk.Entry(frame, width=12)
+        last_day.insert(0, today)
+        last_day.grid(row=2, column=3, padx=(5, 0))
+
+        result = {}
+
+        def accept():
+            result['scope'] = (scope.get(), first_day.get().strip(), last_day.get().strip())
+            dialog.destroy()
+
+        buttons = ttk.Frame(frame)
+        buttons.grid(row=3, column=0, columnspan=4, pady=(15, 0))
+        ttk.Button(buttons, text="Export...", command=accept, style='ModernPrimary.TButton').grid(row=0, column=0, padx=(0, 10))
+        ttk.Button(buttons, text="Cancel", command=dialog.destroy, style='ModernWarning.TButton').grid(row=0, column=1)
+
+        dialog.grab_set()
+        self.root.wait_window(dialog)
+        return result.get('scope')
+
+    def export_customers(self):
+        if not self.is_loaded():
+            return
+        if self.export_job is not None and self.export_job.running:
+            self.export_job.cancel()
+            self.update_status("Cancelling export...", "warning")
+            return
+
+        scope = self.ask_export_scope()
+        if scope is None:
+            return
+        kind, first_day, last_day = scope
+        if kind == 'view':
+            if self.view == 'today':
+                kind, first_day, last_day = 'range', self.today_view_day, self.today_view_day
+            elif self.view == 'search' and self.last_search_criteria:
+                kind = 'search'
+            else:
+                kind = 'all'
+        if kind == 'range':
+            try:
+                for day in (first_day, last_day):
+                    datetime.strptime(day, "%Y-%m-%d")
+            except ValueError:
+                messagebox.showerror("Invalid Input", "Dates must be in YYYY-MM-DD format.", parent=self.root)
+                return
+        criteria = dict(self.last_search_criteria or {})
+
+        path = filedialog.asksaveasfilename(
+            parent=self.root, title="Export Customers", defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON Lines", "*.jsonl"), ("SQLite snapshot", "*.db")])
+        if not path:
+            return
+
+        def work(report, cancelled):
+            conn = self.open_connection()
+            try:
+                if kind == 'search':
+                    cursor, total = select_search(conn, **criteria)
+                elif kind == 'range':
+                    cursor, total = select_date_range(conn, first_day, last_day)
+                else:
+                    cursor, total = select_all(conn)
+                return export_rows(cursor, path, total=total, on_progress=report, cancelled=cancelled)
+            finally:
+                conn.close()
+
+        self.export_job = BackgroundJob(self.root, work, on_progress=self.show_export_progress,
+                                        on_done=self.finish_export, on_error=self.fail_export,
+                                        errors=(sqlite3.Error, OSError)).start()
+        self.export_button.config(text="⏹ Cancel Export")
+        self.update_status("Exporting customers...", "info")
+
+    def show_export_progress(self, progress):
+        done = f"{progress.fraction:.0%} " if progress.fraction is not None else ""
+        self.show_progress(f"📤 Exporting... {done}({progress.exported:,} rows, {progress.rate:,.0f}/s)")
+
+    def finish_export(self, result):
+        self.export_button.config(text="📤 Export")
+        if self.export_job.cancelled:
+            self.update_status("Export cancelled", "warning")
+        else:
+            self.update_status(result.summary(), "success")
+
+    def fail_export(self, error):
+        self.export_button.config(text="📤 Export")
+        messagebox.showerror("Export Error", f"Error exporting customers: {str(error)}", parent=self.root)
+        self.update_status("Error exporting customers", "error")
+
+    def format_customer_row(self, row):
+        return (sequence_label(row[0]), row[1], row[2], row[3])
+
+    @profiled('load_customers')
     def load_customers(self):
-        for item in self.customer_tree.get_children():
-            self.customer_tree.delete(item)
         try:
-            cursor = self.conn.cursor()
-            cursor.execute('''
-                SELECT daily_sequence, id, name, created_at 
-                FROM customers 
-                ORDER BY created_at DESC
-            ''')
-            rows = cursor.fetchall()
-            for i, row in enumerate(rows):
-                formatted_row = (f"#{row[0]:02d}" if row[0] > 0 else "#00", row[1], row[2], row[3])
-                tags = ('evenrow',) if i % 2 == 0 else ('oddrow',)
-                self.customer_tree.insert('', 'end', values=formatted_row, tags=tags)
-            
-            self.customer_tree.tag_configure('evenrow', background=self.colors['gray_50'])
-            self.customer_tree.tag_configure('oddrow', background=self.colors['white'])
-            self.update_status(f"Loaded {len(rows)} customers", "success")
+            count = self.directory.set_source(self.repo.directory_query())
+            self.view = 'all'
+            self.row_cache = None
+            self.sort_job = None
+            self.sort_column = None
+            self.update_headings()
+            self.update_status(f"Loaded {count} customers", "success")
+            self.start_row_cache_load(count)
         except sqlite3.Error as e:
             messagebox.showerror("Database Error", f"Error loading customers: {str(e)}", parent=self.root)
             self.update_status("Error loading customers", "error")
 
-    def search_customers(self):
+    def cancel_row_cache_load(self):
+        self.row_cache_generation += 1
+        if self.row_cache_job is not None and self.row_cache_job.running:
+            self.row_cache_job.cancel()
+        self.row_cache_job = None
+
+    def start_row_cache_load(self, count):
+        # The first pages come from SQLite straight away; the full copy for sorting follows,
+        # streamed on a worker thread and dropped as soon as the view changes
+        self.cancel_row_cache_load()
+        generation = self.row_cache_generation
+        if count > self.ROW_CACHE_MAX_ROWS:
+            self.start_anchor_scan(generation)
+            return
+
+        def work(report, cancelled):
+            conn = self.open_connection()
+            try:
+                conn.execute("BEGIN")
+                last_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM customers").fetchone()[0]
+                cursor = conn.execute(f'''
+                    SELECT {', '.join(CUSTOMER_COLUMNS)} FROM customers ORDER BY created_at, id
+                ''')
+                cache = RowCache()
+                while not cancelled():
+                    rows = cursor.fetchmany(5000)
+                    if not rows:
+                        conn.rollback()
+                        return cache, last_rowid, cache.memory_per_row()
+                    cache.extend(rows)
+                    report(len(cache))
+                return None
+            finally:
+                conn.close()
+
+        def show_progress(loaded):
+            if generation == self.row_cache_generation:
+                self.show_progress(f"📋 Loading customers for sorting... {loaded:,} of {count:,}")
+
+        def done(result):
+            if result is not None:
+                self.finish_row_cache_load(generation, *result)
+
+        self.row_cache_job = BackgroundJob(self.root, work, on_progress=show_progress, on_done=done,
+                                           errors=(sqlite3.Error,)).start()
+
+    def start_anchor_scan(self, generation):
+        source = self.directory.source
+
+        def work(report, cancelled):
+            conn = self.open_connection()
+            try:
+                return source.scan_anchors(conn, self.ANCHOR_STEP, cancelled)
+            finally:
+                conn.close()
+
+        def done(result):
+            if result is None or generation != self.row_cache_generation or self.directory.source is not source:
+                return
+            anchors, scanned = result
+            source.set_anchors(self.ANCHOR_STEP, anchors, prepended=self.directory.total - scanned)
+
+        self.row_cache_job = BackgroundJob(self.root, work, on_done=done, errors=(sqlite3.Error,)).start()
+
+    def finish_row_cache_load(self, generation, cache, last_rowid, bytes_per_row):
+        if generation != self.row_cache_generation or self.view != 'all':
+            return
+        # Registrations that landed while the copy was being read
+        for row in self.repo.conn.execute(f'''
+            SELECT {', '.join(CUSTOMER_COLUMNS)} FROM customers WHERE rowid > ? ORDER BY rowid
+        ''', (last_rowid,)):
+            cache.append(row)
+        top = self.directory.top
+        self.show_cached_rows(cache, descending=True)
+        self.directory.scroll_to(top)
+        self.update_status(f"Click a heading to sort: {len(cache):,} customers in memory, "
+                           f"about {bytes_per_row:.0f} bytes each", "info")
+
+    def show_cached_rows(self, cache, descending):
+        """Show rows held in memory in their natural order; headings can then sort them."""
+        self.cancel_row_cache_load()
+        self.sort_job = None
+        self.row_cache = cache
+        self.natural_descending = descending
+        self.sort_column = None
+        self.update_headings()
+        return self.directory.set_source(CacheSource(cache, None, descending))
+
+    @profiled('sort_by')
+    def sort_by(self, heading):
+        if self.row_cache is None:
+            self.update_status("Sorting is available once the directory is in memory "
+                               f"(up to {self.ROW_CACHE_MAX_ROWS:,} customers)", "warning")
+            return
+        column = self.HEADINGS[heading][0]
+        descending = not self.sort_descending if column == self.sort_column else False
+        cache = self.row_cache
+        if column in cache.orders or len(cache) <= self.SORT_INLINE_ROWS:
+            self.show_sorted(column, descending)
+            return
+
+        size = len(cache)
+        job = None
+
+        def done(order):
+            # A newer sort or another view replaced this one in the meantime
+            if self.sort_job is job and self.row_cache is cache:
+                self.sort_job = None
+                cache.set_order(column, order, size)
+                self.show_sorted(column, descending)
+
+        job = self.sort_job = BackgroundJob(self.root, lambda report, cancelled: cache.sorted_order(column, size),
+                                            on_done=done, poll_ms=30).start()
+        self.show_progress(f"↕️ Sorting {size:,} customers...")
+
+    def show_sorted(self, column, descending):
+        self.sort_column, self.sort_descending = column, descending
+        self.directory.set_source(CacheSource(self.row_cache, column, descending))
+        self.update_headings()
+
+    def update_headings(self):
+        for heading, (column, text) in self.HEADINGS.items():
+            if column == self.sort_column:
+                text += " ▼" if self.sort_descending else " ▲"
+            self.customer_tree.heading(heading, text=text)
+
+    def search_criteria(self):
         name = self.name_search.get().strip()
         customer_id = self.id_search.get().strip()
         daily_seq = self.seq_search.get().strip()
-        
-        if not name and not customer_id and not daily_seq:
-            messagebox.showwarning("Search Required", "Please enter at least one search criteria.", parent=self.root)
+        seq_num = int(daily_seq) if daily_seq else None
+        return {'name': name, 'customer_id': customer_id, 'daily_sequence': seq_num}
+
+    def toggle_search_history(self):
+        # Same criteria, different scope: force the next search to run
+        self.last_search_criteria = None
+        if self.view == 'search':
+            self.schedule_search()
+
+    def schedule_search(self, event=None):
+        # Debounce keystrokes; only the last one within the window starts a query
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(self.SEARCH_DEBOUNCE_MS, self.run_live_search)
+
+    def run_live_search(self):
+        self.search_job = None
+        if not self.is_loaded():
+            return
+        try:
+            criteria = self.search_criteria()
+        except ValueError:
+            self.update_status("Daily number must be a valid number", "warning")
+            return
+
+        if criteria == self.last_search_criteria:
+            return
+        self.last_search_criteria = criteria
+
+        if not any(criteria.values()) and criteria['daily_sequence'] is None:
+            self.search_generation = None
+            self.load_customers()
+            return
+
+        self.start_search(criteria, explicit=False)
+
+    def cancel_search(self):
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+            self.search_job = None
+        if self.search_generation is not None:
+            self.background_search.cancel()
+            self.search_generation = None
+        self.last_search_criteria = None
+
+    @profiled('search_customers')
+    def search_customers(self):
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+            self.search_job = None
+        if not self.is_loaded():
             return
 
-        for item in self.customer_tree.get_children():
-            self.customer_tree.delete(item)
-        
         try:
-            cursor = self.conn.cursor()
-            conditions = []
-            params = []
-            
-            if name:
-                conditions.append("name LIKE ?")
-                params.append(f'%{name}%')
-            
-            if customer_id:
-                conditions.append("id LIKE ?")
-                params.append(f'%{customer_id}%')
-            
-            if daily_seq:
-                try:
-                    seq_num = int(daily_seq)
-                    conditions.append("daily_sequence = ?")
-                    params.append(seq_num)
-                except ValueError:
-                    messagebox.showerror("Invalid Input", "Daily number must be a valid number.", parent=self.root)
-                    return
-            
-            query = f'''
-                SELECT daily_sequence, id, name, created_at 
-                FROM customers 
-                WHERE {' AND '.join(conditions)} 
-                ORDER BY created_at DESC
-            '''
-            
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
-            
-            for i, row in enumerate(rows):
-                formatted_row = (f"#{row[0]:02d}" if row[0] > 0 else "#00", row[1], row[2], row[3])
-                tags = ('evenrow',) if i % 2 == 0 else ('oddrow',)
-                self.customer_tree.insert('', 'end', values=formatted_row, tags=tags)
-            
-            self.customer_tree.tag_configure('evenrow', background=self.colors['gray_50'])
-            self.customer_tree.tag_configure('oddrow', background=self.colors['white'])
-            
-            if not rows:
-                messagebox.showinfo("No Results", "No customers found matching your search criteria.", parent=self.root)
-                self.update_status("No customers found", "warning")
-            else:
-                self.update_status(f"Found {len(rows)} customer(s)", "success")
-                
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error searching customers: {str(e)}", parent=self.root)
+            criteria = self.search_criteria()
+        except ValueError:
+            messagebox.showerror("Invalid Input", "Daily number must be a valid number.", parent=self.root)
+            return
+
+        if not criteria['name'] and not criteria['customer_id'] and criteria['daily_sequence'] is None:
+            messagebox.showwarning("Search Required", "Please enter at least one search criteria.", parent=self.root)
+            return
+
+        self.last_search_criteria = criteria
+        self.start_search(criteria, explicit=True)
+
+    def start_search(self, criteria, explicit):
+        polling = self.search_generation is not None
+        self.search_generation = self.background_search.submit(history=self.search_history.get(), **criteria)
+        self.explicit_search = explicit
+        self.search_started = time.perf_counter()
+        self.update_status("Searching...", "info")
+        if not polling:
+            self.root.after(self.SEARCH_POLL_MS, self.poll_search_results)
+
+    def poll_search_results(self):
+        if self.search_generation is None:
+            return
+        result = self.background_search.latest()
+        if result is None:
+            self.root.after(self.SEARCH_POLL_MS, self.poll_search_results)
+            return
+
+        self.search_generation = None
+        _, rows, error = result
+        if error is not None:
+            if self.explicit_search:
+                messagebox.showerror("Database Error", f"Error searching customers: {str(error)}", parent=self.root)
             self.update_status("Error searching customers", "error")
+            return
+
+        count = self.show_cached_rows(RowCache(rows), descending=False)
+        self.view = 'search'
+        # Keystroke-to-results latency, including the worker thread and the Treeview refresh
+        PROFILER.record('search_results', time.perf_counter() - self.search_started)
+        if not count:
+            if self.explicit_search:
+                messagebox.showinfo("No Results", "No customers found matching your search criteria.", parent=self.root)
+            self.update_status("No customers found", "warning")
+        else:
+            limited = " (best matches shown)" if count >= self.background_search.limit else ""
+            self.update_status(f"Found {count} customer(s){limited}", "success")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Customer Management System")
+    parser.add_argument('--tts', choices=sorted(SYNTHESIZERS), default='gtts',
+                        help="speech backend for announcements (default: gtts)")
+    parser.add_argument('--api-port', type=int,
+                        help="also serve the HTTP/JSON API for displays and kiosks on this port")
+    parser.add_argument('--api-host', default='127.0.0.1')
+    parser.add_argument('--api-allow-origin',
+                        help="web origin allowed to call the API from a browser (default: none)")
+    parser.add_argument('--archive-after-days', type=int,
+                        help="move customers older than this many days to archive files while idle")
+    parser.add_argument('--archive-granularity', choices=['year', 'month'], default='year')
+    parser.add_argument('--backup-every-minutes', type=int,
+                        help="also back up customers.db into backups/ this often while the app runs")
+    parser.add_argument('--backup-keep', type=int, default=7, help="how many backups to keep (default: 7)")
+    parser.add_argument('--backup-compress', action='store_true', help="gzip the backups")
+    parser.add_argument('--commit-window-ms', type=float, default=0,
+                        help="how long a registration may wait for others to share its commit, e.g. on slow disks")
+    parser.add_argument('--startup-profile', action='store_true',
+                        help="print how long each startup phase took")
+    args = parser.parse_args()
+
+    startup = StartupTimer(STARTED) if args.startup_profile else None
+    if startup is not None:
+        startup.mark("modules imported")
     root = tk.Tk()
-    app = CustomerApp(root)
+    app = CustomerApp(root, announcer=Announcer(SYNTHESIZERS[args.tts]()), startup=startup,
+                      commit_window=args.commit_window_ms / 1000)
+    if startup is not None:
+        # Idle callbacks run in order, so this one fires after Tk's own first layout and redraw
+        root.after_idle(lambda: startup.mark("window drawn"))
+    if args.api_port is not None:
+        app.serve_api(args.api_host, args.api_port, args.api_allow_origin)
+    if args.archive_after_days is not None:
+        app.start_archiver(args.archive_after_days, args.archive_granularity)
+    app.configure_backups(args.backup_keep, args.backup_compress, args.backup_every_minutes)
     root.mainloop()
\ No newline at end of file
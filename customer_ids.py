@@ -0,0 +1,73 @@
+"""Customer ID generators.
+
+The default scheme is time-ordered: six base-32 characters of seconds since
+2024-01-01 followed by a three-character counter, e.g. `0B3KQ7M2A`. New IDs
+sort after old ones, so inserts land at the right edge of the id index
+instead of scattering across it. The alphabet is Crockford's base 32, so IDs
+never contain I, L, O or U and are easy to read out and type.
+
+Generators are plain callables; a clash with an existing ID, such as a legacy
+random one, is handled by the caller drawing another.
+"""
+import random
+import string
+import threading
+import time
+
+CROCKFORD = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+EPOCH = 1704067200  # 2024-01-01 00:00:00 UTC
+TIME_DIGITS = 6     # 32**6 seconds, about 34 years
+COUNTER_DIGITS = 3  # 32768 IDs per second before borrowing from the next one
+
+
+def encode(value, digits):
+    chars = []
+    for _ in range(digits):
+        value, remainder = divmod(value, 32)
+        chars.append(CROCKFORD[remainder])
+    return ''.join(reversed(chars))
+
+
+class RandomIdGenerator:
+    """The original scheme: 8 random uppercase letters and digits."""
+
+    alphabet = string.ascii_uppercase + string.digits
+
+    def __init__(self, length=8):
+        self.length = length
+
+    def __call__(self):
+        return ''.join(random.choices(self.alphabet, k=self.length))
+
+
+class TimeOrderedIdGenerator:
+    """Monotonic time-prefixed IDs; safe to share between threads.
+
+    The counter starts at a random point in the lower half of its range each
+    second, so two stations registering in the same second rarely meet. A
+    burst of more than the remaining counter values moves on to the next
+    second early rather than repeating.
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.second = -1
+        self.counter = 0
+        self.limit = 32 ** COUNTER_DIGITS
+
+    def __call__(self):
+        with self.lock:
+            second = int(self.clock()) - EPOCH
+            if second > self.second:
+                self.second = second
+                self.counter = random.randrange(self.limit // 2)
+            else:
+                self.counter += 1
+                if self.counter >= self.limit:
+                    self.second += 1
+                    self.counter = random.randrange(self.limit // 2)
+            return encode(self.second, TIME_DIGITS) + encode(self.counter, COUNTER_DIGITS)
+
+
+ID_GENERATORS = {'time': TimeOrderedIdGenerator, 'random': RandomIdGenerator}
@@ -0,0 +1,155 @@
+"""Registration volume dashboard: a bar chart on a Tk Canvas fed only by the stats tables."""
+import math
+import tkinter as tk
+from datetime import date, timedelta
+from tkinter import ttk
+
+from stats import fill_days
+
+VIEWS = {'Per day': 'day', 'Per week': 'week', 'Per month': 'month', 'By hour of day': 'hour'}
+RANGES = {'Last 30 days': 30, 'Last 90 days': 90, 'Last year': 365, 'All time': None}
+MARGIN_LEFT, MARGIN_RIGHT, MARGIN_TOP, MARGIN_BOTTOM = 60, 20, 30, 40
+
+
+class VolumeDashboard:
+    def __init__(self, root, stats, colors, on_close=None):
+        self.stats = stats
+        self.colors = colors
+        self.on_close = on_close
+        self.bars = []
+        self.per_bar = 1
+        self.layout = None
+        self.redraw_job = None
+
+        self.window = tk.Toplevel(root)
+        self.window.title("📈 Customer Volumes")
+        self.window.geometry("900x480")
+        self.window.columnconfigure(0, weight=1)
+        self.window.rowconfigure(1, weight=1)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        controls = ttk.Frame(self.window, padding="10")
+        controls.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        controls.columnconfigure(2, weight=1)
+        self.view = tk.StringVar(value='Per day')
+        self.range = tk.StringVar(value='Last 90 days')
+        for column, (variable, values) in enumerate(((self.view, VIEWS), (self.range, RANGES))):
+            box = ttk.Combobox(controls, textvariable=variable, values=list(values), state='readonly', width=16)
+            box.grid(row=0, column=column, padx=(0, 10))
+            box.bind('<<ComboboxSelected>>', lambda e: self.reload())
+        self.summary = ttk.Label(controls, text="")
+        self.summary.grid(row=0, column=2, sticky=tk.E)
+
+        self.canvas = tk.Canvas(self.window, background=colors['white'], highlightthickness=0)
+        self.canvas.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.canvas.bind('<Configure>', lambda e: self.schedule_redraw())
+        self.canvas.bind('<Motion>', self.hover)
+        self.canvas.bind('<Leave>', lambda e: self.canvas.delete('hover'))
+        self.reload()
+
+    def lift(self):
+        self.window.deiconify()
+        self.window.lift()
+
+    def close(self):
+        self.window.destroy()
+        if self.on_close is not None:
+            self.on_close()
+
+    def first_day(self):
+        days = RANGES[self.range.get()]
+        return (date.today() - timedelta(days=days - 1)).isoformat() if days else None
+
+    def reload(self):
+        view, first = VIEWS[self.view.get()], self.first_day()
+        if view == 'day':
+            self.bars = fill_days(self.stats.daily(first), first, date.today().isoformat())
+        elif view == 'week':
+            self.bars = self.stats.weekly(first)
+        elif view == 'month':
+            self.bars = self.stats.monthly(first)
+        else:
+            self.bars = [(f"{hour:02d}:00", n) for hour, n in self.stats.by_hour(first)]
+
+        total = sum(n for _, n in self.bars)
+        open_days = self.stats.open_days(first)
+        if view == 'hour' or not self.bars:
+            busiest = ""
+        else:
+            label, peak = max(self.bars, key=lambda bar: bar[1])
+            busiest = f"   busiest {label}: {peak:,}"
+        average = f"   {total / open_days:,.1f} per open day" if open_days else ""
+        self.summary.config(text=f"Total {total:,}{average}{busiest}")
+        self.schedule_redraw()
+
+    def schedule_redraw(self):
+        # Resizing fires <Configure> per pixel; draw once per idle pass
+        if self.redraw_job is None:
+            self.redraw_job = self.canvas.after_idle(self.redraw)
+
+    def redraw(self):
+        self.redraw_job = None
+        canvas = self.canvas
+        canvas.delete('all')
+        width, height = canvas.winfo_width(), canvas.winfo_height()
+        plot_width = width - MARGIN_LEFT - MARGIN_RIGHT
+        plot_height = height - MARGIN_TOP - MARGIN_BOTTOM
+        if not self.bars or plot_width < 10 or plot_height < 10:
+            canvas.create_text(width / 2, height / 2, text="No registrations in this range",
+                               fill=self.colors['gray_600'])
+            self.layout = None
+            return
+
+        # More bars than pixels: each drawn bar shows the busiest of the ones it covers
+        self.per_bar = math.ceil(len(self.bars) / plot_width)
+        shown = [max(self.bars[i:i + self.per_bar], key=lambda bar: bar[1])
+                 for i in range(0, len(self.bars), self.per_bar)]
+        top = nice_ceiling(max(n for _, n in shown))
+        step = plot_width / len(shown)
+        bottom = MARGIN_TOP + plot_height
+        self.layout = (shown, step)
+
+        for i in range(5):
+            y = bottom - plot_height * i / 4
+            canvas.create_line(MARGIN_LEFT, y, width - MARGIN_RIGHT, y, fill=self.colors['gray_200'])
+            canvas.create_text(MARGIN_LEFT - 8, y, text=f"{top * i // 4:,}", anchor=tk.E,
+                               fill=self.colors['gray_600'])
+
+        gap = 1 if step >= 4 else 0
+        for i, (_, n) in enumerate(shown):
+            if n:
+                x = MARGIN_LEFT + i * step
+                canvas.create_rectangle(x, bottom - plot_height * n / top, x + max(1, step - gap), bottom,
+                                        fill=self.colors['primary_light'], width=0)
+
+        # Roughly one label per 80 pixels
+        every = max(1, math.ceil(80 / step))
+        for i in range(0, len(shown), every):
+            canvas.create_text(MARGIN_LEFT + (i + 0.5) * step, bottom + 14, text=shown[i][0],
+                               fill=self.colors['gray_600'])
+        if self.per_bar > 1:
+            canvas.create_text(width - MARGIN_RIGHT, MARGIN_TOP / 2, anchor=tk.E,
+                               text=f"each bar shows the busiest of {self.per_bar}",
+                               fill=self.colors['gray_600'])
+
+    def hover(self, event):
+        self.canvas.delete('hover')
+        if self.layout is None:
+            return
+        shown, step = self.layout
+        index = int((event.x - MARGIN_LEFT) // step)
+        if 0 <= index < len(shown):
+            label, n = shown[index]
+            self.canvas.create_text(MARGIN_LEFT, MARGIN_TOP / 2, anchor=tk.W, tags='hover',
+                                    text=f"{label}: {n:,}", fill=self.colors['primary'])
+
+
+def nice_ceiling(value):
+    """Round up to 1, 2 or 5 times a power of ten so the axis labels are round numbers."""
+    if value <= 0:
+        return 1
+    magnitude = 10 ** math.floor(math.log10(value))
+    for factor in (1, 2, 5, 10):
+        if value <= factor * magnitude:
+            return max(4, factor * magnitude)
+    return value
@@ -0,0 +1,174 @@
+"""Streaming export of customers to CSV, JSONL or a SQLite snapshot.
+
+    python export.py customers.csv [--from 2024-01-01] [--to 2024-01-31] [--db customers.db]
+
+The format follows the file extension (.csv, .jsonl, .db/.sqlite). Rows are read
+with fetchmany in fixed-size chunks and written as they arrive, so memory use
+does not depend on how many customers are exported.
+"""
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+
+from bulk_import import deferred_search_index
+from migrations import migrate
+from repository import DB_PATH, connect
+from search_engine import CustomerSearch
+
+EXPORT_COLUMNS = ('id', 'name', 'created_at', 'daily_sequence', 'date_added', 'customer_ref')
+CHUNK_SIZE = 5000
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.db': 'sqlite', '.sqlite': 'sqlite'}
+
+
+class ExportProgress:
+    def __init__(self, total=None):
+        self.total = total
+        self.exported = 0
+        self.started = time.perf_counter()
+
+    @property
+    def fraction(self):
+        return min(1.0, self.exported / self.total) if self.total else None
+
+    @property
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.exported / elapsed if elapsed else 0.0
+
+    def summary(self):
+        return f"Exported {self.exported:,} customers at {self.rate:,.0f} rows/s"
+
+
+def format_for(path):
+    return FORMATS.get(os.path.splitext(path)[1].lower(), 'csv')
+
+
+def select_all(conn):
+    # Counted from customers rather than daily_stats, which also covers archived days
+    total = conn.execute("SELECT COUNT(*) FROM customers").fetchone()[0]
+    cursor = conn.execute(f'''
+        SELECT {', '.join(EXPORT_COLUMNS)} FROM customers ORDER BY created_at, id
+    ''')
+    return cursor, total
+
+
+def select_date_range(conn, first_day, last_day):
+    total = conn.execute('''
+        SELECT COUNT(*) FROM customers WHERE date_added BETWEEN ? AND ?
+    ''', (first_day, last_day)).fetchone()[0]
+    cursor = conn.execute(f'''
+        SELECT {', '.join(EXPORT_COLUMNS)} FROM customers
+        WHERE date_added BETWEEN ? AND ?
+        ORDER BY date_added, daily_sequence
+    ''', (first_day, last_day))
+    return cursor, total
+
+
+def select_search(conn, **criteria):
+    # Every match, not just the ranked page shown in the directory
+    return CustomerSearch(conn).cursor(limit=-1, columns=EXPORT_COLUMNS, **criteria), None
+
+
+def chunks(cursor, chunk_size, progress, on_progress, cancelled):
+    while not (cancelled and cancelled()):
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield rows
+        progress.exported += len(rows)
+        if on_progress:
+            on_progress(progress)
+
+
+def write_csv(path, row_chunks):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_COLUMNS)
+        for rows in row_chunks:
+            writer.writerows(rows)
+
+
+def write_jsonl(path, row_chunks):
+    with open(path, 'w', encoding='utf-8') as f:
+        for rows in row_chunks:
+            f.writelines(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + '\n' for row in rows)
+
+
+def write_sqlite(path, row_chunks):
+    # A migrated customers.db, so the snapshot can be opened by the app directly
+    snapshot = sqlite3.connect(path)
+    try:
+        migrate(snapshot)
+        snapshot.execute("BEGIN")
+        with deferred_search_index(snapshot):
+            for rows in row_chunks:
+                snapshot.executemany(f'''
+                    INSERT OR IGNORE INTO customers ({', '.join(EXPORT_COLUMNS)}) VALUES ({', '.join('?' * len(EXPORT_COLUMNS))})
+                ''', rows)
+        snapshot.execute('''
+            INSERT OR REPLACE INTO daily_counters (date_added, last_sequence)
+            SELECT date_added, MAX(daily_sequence) FROM customers GROUP BY date_added
+        ''')
+        snapshot.commit()
+    finally:
+        snapshot.close()
+
+
+WRITERS = {'csv': write_csv, 'jsonl': write_jsonl, 'sqlite': write_sqlite}
+
+
+def export_rows(cursor, path, fmt=None, total=None, on_progress=None, cancelled=None, chunk_size=CHUNK_SIZE):
+    """Write the cursor's rows to `path`; the file only appears once the export completes."""
+    fmt = fmt or format_for(path)
+    progress = ExportProgress(total)
+    tmp_path = path + '.partial'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        WRITERS[fmt](tmp_path, chunks(cursor, chunk_size, progress, on_progress, cancelled))
+        if cancelled and cancelled():
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        cursor.close()
+    return progress
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export customers to CSV, JSONL or a SQLite snapshot")
+    parser.add_argument('path', help="output file; .csv, .jsonl or .db")
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--from', dest='first_day', help="first date_added (YYYY-MM-DD)")
+    parser.add_argument('--to', dest='last_day', help="last date_added (YYYY-MM-DD)")
+    parser.add_argument('--name', default='', help="export the matches of a name search instead")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    migrate(conn)
+    if args.name:
+        cursor, total = select_search(conn, name=args.name)
+    elif args.first_day or args.last_day:
+        cursor, total = select_date_range(conn, args.first_day or '0000-00-00', args.last_day or '9999-99-99')
+    else:
+        cursor, total = select_all(conn)
+
+    def report(progress):
+        print(f"\r{progress.exported:,} rows  {progress.rate:,.0f}/s", end='', file=sys.stderr)
+
+    progress = export_rows(cursor, args.path, total=total, on_progress=report)
+    print(file=sys.stderr)
+    print(progress.summary())
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import queue
+import threading
+import traceback
+
+
+class BackgroundJob:
+    """Runs work(report, cancelled) on a worker thread and hands its progress back to the Tk thread.
+
+    The worker never touches widgets: it reports through a queue that the Tk thread
+    drains with root.after, calling on_progress/on_done/on_error there.
+    """
+
+    def __init__(self, root, work, on_progress=None, on_done=None, on_error=None,
+                 errors=(Exception,), poll_ms=200):
+        self.root = root
+        self.work = work
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.errors = errors
+        self.poll_ms = poll_ms
+        self.messages = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.thread = None
+
+    @property
+    def running(self):
+        return self.thread is not None
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        self.root.after(self.poll_ms, self.poll)
+        return self
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            result = self.work(lambda value: self.messages.put(('progress', value)), self.cancel_event.is_set)
+            self.messages.put(('done', result))
+        except self.errors as e:
+            self.messages.put(('error', e))
+        except Exception as e:
+            # A bug rather than an expected failure: log it, but still finish the job so its
+            # buttons leave their "Cancel" state and running goes back to False
+            traceback.print_exc()
+            self.messages.put(('error', e))
+
+    def poll(self):
+        message = None
+        while True:
+            try:
+                message = self.messages.get_nowait()
+            except queue.Empty:
+                break
+
+        if message is None or message[0] == 'progress':
+            if message is not None and self.on_progress:
+                self.on_progress(message[1])
+            self.root.after(self.poll_ms, self.poll)
+            return
+
+        self.thread = None
+        kind, value = message
+        callback = self.on_done if kind == 'done' else self.on_error
+        if callback:
+            callback(value)
@@ -0,0 +1,286 @@
+import sqlite3
+
+# The trigram tokenizer needs 3.34 and allocate_daily_sequence's RETURNING needs 3.35
+MIN_SQLITE_VERSION = (3, 35, 0)
+
+
+def configure_connection(conn):
+    # WAL lets readers run alongside the writer; NORMAL sync is durable enough under WAL
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA busy_timeout = 5000")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -16000")
+    return conn
+
+
+def create_customers_table(cursor):
+    cursor.execute("PRAGMA table_info(customers)")
+    columns = [column[1] for column in cursor.fetchall()]
+
+    if not columns:
+        cursor.execute('''
+            CREATE TABLE customers (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                daily_sequence INTEGER NOT NULL,
+                date_added TEXT NOT NULL
+            )
+        ''')
+    else:
+        if 'daily_sequence' not in columns:
+            cursor.execute('ALTER TABLE customers ADD COLUMN daily_sequence INTEGER DEFAULT 0')
+        if 'date_added' not in columns:
+            cursor.execute('ALTER TABLE customers ADD COLUMN date_added TEXT DEFAULT ""')
+            cursor.execute('''
+                UPDATE customers
+                SET date_added = substr(created_at, 1, 10)
+                WHERE date_added = ""
+            ''')
+
+
+def add_query_indexes(cursor):
+    # Serves MAX(daily_sequence)/COUNT(*) per day and the today listing
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_customers_day_sequence
+        ON customers (date_added, daily_sequence)
+    ''')
+    # Serves ORDER BY created_at DESC and (created_at, id) keyset paging
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_customers_created_at
+        ON customers (created_at, id)
+    ''')
+
+
+# Kept separate so bulk loaders can drop it for a batch and index the new rows in one statement
+FTS_INSERT_TRIGGER = '''
+    CREATE TRIGGER IF NOT EXISTS customers_fts_insert AFTER INSERT ON customers BEGIN
+        INSERT INTO customers_fts (rowid, name, id, customer_ref)
+        VALUES (new.rowid, new.name, new.id, new.customer_ref);
+    END
+'''
+
+
+def add_search_index(cursor):
+    # Trigram FTS5 shadow of name/id; the trigram tokenizer needs SQLite 3.34+
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts USING fts5(
+            name, id, content='customers', content_rowid='rowid', tokenize='trigram'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS customers_fts_insert AFTER INSERT ON customers BEGIN
+            INSERT INTO customers_fts (rowid, name, id) VALUES (new.rowid, new.name, new.id);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS customers_fts_delete AFTER DELETE ON customers BEGIN
+            INSERT INTO customers_fts (customers_fts, rowid, name, id) VALUES ('delete', old.rowid, old.name, old.id);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS customers_fts_update AFTER UPDATE OF name, id ON customers BEGIN
+            INSERT INTO customers_fts (customers_fts, rowid, name, id) VALUES ('delete', old.rowid, old.name, old.id);
+            INSERT INTO customers_fts (rowid, name, id) VALUES (new.rowid, new.name, new.id);
+        END
+    ''')
+    cursor.execute("INSERT INTO customers_fts (customers_fts) VALUES ('rebuild')")
+
+
+def add_daily_counters(cursor):
+    # One row per day so allocating a daily number is a single-row upsert, not MAX() over the day
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_counters (
+            date_added TEXT PRIMARY KEY,
+            last_sequence INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        INSERT OR REPLACE INTO daily_counters (date_added, last_sequence)
+        SELECT date_added, MAX(daily_sequence) FROM customers GROUP BY date_added
+    ''')
+
+
+def add_daily_stats(cursor):
+    # Per-day customer counts kept current by triggers, so headers never COUNT(*) the table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            date_added TEXT PRIMARY KEY,
+            customers INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS daily_stats_insert AFTER INSERT ON customers BEGIN
+            INSERT INTO daily_stats (date_added, customers) VALUES (new.date_added, 1)
+            ON CONFLICT (date_added) DO UPDATE SET customers = customers + 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS daily_stats_delete AFTER DELETE ON customers BEGIN
+            UPDATE daily_stats SET customers = customers - 1 WHERE date_added = old.date_added;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS daily_stats_update AFTER UPDATE OF date_added ON customers BEGIN
+            UPDATE daily_stats SET customers = customers - 1 WHERE date_added = old.date_added;
+            INSERT INTO daily_stats (date_added, customers) VALUES (new.date_added, 1)
+            ON CONFLICT (date_added) DO UPDATE SET customers = customers + 1;
+        END
+    ''')
+    cursor.execute('''
+        INSERT OR REPLACE INTO daily_stats (date_added, customers)
+        SELECT date_added, COUNT(*) FROM customers GROUP BY date_added
+    ''')
+
+
+def add_hourly_stats(cursor):
+    # Registrations per day and hour of day, for staffing; weeks and months roll up from daily_stats
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS hourly_stats (
+            date_added TEXT NOT NULL,
+            hour INTEGER NOT NULL,
+            customers INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (date_added, hour)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS hourly_stats_insert AFTER INSERT ON customers BEGIN
+            INSERT INTO hourly_stats (date_added, hour, customers)
+            VALUES (new.date_added, CAST(substr(new.created_at, 12, 2) AS INTEGER), 1)
+            ON CONFLICT (date_added, hour) DO UPDATE SET customers = customers + 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS hourly_stats_delete AFTER DELETE ON customers BEGIN
+            UPDATE hourly_stats SET customers = customers - 1
+            WHERE date_added = old.date_added AND hour = CAST(substr(old.created_at, 12, 2) AS INTEGER);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS hourly_stats_update AFTER UPDATE OF date_added, created_at ON customers BEGIN
+            UPDATE hourly_stats SET customers = customers - 1
+            WHERE date_added = old.date_added AND hour = CAST(substr(old.created_at, 12, 2) AS INTEGER);
+            INSERT INTO hourly_stats (date_added, hour, customers)
+            VALUES (new.date_added, CAST(substr(new.created_at, 12, 2) AS INTEGER), 1)
+            ON CONFLICT (date_added, hour) DO UPDATE SET customers = customers + 1;
+        END
+    ''')
+    cursor.execute('''
+        INSERT OR REPLACE INTO hourly_stats (date_added, hour, customers)
+        SELECT date_added, CAST(substr(created_at, 12, 2) AS INTEGER), COUNT(*)
+        FROM customers GROUP BY 1, 2
+    ''')
+
+
+def add_row_counts(cursor):
+    # Rows in the hot customers table (archived days excluded), so the directory never COUNT(*)s it
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS row_counts (
+            table_name TEXT PRIMARY KEY,
+            row_count INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS row_counts_insert AFTER INSERT ON customers BEGIN
+            UPDATE row_counts SET row_count = row_count + 1 WHERE table_name = 'customers';
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS row_counts_delete AFTER DELETE ON customers BEGIN
+            UPDATE row_counts SET row_count = row_count - 1 WHERE table_name = 'customers';
+        END
+    ''')
+    cursor.execute('''
+        INSERT OR REPLACE INTO row_counts (table_name, row_count) SELECT 'customers', COUNT(*) FROM customers
+    ''')
+
+
+def add_customer_refs(cursor):
+    # A repeat visit is a registration row of its own, linked to the customer's first one
+    cursor.execute("PRAGMA table_info(customers)")
+    if 'customer_ref' not in [column[1] for column in cursor.fetchall()]:
+        cursor.execute('ALTER TABLE customers ADD COLUMN customer_ref TEXT')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_customers_ref
+        ON customers (customer_ref) WHERE customer_ref IS NOT NULL
+    ''')
+
+
+def add_ref_to_search_index(cursor):
+    # Searching an ID also finds the customer's repeat visits, which hold it in customer_ref
+    for trigger in ('customers_fts_insert', 'customers_fts_delete', 'customers_fts_update'):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute("DROP TABLE IF EXISTS customers_fts")
+    cursor.execute('''
+        CREATE VIRTUAL TABLE customers_fts USING fts5(
+            name, id, customer_ref, content='customers', content_rowid='rowid', tokenize='trigram'
+        )
+    ''')
+    cursor.execute(FTS_INSERT_TRIGGER)
+    cursor.execute('''
+        CREATE TRIGGER customers_fts_delete AFTER DELETE ON customers BEGIN
+            INSERT INTO customers_fts (customers_fts, rowid, name, id, customer_ref)
+            VALUES ('delete', old.rowid, old.name, old.id, old.customer_ref);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER customers_fts_update AFTER UPDATE OF name, id, customer_ref ON customers BEGIN
+            INSERT INTO customers_fts (customers_fts, rowid, name, id, customer_ref)
+            VALUES ('delete', old.rowid, old.name, old.id, old.customer_ref);
+            INSERT INTO customers_fts (rowid, name, id, customer_ref)
+            VALUES (new.rowid, new.name, new.id, new.customer_ref);
+        END
+    ''')
+    cursor.execute("INSERT INTO customers_fts (customers_fts) VALUES ('rebuild')")
+
+
+# Each entry upgrades the schema by one version; append, never reorder.
+MIGRATIONS = [
+    create_customers_table,
+    add_query_indexes,
+    add_search_index,
+    add_daily_counters,
+    add_daily_stats,
+    add_hourly_stats,
+    add_row_counts,
+    add_customer_refs,
+    add_ref_to_search_index,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def check_sqlite_version(version=sqlite3.sqlite_version_info):
+    if version < MIN_SQLITE_VERSION:
+        raise sqlite3.NotSupportedError(
+            f"SQLite {'.'.join(map(str, MIN_SQLITE_VERSION))} or newer is required; "
+            f"this Python uses {'.'.join(map(str, version))}")
+
+
+def migrate(conn, target=SCHEMA_VERSION):
+    check_sqlite_version()
+    version = schema_version(conn)
+    if version > SCHEMA_VERSION:
+        raise sqlite3.DatabaseError(
+            f"customers.db schema version {version} is newer than this app supports ({SCHEMA_VERSION})")
+
+    for number, migration in enumerate(MIGRATIONS[version:target], start=version + 1):
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    if version < target:
+        conn.execute("PRAGMA analysis_limit = 1000")
+        conn.execute("ANALYZE")
+    return schema_version(conn)
@@ -0,0 +1,251 @@
+"""In-memory trigram index over customer names, for spotting duplicates while a name is typed.
+
+Every distinct word of every name is indexed by its character trigrams, and
+each word keeps the list of distinct names using it. A lookup finds, for
+each typed word, the closest known words by trigram similarity (the last
+word also matches as a prefix while it is still being typed), intersects
+their name lists starting from the rarest word, and scores the surviving
+names by Dice similarity of their full-name trigrams. The word vocabulary
+stays small however many customers there are, so lookups stay in the low
+milliseconds across a million names. Customers sharing a name are chained
+to it, newest first, and adding one only appends to a few arrays.
+"""
+import heapq
+import sys
+from array import array
+from collections import Counter
+
+MIN_QUERY_LENGTH = 3
+# Narrowing by another word checks each candidate's own words when there are this many times
+# fewer candidates than names using the word's look-alikes, and scans those name lists otherwise
+CHECK_EACH_RATIO = 8
+# A vague query (one common first name, say) can fit thousands of names; only the newest are scored
+SCORE_LIMIT = 300
+# Only the closest known words stand in for each typed word
+WORD_LIMIT = 25
+
+
+def normalize(name):
+    return ' '.join(name.split()).casefold()
+
+
+def trigrams(text, partial=False):
+    """Trigrams of `text` padded at the start, and at the end unless it is still being typed."""
+    padded = f"  {text}" if partial else f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    def __init__(self, rows=()):
+        # Per distinct name
+        self.keys = {}
+        self.names = []
+        self.sizes = array('H')
+        self.latest = array('i')
+        # Word ids of name k are name_words[word_starts[k]:word_starts[k + 1]]
+        self.word_starts = array('i')
+        self.name_words = array('i')
+        # Per distinct word: the names using it, and trigram -> words containing it
+        self.words = {}
+        self.word_list = []
+        self.word_sizes = array('H')
+        self.word_names = []
+        self.postings = {}
+        # Per customer
+        self.ids = []
+        self.days = []
+        self.sequences = array('i')
+        self.key_of = array('i')
+        self.previous = array('i')
+        self.day_strings = {}
+        self.extend(rows)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def extend(self, rows):
+        for row in rows:
+            self.add(*row)
+
+        """Index one customer visit; returns its position, as used by customer()."""
+        """Index one customer; returns its position for move()."""
+        normalized = normalize(name)
+        key = self.keys.get(normalized)
+        if key is None:
+            key = self.keys[normalized] = len(self.names)
+            self.names.append(name)
+            self.sizes.append(min(len(trigrams(normalized)), 65535))
+            self.latest.append(-1)
+            self.word_starts.append(len(self.name_words))
+            for word in set(normalized.split(' ')):
+                word_id = self.word_id(word)
+                self.word_names[word_id].append(key)
+                self.name_words.append(word_id)
+        position = len(self.ids)
+        self.ids.append(customer_id)
+        # Every customer of a day shares one string object
+        self.days.append(self.day_strings.setdefault(day, day))
+        self.sequences.append(daily_sequence)
+        self.key_of.append(key)
+        self.previous.append(self.latest[key])
+        self.latest[key] = position
+        return position
+
+    def word_id(self, word):
+        word_id = self.words.get(word)
+        if word_id is None:
+            word_id = self.words[word] = len(self.word_list)
+            grams = trigrams(word)
+            self.word_list.append(word)
+            self.word_sizes.append(min(len(grams), 65535))
+            self.word_names.append(array('i'))
+            for gram in grams:
+                posting = self.postings.get(gram)
+                if posting is None:
+                    posting = self.postings[gram] = array('i')
+                posting.append(word_id)
+        return word_id
+
+    def customer(self, position):
+        """(daily_sequence, id, name, day) for an indexed customer."""
+        return (self.sequences[position], self.ids[position],
+                self.names[self.key_of[position]], self.days[position])
+
+    def customers(self, key):
+        position = self.latest[key]
+        while position != -1:
+            yield position
+            position = self.previous[position]
+
+    def named(self, name):
+        """Positions of customers with exactly this name (ignoring case and spacing), newest first."""
+        key = self.keys.get(normalize(name))
+        return [] if key is None else list(self.customers(key))
+
+    def similar_words(self, word, partial=False, threshold=0.5):
+        """Ids of up to WORD_LIMIT known words most similar to `word`, or starting like it when `partial`.
+
+        Complete words are compared by Dice similarity of their trigrams; a partial
+        word by the share of its trigrams the known word contains. Ties go to the
+        word more names use.
+        """
+        grams = trigrams(word, partial)
+        size = len(grams)
+        # The vocabulary is small next to the names, so every posting can be counted
+        counts = Counter()
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting is not None:
+                counts.update(posting)
+        word_sizes, word_names = self.word_sizes, self.word_names
+        if partial:
+            scored = [(shared / size, word_id) for word_id, shared in counts.items()]
+        else:
+            scored = [(2 * shared / (size + word_sizes[word_id]), word_id) for word_id, shared in counts.items()]
+        best = heapq.nlargest(WORD_LIMIT, (item for item in scored if item[0] >= threshold),
+                              key=lambda item: (item[0], len(word_names[item[1]])))
+        return [word_id for _, word_id in best]
+
+    def candidates(self, normalized, partial):
+        """Name keys containing a word similar to each recognisable word of the query."""
+        words = normalized.split(' ')
+        constraints = []
+        for i, word in enumerate(words):
+            last = partial and i == len(words) - 1
+            # Initials and a barely started last word narrow nothing down
+            if len(word) < (MIN_QUERY_LENGTH if last else 2):
+                continue
+            similar = self.similar_words(word)
+            if last:
+                # Either still being typed, or finished with a slip in its first letters
+                similar = list(set(similar).union(self.similar_words(word, partial=True)))
+            # A word like nothing known (two words run together, say) is left to the final score
+            if similar:
+                constraints.append(similar)
+        if not constraints:
+            return set()
+
+        word_names = self.word_names
+        constraints.sort(key=lambda similar: sum(len(word_names[w]) for w in similar))
+        if len(constraints) == 1:
+            # Name lists are in the order names first appeared, so their tails are the newest
+            candidates = set()
+            for word_id in constraints[0]:
+                candidates.update(word_names[word_id][-SCORE_LIMIT:])
+            return candidates
+        candidates = set()
+        for word_id in constraints[0]:
+            candidates.update(word_names[word_id])
+        for similar in constraints[1:]:
+            if not candidates:
+                break
+            if len(candidates) * CHECK_EACH_RATIO < sum(len(word_names[w]) for w in similar):
+                allowed = set(similar)
+                starts, name_words, last = self.word_starts, self.name_words, len(self.names) - 1
+                candidates = {key for key in candidates if not allowed.isdisjoint(
+                    name_words[starts[key]:starts[key + 1] if key < last else len(name_words)])}
+            else:
+                narrowed = set()
+                for word_id in similar:
+                    narrowed.update(candidates.intersection(word_names[word_id]))
+                candidates = narrowed
+        return candidates
+
+    def similar_names(self, name, threshold=0.7, limit=10):
+        """[(score, name key)] for names with Dice similarity >= threshold, best first.
+
+        `name` is taken as typed: unless it ends in a space, its last word may be unfinished.
+        """
+        normalized = normalize(name)
+        if len(normalized) < MIN_QUERY_LENGTH:
+            return []
+        partial = not name[-1:].isspace()
+        grams = trigrams(normalized, partial)
+        size = len(grams)
+        largest = (2 - threshold) * size / threshold
+        scored = []
+        sizes, names = self.sizes, self.names
+        candidates = self.candidates(normalized, partial)
+        if len(candidates) > SCORE_LIMIT:
+            candidates = set(heapq.nlargest(SCORE_LIMIT, candidates, key=self.latest.__getitem__))
+        exact = self.keys.get(normalized)
+        if exact is not None:
+            candidates.add(exact)
+        for key in candidates:
+            if not partial and sizes[key] > largest:
+                continue
+            other = normalize(names[key])
+            # An unfinished query is compared with as much of the name as has been typed
+            other_grams = trigrams(other[:len(normalized)], True) if partial else trigrams(other)
+            score = 2 * len(grams & other_grams) / (size + len(other_grams))
+            if score >= threshold:
+                scored.append((score, key))
+        scored.sort(key=lambda item: (-item[0], -self.latest[item[1]]))
+        return scored[:limit]
+
+    def matches(self, name, threshold=0.7, limit=6, per_name=3):
+        """[(score, position)] of customers with similar names; recent customers first within a name.
+
+        A customer with several visits is listed once, at their latest one.
+        """
+        results = []
+        for score, key in self.similar_names(name, threshold, limit):
+            seen = set()
+            for position in self.customers(key):
+                if len(seen) == per_name:
+                    break
+                if self.ids[position] not in seen:
+                    seen.add(self.ids[position])
+                    results.append((score, position))
+        results.sort(key=lambda item: (-item[0], -item[1]))
+        return results[:limit]
+
+    def memory(self):
+        """Approximate bytes used by the index structures, not counting the shared strings."""
+        total = sum(map(sys.getsizeof, (self.keys, self.names, self.sizes, self.latest, self.word_starts,
+                                        self.name_words, self.words,
+                                        self.word_list, self.word_sizes, self.word_names, self.postings,
+                                        self.ids, self.days, self.sequences, self.key_of, self.previous)))
+        total += sum(map(sys.getsizeof, self.postings.values()))
+        total += sum(map(sys.getsizeof, self.word_names))
+        return total
@@ -0,0 +1,189 @@
+"""Latency histograms for SQL statements, UI refreshes and announcements, with a slow-operation log.
+
+Open connections with `connect(path, factory=ProfiledConnection)` to time every
+statement; wrap UI paths in `PROFILER.timed(name)` or decorate them with
+`@profiled(name)`. Statements slower than the threshold are logged together
+with their EXPLAIN QUERY PLAN.
+"""
+import functools
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+SLOW_MS = 100
+WINDOW = 1000
+SLOW_LOG_SIZE = 200
+
+
+def percentile(sorted_samples, fraction):
+    if not sorted_samples:
+        return None
+    index = min(len(sorted_samples) - 1, int(fraction * len(sorted_samples)))
+    return sorted_samples[index]
+
+
+def statement_name(sql):
+    return 'sql: ' + re.sub(r'\s+', ' ', sql).strip()[:120]
+
+
+class Profiler:
+    """Rolling latency windows per operation name; safe to record from any thread."""
+
+    def __init__(self, slow_ms=SLOW_MS, window=WINDOW):
+        self.slow_ms = slow_ms
+        self.window = window
+        self.samples = {}
+        self.counts = {}
+        self.slow_log = deque(maxlen=SLOW_LOG_SIZE)
+        self.lock = threading.Lock()
+
+    def record(self, name, seconds, sql=None, plan=None):
+        ms = seconds * 1000
+        with self.lock:
+            if name not in self.samples:
+                self.samples[name] = deque(maxlen=self.window)
+                self.counts[name] = 0
+            self.samples[name].append(ms)
+            self.counts[name] += 1
+            if ms >= self.slow_ms:
+                entry = {'name': name, 'ms': round(ms, 3), 'at': datetime.now().isoformat(timespec='seconds')}
+                if sql is not None:
+                    entry['sql'] = sql
+                    entry['plan'] = plan
+                self.slow_log.append(entry)
+
+    def is_slow(self, seconds):
+        return seconds * 1000 >= self.slow_ms
+
+    @contextmanager
+    def timed(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def stats(self, name):
+        with self.lock:
+            samples = sorted(self.samples.get(name, ()))
+            count = self.counts.get(name, 0)
+        if not samples:
+            return None
+        return {'count': count, 'p50': percentile(samples, 0.5), 'p99': percentile(samples, 0.99),
+                'max': samples[-1]}
+
+    def names(self):
+        with self.lock:
+            return list(self.samples)
+
+    def sql_stats(self):
+        # Every statement together, for the status bar overlay
+        with self.lock:
+            samples = sorted(ms for name, window in self.samples.items() if name.startswith('sql: ')
+                             for ms in window)
+        if not samples:
+            return None
+        return {'p50': percentile(samples, 0.5), 'p99': percentile(samples, 0.99)}
+
+    def snapshot(self):
+        with self.lock:
+            slow = list(self.slow_log)
+        return {
+            'taken_at': datetime.now().isoformat(timespec='seconds'),
+            'slow_ms': self.slow_ms,
+            'operations': {name: self.stats(name) for name in sorted(self.names())},
+            'slow_log': slow,
+        }
+
+    def dump(self, path, **extra):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({**self.snapshot(), **extra}, f, ensure_ascii=False, indent=2)
+        return path
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.counts.clear()
+            self.slow_log.clear()
+
+
+PROFILER = Profiler()
+
+
+def profiled(name):
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with PROFILER.timed(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def explain(conn, sql, params):
+    try:
+        rows = sqlite3.Connection.execute(conn, 'EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+    except (sqlite3.Error, ValueError):
+        return None
+    return [row[-1] for row in rows]
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    def execute(self, sql, params=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self.connection.record(sql, params, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_params):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_params)
+        finally:
+            self.connection.record(sql, None, time.perf_counter() - started)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """Times every statement into PROFILER; the time covers preparing and stepping to the first row."""
+
+    profiler = PROFILER
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def record(self, sql, params, seconds):
+        plan = None
+        if self.profiler.is_slow(seconds) and params is not None:
+            plan = explain(self, sql, params)
+        self.profiler.record(statement_name(sql), seconds, sql=sql, plan=plan)
+
+
+class StartupTimer:
+    """Timeline of startup phases, in milliseconds since `started`; marks may come from any thread."""
+
+    def __init__(self, started=None):
+        self.started = started if started is not None else time.perf_counter()
+        self.marks = []
+
+    def mark(self, phase):
+        self.marks.append((phase, (time.perf_counter() - self.started) * 1000))
+
+    def report(self):
+        lines = ["Startup profile (ms since launch):"]
+        previous = 0.0
+        for phase, at in self.marks:
+            lines.append(f"  {at:8.1f}  (+{at - previous:7.1f})  {phase}")
+            previous = at
+        return "\n".join(lines)
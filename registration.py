@@ -0,0 +1,122 @@
+import random
+import sqlite3
+import time
+from datetime import datetime
+
+
+def is_busy(error):
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+def is_duplicate_id(error):
+    return 'customers.id' in str(error)
+
+
+def begin_immediate(conn, attempts=10, base_delay=0.005):
+    """Take the write lock, retrying SQLITE_BUSY with jittered exponential backoff."""
+    for attempt in range(attempts):
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            return
+        except sqlite3.OperationalError as e:
+            if not is_busy(e) or attempt == attempts - 1:
+                raise
+            time.sleep(base_delay * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+
+def allocate_daily_sequence(conn, day):
+    # Must run inside a write transaction so the counter and the row using it commit together;
+    # RETURNING needs SQLite 3.35+ (checked by migrate)
+    return conn.execute('''
+        INSERT INTO daily_counters (date_added, last_sequence) VALUES (?, 1)
+        ON CONFLICT (date_added) DO UPDATE SET last_sequence = last_sequence + 1
+        RETURNING last_sequence
+    ''', (day,)).fetchone()[0]
+
+
+def insert_registration(conn, customer_id, name, now, customer_ref=None):
+    created_at = now.strftime("%Y-%m-%d %H:%M:%S")
+    today = now.strftime("%Y-%m-%d")
+    daily_sequence = allocate_daily_sequence(conn, today)
+    conn.execute('''
+        INSERT INTO customers (id, name, created_at, daily_sequence, date_added, customer_ref)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (customer_id, name, created_at, daily_sequence, today, customer_ref))
+    return customer_id, daily_sequence, created_at
+
+
+def register_customer(conn, customer_id, name, now=None, attempts=10, base_delay=0.005, new_id=None):
+    """Insert a customer and allocate its daily number in one BEGIN IMMEDIATE transaction.
+
+    Returns (customer_id, daily_sequence, created_at). SQLITE_BUSY is retried with
+    jittered exponential backoff, so concurrent stations never share a daily number.
+    If the ID is already taken and `new_id` is given, another one is drawn and the
+    registration retried instead of failing.
+    """
+    for attempt in range(attempts):
+        begin_immediate(conn, attempts, base_delay)
+        try:
+            result = insert_registration(conn, customer_id, name, now or datetime.now())
+            conn.commit()
+            return result
+        except sqlite3.IntegrityError as e:
+            conn.rollback()
+            if new_id is None or not is_duplicate_id(e) or attempt == attempts - 1:
+                raise
+            customer_id = new_id()
+        except BaseException:
+            conn.rollback()
+            raise
+
+
+def register_batch(conn, registrations, attempts=10, base_delay=0.005, new_id=None):
+    """Register several (customer_id, name, now, customer_ref) tuples in a single transaction and commit.
+
+    customer_ref is None for a new customer, or the ID of the customer a repeat
+    visit belongs to. Daily numbers are handed out in list order. Each registration runs in its own
+    savepoint, so one that fails only loses itself: the result list holds
+    (customer_id, daily_sequence, created_at) or the sqlite3.Error for each entry.
+    """
+    begin_immediate(conn, attempts, base_delay)
+    results = []
+    try:
+        for customer_id, name, now, customer_ref in registrations:
+            for attempt in range(attempts):
+                conn.execute("SAVEPOINT registration")
+                try:
+                    result = insert_registration(conn, customer_id, name, now or datetime.now(), customer_ref)
+                    conn.execute("RELEASE registration")
+                    break
+                except sqlite3.Error as e:
+                    conn.execute("ROLLBACK TO registration")
+                    conn.execute("RELEASE registration")
+                    result = e
+                    if new_id is None or not is_duplicate_id(e):
+                        break
+                    customer_id = new_id()
+            results.append(result)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return results
+
+
+def customer_of(conn, customer_id):
+    """The customer a registration belongs to: its customer_ref for a repeat visit, else its own ID."""
+    row = conn.execute("SELECT customer_ref FROM customers WHERE id = ?", (customer_id,)).fetchone()
+    return row[0] if row and row[0] else customer_id
+
+
+def visit_on(conn, customer_id, day):
+    """(daily_sequence, id) of the customer's registration on `day`, first visit or repeat, or None."""
+    return conn.execute('''
+        SELECT daily_sequence, id FROM customers
+        WHERE (id = ? OR customer_ref = ?) AND date_added = ? ORDER BY daily_sequence LIMIT 1
+    ''', (customer_id, customer_id, day)).fetchone()
+
+
+def peek_next_daily_sequence(conn, day):
+    row = conn.execute("SELECT last_sequence FROM daily_counters WHERE date_added = ?", (day,)).fetchone()
+    return (row[0] if row else 0) + 1
@@ -0,0 +1,237 @@
+import sqlite3
+from datetime import date
+
+from customer_ids import TimeOrderedIdGenerator
+from migrations import configure_connection, migrate
+from registration import customer_of, peek_next_daily_sequence, register_customer, visit_on
+from search_engine import CUSTOMER_ID, CustomerSearch
+
+DB_PATH = 'customers.db'
+# SQLite's default limit on host parameters per statement is 32766 (999 before 3.32)
+IN_CHUNK = 900
+# What every view shows of a customer row; the id field is the ID the customer is known by
+CUSTOMER_FIELDS = ('daily_sequence', 'id', 'name', 'created_at')
+CUSTOMER_COLUMNS = ('daily_sequence', CUSTOMER_ID, 'name', 'created_at')
+# Shared by every connection in the process so its IDs stay monotonic
+DEFAULT_ID_GENERATOR = TimeOrderedIdGenerator()
+
+
+def connect(path=DB_PATH, **kwargs):
+    return configure_connection(sqlite3.connect(path, **kwargs))
+
+
+def generate_customer_id():
+    return DEFAULT_ID_GENERATOR()
+
+
+def existing_ids(conn, ids):
+    found = set()
+    ids = list(ids)
+    for start in range(0, len(ids), IN_CHUNK):
+        chunk = ids[start:start + IN_CHUNK]
+        placeholders = ', '.join('?' * len(chunk))
+        found.update(row[0] for row in conn.execute(
+            f"SELECT id FROM customers WHERE id IN ({placeholders})", chunk))
+    return found
+
+
+def today_string():
+    return date.today().strftime("%Y-%m-%d")
+
+
+class KeysetQuery:
+    """An ordered customers query that can be paged forwards and backwards from any row key."""
+
+    def __init__(self, conn, keys, where="", params=(), descending=True, columns=CUSTOMER_COLUMNS):
+        self.conn = conn
+        self.columns = tuple(columns)
+        self.keys = tuple(keys)
+        self.where = where
+        self.params = tuple(params)
+        self.descending = descending
+        # Descending queries show new registrations first; see VirtualTreeview.prepend
+        self.newest_first = descending
+        # Keys sampled every anchor_step rows, so jumps skip at most that many rows
+        self.anchor_step = None
+        self.anchors = []
+        self.prepended = 0
+
+    def _select(self, key=None, backwards=False, limit=None, offset=None):
+        conditions = [self.where] if self.where else []
+        params = list(self.params)
+        descending = self.descending != backwards
+
+        if key is not None:
+            placeholders = ', '.join('?' for _ in self.keys)
+            op = '<' if descending else '>'
+            conditions.append(f"({', '.join(self.keys)}) {op} ({placeholders})")
+            params.extend(key)
+
+        direction = 'DESC' if descending else 'ASC'
+        query = f"SELECT {', '.join(self.columns + self.keys)} FROM customers"
+        if conditions:
+            query += f" WHERE {' AND '.join(f'({c})' for c in conditions)}"
+        query += f" ORDER BY {', '.join(f'{k} {direction}' for k in self.keys)}"
+        query += " LIMIT ?"
+        params.append(limit)
+        if offset:
+            query += " OFFSET ?"
+            params.append(offset)
+
+        n = len(self.columns)
+        rows = [(row[:n], row[n:]) for row in self.conn.execute(query, params)]
+        if backwards:
+            rows.reverse()
+        return rows
+
+    def count(self):
+        if not self.where:
+            # Trigger-maintained, so refreshing the full directory costs the same at any size
+            return self.conn.execute(
+                "SELECT row_count FROM row_counts WHERE table_name = 'customers'").fetchone()[0]
+        return self.conn.execute(f"SELECT COUNT(*) FROM customers WHERE {self.where}", self.params).fetchone()[0]
+
+    def first(self, limit):
+        return self._select(limit=limit)
+
+    def after(self, key, limit):
+        return self._select(key=key, limit=limit)
+
+    def before(self, key, limit):
+        return self._select(key=key, backwards=True, limit=limit)
+
+    def at(self, offset, limit):
+        # Only used for scrollbar jumps; sequential scrolling always pages by key.
+        position = offset - self.prepended
+        block = position // self.anchor_step if self.anchors and position >= self.anchor_step else 0
+        if block:
+            block = min(block, len(self.anchors))
+            return self._select(key=self.anchors[block - 1], limit=limit,
+                                offset=position - block * self.anchor_step)
+        return self._select(limit=limit, offset=offset)
+
+    def scan_anchors(self, conn, step, cancelled=None):
+        """Read the key of every `step`-th row through `conn`, e.g. on a worker thread.
+
+        Returns (anchors, rows scanned) for set_anchors, or None if cancelled.
+        """
+        direction = 'DESC' if self.descending else 'ASC'
+        query = f"SELECT {', '.join(self.keys)} FROM customers"
+        if self.where:
+            query += f" WHERE {self.where}"
+        query += f" ORDER BY {', '.join(f'{k} {direction}' for k in self.keys)}"
+        cursor = conn.execute(query, self.params)
+        anchors = []
+        while True:
+            if cancelled and cancelled():
+                return None
+            rows = cursor.fetchmany(step)
+            if len(rows) < step:
+                return anchors, len(anchors) * step + len(rows)
+            anchors.append(rows[-1])
+
+    def set_anchors(self, step, anchors, prepended=0):
+        """Use anchors from scan_anchors; `prepended` counts rows shown above them since the scan."""
+        self.anchor_step = step
+        self.anchors = anchors
+        self.prepended = prepended
+
+    def note_prepended(self, count=1):
+        self.prepended += count
+
+
+class CustomerRepository:
+    """All customer data access, usable without a Tk root (scripts, benchmarks, other front ends)."""
+
+    def __init__(self, conn, id_generator=None):
+        self.conn = conn
+        self.id_generator = id_generator or DEFAULT_ID_GENERATOR
+        self.search_engine = CustomerSearch(conn)
+
+    @classmethod
+    def open(cls, path=DB_PATH):
+        return cls(connect(path))
+
+    def close(self):
+        self.conn.close()
+
+    def create_database(self):
+        return migrate(self.conn)
+
+    def generate_customer_id(self):
+        return self.id_generator()
+
+    def get_next_daily_sequence(self, day=None):
+        # Preview only; add_customer allocates the number atomically
+        return peek_next_daily_sequence(self.conn, day or today_string())
+
+    def add_customer(self, name, now=None):
+        """Register a customer; returns (customer_id, daily_sequence, created_at)."""
+        return register_customer(self.conn, self.generate_customer_id(), name, now=now,
+                                 new_id=self.generate_customer_id)
+
+    def customer_of(self, customer_id):
+        return customer_of(self.conn, customer_id)
+
+    def visit_on(self, customer_id, day=None):
+        return visit_on(self.conn, customer_id, day or today_string())
+
+    def search(self, name='', customer_id='', daily_sequence=None, limit=None):
+        return self.search_engine.search(name=name, customer_id=customer_id,
+                                         daily_sequence=daily_sequence, limit=limit)
+
+    def directory_query(self):
+        return KeysetQuery(self.conn, ('created_at', 'id'))
+
+    def day_query(self, day=None):
+        return KeysetQuery(self.conn, ('daily_sequence', 'id'), where="date_added = ?",
+                           params=(day or today_string(),), descending=False)
+
+    def today_customers(self, day=None):
+        return [row for row, _ in self.day_query(day).first(-1)]
+
+    def change_feed(self):
+        return ChangeFeed(self.conn)
+
+    def counts(self, day=None):
+        """Return (total, today) from the trigger-maintained daily_stats table."""
+        total = self.conn.execute('SELECT COALESCE(SUM(customers), 0) FROM daily_stats').fetchone()[0]
+        row = self.conn.execute('SELECT customers FROM daily_stats WHERE date_added = ?',
+                                (day or today_string(),)).fetchone()
+        return total, (row[0] if row else 0)
+
+
+class ChangeFeed:
+    """Detects commits from other connections with PRAGMA data_version and returns only the new rows."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.reset()
+
+    def reset(self):
+        self.data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        self.last_rowid = self.conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM customers").fetchone()[0]
+
+    def poll(self, limit=500):
+        """Return None when nothing changed, else (new rows, overflowed).
+
+        Rows are (daily_sequence, id, name, created_at, row_id) in insertion order, where id is
+        the ID the customer is known by and row_id the row's own (they differ for a repeat
+        visit). When more than `limit` rows arrived at once, overflowed is True and the caller
+        should reload instead.
+        """
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self.data_version:
+            return None
+        self.data_version = version
+
+        rows = self.conn.execute(f'''
+            SELECT rowid, {', '.join(CUSTOMER_COLUMNS)}, id FROM customers
+            WHERE rowid > ? ORDER BY rowid LIMIT ?
+        ''', (self.last_rowid, limit + 1)).fetchall()
+        if len(rows) > limit:
+            self.reset()
+            return [], True
+        if rows:
+            self.last_rowid = rows[-1][0]
+        return [row[1:] for row in rows], False
@@ -0,0 +1,149 @@
+"""Compact in-memory copy of customer rows with cached sort orders for the directory.
+
+Columns are stored side by side (an int array plus lists of the strings the
+Treeview shows anyway) rather than as a tuple per row, and the "#NN" daily
+labels are shared, so a row costs little more than its own strings.
+Clicking a heading sorts through a cached permutation instead of SQLite;
+appended rows are slotted into every cached permutation.
+"""
+import sys
+from array import array
+
+COLUMNS = ('daily_sequence', 'id', 'name', 'created_at')
+SEQUENCE_LABELS = tuple(f"#{n:02d}" for n in range(1000))
+
+
+def sequence_label(daily_sequence):
+    if 0 < daily_sequence < len(SEQUENCE_LABELS):
+        return SEQUENCE_LABELS[daily_sequence]
+    return f"#{daily_sequence:02d}" if daily_sequence > 0 else "#00"
+
+
+class RowCache:
+    def __init__(self, rows=()):
+        self.sequences = array('l')
+        self.ids = []
+        self.names = []
+        self.created = []
+        self.orders = {}
+        self.extend(rows)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def extend(self, rows):
+        for daily_sequence, customer_id, name, created_at in rows:
+            self.sequences.append(daily_sequence)
+            self.ids.append(customer_id)
+            self.names.append(name)
+            self.created.append(created_at)
+        self.orders.clear()
+
+    def append(self, row):
+        """Add one row, keeping every cached sort order up to date; returns its index."""
+        daily_sequence, customer_id, name, created_at = row
+        index = len(self.ids)
+        self.sequences.append(daily_sequence)
+        self.ids.append(customer_id)
+        self.names.append(name)
+        self.created.append(created_at)
+        for column, order in self.orders.items():
+            self.insert_ordered(column, order, index)
+        return index
+
+    def insert_ordered(self, column, order, index):
+        key = self.sort_key(column)
+        value = key(index)
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if key(order[mid]) <= value:
+                lo = mid + 1
+            else:
+                hi = mid
+        order.insert(lo, index)
+
+    def row(self, index):
+        return self.sequences[index], self.ids[index], self.names[index], self.created[index]
+
+    def sort_key(self, column):
+        # Ties fall back to the id and then to the order rows were added (repeat visits share an
+        # id), so every order is total and stable across appends
+        ids = self.ids
+        if column == 'daily_sequence':
+            sequences, created = self.sequences, self.created
+            return lambda i: (sequences[i], created[i][:10], ids[i])
+        if column == 'id':
+            return ids.__getitem__
+        values = self.names if column == 'name' else self.created
+        return lambda i: (values[i], ids[i])
+
+    def order(self, column):
+        """Row indexes sorted ascending by `column`; None keeps the order rows were added in."""
+        if column is None:
+            return None
+        if column not in self.orders:
+            self.orders[column] = self.sorted_order(column, len(self.ids))
+        return self.orders[column]
+
+    def sorted_order(self, column, size):
+        # Only reads the first `size` rows, so it can run on a worker thread while rows are appended
+        return array('l', sorted(range(size), key=self.sort_key(column)))
+
+    def set_order(self, column, order, size):
+        """Store an order sorted elsewhere over the first `size` rows, slotting in any added since."""
+        self.orders[column] = order
+        for index in range(size, len(self.ids)):
+            self.insert_ordered(column, order, index)
+
+    def memory_per_row(self):
+        """Approximate bytes per cached row, including strings and any cached sort orders."""
+        if not self.ids:
+            return 0
+        total = sys.getsizeof(self.sequences)
+        for column in (self.ids, self.names, self.created):
+            total += sys.getsizeof(column) + sum(map(sys.getsizeof, column))
+        total += sum(map(sys.getsizeof, self.orders.values()))
+        return total / len(self.ids)
+
+
+class CacheSource:
+    """A RowCache in one sort order, paged like a KeysetQuery.
+
+    Keys are positions in the ascending order, which appends never shift in the
+    natural (insertion) order, so a descending natural view can prepend new rows.
+    """
+
+    def __init__(self, cache, column=None, descending=False):
+        self.cache = cache
+        self.column = column
+        self.descending = descending
+        self.newest_first = descending and column is None
+
+    def position(self, key):
+        return len(self.cache) - 1 - key[0] if self.descending else key[0]
+
+    def count(self):
+        return len(self.cache)
+
+    def first(self, limit):
+        return self.at(0, limit)
+
+    def after(self, key, limit):
+        return self.at(self.position(key) + 1, limit)
+
+    def before(self, key, limit):
+        end = self.position(key)
+        start = max(0, end - limit)
+        return self.at(start, end - start)
+
+    def at(self, offset, limit):
+        size = len(self.cache)
+        order = self.cache.order(self.column)
+        end = size if limit < 0 else min(size, offset + limit)
+        rows = []
+        for position in range(max(0, offset), end):
+            rank = size - 1 - position if self.descending else position
+            index = rank if order is None else order[rank]
+            rows.append((self.cache.row(index), (rank,)))
+        return rows
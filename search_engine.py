@@ -0,0 +1,183 @@
+import queue
+import re
+import sqlite3
+import threading
+import traceback
+
+# The trigram tokenizer can only index terms of at least three characters
+MIN_TERM_LENGTH = 3
+# The ID a customer is known by: a repeat visit is its own row but shows the first visit's ID
+CUSTOMER_ID = 'COALESCE(customer_ref, id)'
+SEARCH_COLUMNS = ('daily_sequence', CUSTOMER_ID, 'name', 'created_at')
+
+
+def split_terms(text):
+    return [term for term in re.split(r'\s+', text.strip()) if term]
+
+
+def quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def escape_like(term):
+    return re.sub(r'([%_\\])', r'\\\1', term)
+
+
+class CustomerSearch:
+    """Ranked substring search over customer names and IDs backed by the customers_fts table."""
+
+    def __init__(self, conn, limit=500, candidate_factor=10):
+        self.conn = conn
+        self.limit = limit
+        self.candidate_factor = candidate_factor
+
+    def search(self, name='', customer_id='', daily_sequence=None, limit=None):
+        return self.cursor(name, customer_id, daily_sequence, limit).fetchall()
+
+    def cursor(self, name='', customer_id='', daily_sequence=None, limit=None, columns=SEARCH_COLUMNS):
+        """Execute the search and return the open cursor; a negative limit returns every match."""
+        limit = limit or self.limit
+        # Unqualified, so columns may be expressions; hits only adds rowid and score
+        select = ', '.join(columns)
+        match = []
+        conditions = []
+        params = []
+        prefix = ''
+
+        # An ID matches a customer's own row and every repeat visit that refers to it
+        fields = (('name', ('c.name',), name),
+                  ('{id customer_ref}', ('c.id', 'c.customer_ref'), customer_id))
+        for fts_columns, like_columns, text in fields:
+            terms = split_terms(text)
+            for term in terms:
+                if len(term) >= MIN_TERM_LENGTH:
+                    match.append(f"{fts_columns} : {quote(term)}")
+                else:
+                    conditions.append('(' + ' OR '.join(f"{column} LIKE ? ESCAPE '\\'" for column in like_columns) + ')')
+                    params.extend(['%' + escape_like(term) + '%'] * len(like_columns))
+            prefix = prefix or (terms[0] if terms else '')
+
+        if daily_sequence is not None:
+            conditions.append("c.daily_sequence = ?")
+            params.append(daily_sequence)
+
+        if match:
+            # Rank only the newest candidates: bm25 over every hit of a common name is
+            # too slow for search-as-you-type, and recent customers are the likely target.
+            # The other filters apply before that cap, so an older match is never dropped.
+            where = ''.join(f" AND {condition}" for condition in conditions)
+            query = f'''
+                SELECT {select}
+                FROM (
+                    SELECT customers_fts.rowid AS rowid, bm25(customers_fts) AS score
+                    FROM customers_fts
+                    JOIN customers c ON c.rowid = customers_fts.rowid
+                    WHERE customers_fts MATCH ?{where}
+                    ORDER BY customers_fts.rowid DESC
+                    LIMIT ?
+                ) hits
+                JOIN customers c ON c.rowid = hits.rowid
+                ORDER BY (c.name LIKE ? ESCAPE '\\' OR COALESCE(c.customer_ref, c.id) LIKE ? ESCAPE '\\') DESC,
+                         hits.score, c.created_at DESC
+                LIMIT ?
+            '''
+            starts_with = escape_like(prefix) + '%'
+            candidates = limit * self.candidate_factor if limit > 0 else -1
+            args = ([' AND '.join(match)] + params + [candidates]
+                    + [starts_with, starts_with, limit])
+        else:
+            # Only short terms or a daily number: nothing the trigram index can serve
+            query = f'''
+                SELECT {select}
+                FROM customers c
+                WHERE {' AND '.join(conditions)}
+                ORDER BY c.created_at DESC, c.id DESC
+                LIMIT ?
+            '''
+            args = params + [limit]
+
+        return self.conn.execute(query, args)
+
+
+class BackgroundSearch:
+    """Runs CustomerSearch on a worker thread with its own connection, keeping only the latest query.
+
+    submit() may be called for every keystroke: a newer query interrupts the one in flight, and
+    results are handed back through a queue that the Tk thread drains.
+    """
+
+    def __init__(self, connect, limit=500, archives=None):
+        self.connect = connect
+        self.limit = limit
+        # Called on the worker thread to open an ArchiveSet for searches that include history
+        self.archives = archives
+        self.results = queue.Queue()
+        self.condition = threading.Condition()
+        self.pending = None
+        self.generation = 0
+        self.running = None
+        self.conn = None
+        self.thread = threading.Thread(target=self.run, name='search', daemon=True)
+        self.thread.start()
+
+    def submit(self, history=False, **criteria):
+        with self.condition:
+            self.generation += 1
+            self.pending = (self.generation, criteria, history)
+            if self.running is not None and self.conn is not None:
+                # Abort the stale query; the worker discards its error
+                self.conn.interrupt()
+            self.condition.notify()
+            return self.generation
+
+    def cancel(self):
+        with self.condition:
+            self.generation += 1
+            self.pending = None
+            if self.running is not None and self.conn is not None:
+                self.conn.interrupt()
+
+    def run(self):
+        engine = None
+        archives = None
+        while True:
+            with self.condition:
+                while self.pending is None:
+                    self.condition.wait()
+                generation, criteria, history = self.pending
+                self.pending = None
+                self.running = generation
+            try:
+                if engine is None:
+                    # Opened here rather than up front so a failure is reported for the
+                    # query, and the next one tries again instead of the worker dying
+                    self.conn = self.connect()
+                    engine = CustomerSearch(self.conn, limit=self.limit)
+                rows, error = engine.search(**criteria), None
+                if history and self.archives is not None and len(rows) < self.limit:
+                    if archives is None:
+                        archives = self.archives()
+                    rows += archives.search(self.limit - len(rows), **criteria)
+            except sqlite3.Error as e:
+                rows, error = None, e
+            except Exception as e:
+                # A bug rather than a database error: log it, but still answer the query
+                traceback.print_exc()
+                rows, error = None, e
+            with self.condition:
+                self.running = None
+                stale = generation != self.generation
+            if not stale:
+                self.results.put((generation, rows, error))
+
+    def latest(self):
+        """Return the newest finished (generation, rows, error) for the current query, if any."""
+        result = None
+        while True:
+            try:
+                result = self.results.get_nowait()
+            except queue.Empty:
+                break
+        if result is not None and result[0] != self.generation:
+            return None
+        return result
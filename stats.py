@@ -0,0 +1,155 @@
+"""Registration volumes per day, week, month and hour of day, read from the stats tables.
+
+    python stats.py [--by day|week|month|hour] [--days 90] [--db customers.db]
+    python stats.py --backfill [--include-archive] [--db customers.db]
+
+daily_stats and hourly_stats are kept current by triggers on customers (see
+migrations.py), so reading volumes never touches the customers table: years
+of history are a few thousand small rows. Weeks and months roll up from
+daily_stats. --backfill recounts both tables from customers, e.g. after rows
+were changed with the triggers dropped. Archived days keep their counts
+unless --include-archive recounts them from the archive files as well.
+"""
+import argparse
+import sqlite3
+from collections import Counter
+from datetime import date, timedelta
+
+from archive import ArchiveSet, archive_directory
+from migrations import migrate
+from repository import DB_PATH, connect
+
+
+def count_volumes(conn):
+    """Count customers per day and per (day, hour) straight from the customers table."""
+    daily = Counter(dict(conn.execute("SELECT date_added, COUNT(*) FROM customers GROUP BY date_added")))
+    hourly = Counter({(day, hour): n for day, hour, n in conn.execute('''
+        SELECT date_added, CAST(substr(created_at, 12, 2) AS INTEGER), COUNT(*) FROM customers GROUP BY 1, 2
+    ''')})
+    return daily, hourly
+
+
+def backfill(conn, archive_paths=()):
+    """Recount daily_stats and hourly_stats; returns how many days were written.
+
+    With archive_paths the tables are rebuilt from scratch out of customers and
+    every archive; without, only days still in customers are recounted.
+    """
+    daily, hourly = Counter(), Counter()
+    for path in archive_paths:
+        archive = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            archived_daily, archived_hourly = count_volumes(archive)
+        finally:
+            archive.close()
+        daily.update(archived_daily)
+        hourly.update(archived_hourly)
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Counted inside the write transaction so no registration lands in between
+        hot_daily, hot_hourly = count_volumes(conn)
+        daily.update(hot_daily)
+        hourly.update(hot_hourly)
+        if archive_paths:
+            conn.execute("DELETE FROM daily_stats")
+            conn.execute("DELETE FROM hourly_stats")
+        else:
+            conn.executemany("DELETE FROM hourly_stats WHERE date_added = ?", [(day,) for day in daily])
+        conn.executemany("INSERT OR REPLACE INTO daily_stats (date_added, customers) VALUES (?, ?)",
+                         daily.items())
+        conn.executemany("INSERT OR REPLACE INTO hourly_stats (date_added, hour, customers) VALUES (?, ?, ?)",
+                         [(day, hour, n) for (day, hour), n in hourly.items()])
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return len(daily)
+
+
+class VolumeStats:
+    """Read-only queries over daily_stats and hourly_stats; `first`/`last` are 'YYYY-MM-DD' bounds."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def _range(self, first, last):
+        return (first or '0000-00-00', last or '9999-99-99')
+
+    def daily(self, first=None, last=None):
+        """[(day, customers)] for days with registrations, oldest first."""
+        return self.conn.execute('''
+            SELECT date_added, customers FROM daily_stats
+            WHERE date_added BETWEEN ? AND ? AND customers > 0 ORDER BY date_added
+        ''', self._range(first, last)).fetchall()
+
+    def weekly(self, first=None, last=None):
+        """[(Monday of the week, customers)], oldest first."""
+        return self.conn.execute('''
+            SELECT date(date_added, 'weekday 0', '-6 days') AS week, SUM(customers) FROM daily_stats
+            WHERE date_added BETWEEN ? AND ? GROUP BY week HAVING SUM(customers) > 0 ORDER BY week
+        ''', self._range(first, last)).fetchall()
+
+    def monthly(self, first=None, last=None):
+        """[('YYYY-MM', customers)], oldest first."""
+        return self.conn.execute('''
+            SELECT substr(date_added, 1, 7) AS month, SUM(customers) FROM daily_stats
+            WHERE date_added BETWEEN ? AND ? GROUP BY month HAVING SUM(customers) > 0 ORDER BY month
+        ''', self._range(first, last)).fetchall()
+
+    def by_hour(self, first=None, last=None):
+        """[(hour, customers)] summed over the range, for every hour 0-23."""
+        totals = dict(self.conn.execute('''
+            SELECT hour, SUM(customers) FROM hourly_stats WHERE date_added BETWEEN ? AND ? GROUP BY hour
+        ''', self._range(first, last)))
+        return [(hour, totals.get(hour, 0)) for hour in range(24)]
+
+    def open_days(self, first=None, last=None):
+        """How many days in the range had at least one registration."""
+        return self.conn.execute('''
+            SELECT COUNT(*) FROM daily_stats WHERE date_added BETWEEN ? AND ? AND customers > 0
+        ''', self._range(first, last)).fetchone()[0]
+
+
+def fill_days(rows, first=None, last=None):
+    """Add zero rows for days without registrations so bars line up with the calendar."""
+    if not rows:
+        return []
+    counts = dict(rows)
+    day = date.fromisoformat(first or rows[0][0])
+    end = date.fromisoformat(last or rows[-1][0])
+    filled = []
+    while day <= end:
+        key = day.isoformat()
+        filled.append((key, counts.get(key, 0)))
+        day += timedelta(days=1)
+    return filled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default=DB_PATH)
+    parser.add_argument('--by', choices=['day', 'week', 'month', 'hour'], default='day')
+    parser.add_argument('--days', type=int, help="only the last this many days")
+    parser.add_argument('--backfill', action='store_true', help="recount the stats tables")
+    parser.add_argument('--include-archive', action='store_true',
+                        help="with --backfill, also recount days moved to archive files")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    migrate(conn)
+    if args.backfill:
+        archives = ArchiveSet(archive_directory(args.db)).paths() if args.include_archive else ()
+        print(f"Recounted {backfill(conn, archives):,} days from {1 + len(archives)} file(s)")
+        return
+
+    first = (date.today() - timedelta(days=args.days - 1)).isoformat() if args.days else None
+    stats = VolumeStats(conn)
+    rows = {'day': stats.daily, 'week': stats.weekly, 'month': stats.monthly,
+            'hour': stats.by_hour}[args.by](first)
+    for label, customers in rows:
+        print(f"{label:>10}  {customers:>8,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from migrations import migrate
+from repository import connect
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'customers.db')
+    conn = connect(path)
+    migrate(conn)
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def conn(db_path):
+    conn = connect(db_path)
+    yield conn
+    conn.close()
+
+
+def insert_customers(conn, rows):
+    """Insert (id, name, created_at, daily_sequence) rows and keep daily_counters in step."""
+    conn.executemany('''
+        INSERT INTO customers (id, name, created_at, daily_sequence, date_added)
+        VALUES (?, ?, ?, ?, substr(?, 1, 10))
+    ''', [(customer_id, name, created_at, sequence, created_at)
+          for customer_id, name, created_at, sequence in rows])
+    conn.execute('''
+        INSERT OR REPLACE INTO daily_counters (date_added, last_sequence)
+        SELECT date_added, MAX(daily_sequence) FROM customers GROUP BY date_added
+    ''')
+    conn.commit()
@@ -0,0 +1,42 @@
+import asyncio
+
+from api_server import ApiServer
+from conftest import insert_customers
+from migrations import migrate
+from repository import connect
+
+
+def test_event_feed_recovers_from_database_errors(tmp_path):
+    # Subscribed before the schema exists, as when the app starts the API on a fresh database
+    path = str(tmp_path / 'customers.db')
+    server = ApiServer(path, feed_interval=0.01)
+
+    async def scenario():
+        server.loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        server.subscribers.add(events)
+        watcher = asyncio.create_task(server.watch_registrations())
+        try:
+            await asyncio.sleep(0.1)
+            conn = connect(path)
+            migrate(conn)
+            # The feed only reports rows added after it reconnects, so keep registering until one arrives
+            try:
+                for sequence in range(1, 50):
+                    insert_customers(conn, [(f"A{sequence}", 'Nimal Silva', '2024-01-01 09:00:00', sequence)])
+                    try:
+                        return await asyncio.wait_for(events.get(), timeout=0.2)
+                    except asyncio.TimeoutError:
+                        pass
+                return None
+            finally:
+                conn.close()
+        finally:
+            watcher.cancel()
+
+    try:
+        event = asyncio.run(scenario())
+    finally:
+        server.writer.close()
+    assert event is not None
+    assert event['name'] == 'Nimal Silva' and event['id'].startswith('A')
@@ -0,0 +1,91 @@
+import sqlite3
+
+import pytest
+
+from archive import Archiver, ArchiveSet
+from bulk_import import import_customers
+from conftest import insert_customers
+
+
+def archived_rows(archiver, day):
+    conn = sqlite3.connect(archiver.archive_path(day))
+    try:
+        return conn.execute("SELECT id FROM customers WHERE date_added = ? ORDER BY id", (day,)).fetchall()
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def archiver(db_path, tmp_path):
+    return Archiver(db_path, horizon_days=30, directory=str(tmp_path / 'archive'))
+
+
+def test_archive_day_moves_rows_and_keeps_counts(conn, archiver):
+    insert_customers(conn, [
+        ('A1', 'Nimal Silva', '2020-01-01 09:00:00', 1),
+        ('A2', 'Kamal Perera', '2020-01-01 10:30:00', 2),
+        ('B1', 'Sunil Bandara', '2020-01-02 09:00:00', 1),
+    ])
+    assert archiver.run_once(conn) == (2, 3)
+    assert conn.execute("SELECT COUNT(*) FROM customers").fetchone()[0] == 0
+    assert archived_rows(archiver, '2020-01-01') == [('A1',), ('A2',)]
+    assert conn.execute("SELECT customers FROM daily_stats WHERE date_added = '2020-01-01'").fetchone() == (2,)
+    assert conn.execute('''
+        SELECT hour, customers FROM hourly_stats WHERE date_added = '2020-01-01' ORDER BY hour
+    ''').fetchall() == [(9, 1), (10, 1)]
+    assert conn.execute("SELECT row_count FROM row_counts").fetchone() == (0,)
+
+
+def test_rearchiving_a_copied_day_keeps_one_copy(conn, archiver):
+    insert_customers(conn, [('A1', 'Nimal Silva', '2020-01-01 09:00:00', 1)])
+    # As if an earlier run stopped after committing the archive but before the delete
+    archiver.prepare(archiver.archive_path('2020-01-01'))
+    archive = sqlite3.connect(archiver.archive_path('2020-01-01'))
+    archive.execute('''
+        INSERT INTO customers (id, name, created_at, daily_sequence, date_added)
+        VALUES ('A1', 'Nimal Silva', '2020-01-01 09:00:00', 1, '2020-01-01')
+    ''')
+    archive.commit()
+    archive.close()
+    assert archiver.archive_day(conn, '2020-01-01') == 1
+    assert archived_rows(archiver, '2020-01-01') == [('A1',)]
+
+
+def test_id_clash_skips_the_day_and_archives_later_ones(conn, archiver):
+    insert_customers(conn, [('X1', 'Someone Else', '2020-01-05 09:00:00', 1)])
+    archiver.run_once(conn)
+    insert_customers(conn, [
+        ('X1', 'Nimal Silva', '2020-01-01 09:00:00', 1),
+        ('B1', 'Sunil Bandara', '2020-01-02 09:00:00', 1),
+    ])
+    for _ in range(2):
+        days, rows = archiver.run_once(conn)
+        assert list(archiver.failed) == ['2020-01-01']
+    assert archived_rows(archiver, '2020-01-02') == [('B1',)]
+    assert conn.execute("SELECT id FROM customers").fetchall() == [('X1',)]
+
+    conn.execute("UPDATE customers SET id = 'X2' WHERE id = 'X1'")
+    conn.commit()
+    assert archiver.run_once(conn) == (1, 1)
+    assert archiver.failed == {}
+
+
+def test_archive_set_searches_archived_days(conn, archiver):
+    insert_customers(conn, [('A1', 'Nimal Silva', '2020-01-01 09:00:00', 1)])
+    archiver.run_once(conn)
+    rows = ArchiveSet(archiver.directory).search(10, name='Nimal')
+    assert [row[1] for row in rows] == ['A1']
+
+
+def test_import_treats_archived_ids_as_duplicates(conn, archiver, tmp_path):
+    insert_customers(conn, [('A1', 'Nimal Silva', '2020-01-01 09:00:00', 1)])
+    archiver.run_once(conn)
+    path = tmp_path / 'customers.csv'
+    path.write_text("id,name,created_at\nA1,Nimal Silva,2020-01-01 09:00:00\nA2,Kamal Perera,2020-01-01 09:05:00\n")
+    archives = ArchiveSet(archiver.directory)
+    try:
+        progress = import_customers(conn, str(path), archives=archives)
+    finally:
+        archives.close()
+    assert (progress.imported, progress.duplicates) == (1, 1)
+    assert conn.execute("SELECT id FROM customers").fetchall() == [('A2',)]
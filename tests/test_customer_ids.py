@@ -0,0 +1,49 @@
+import threading
+
+from customer_ids import CROCKFORD, EPOCH, TimeOrderedIdGenerator, encode
+
+
+def test_ids_sort_in_the_order_they_were_drawn():
+    now = [EPOCH + 1000.0]
+    generate = TimeOrderedIdGenerator(clock=lambda: now[0])
+    ids = []
+    for _ in range(3):
+        ids += [generate() for _ in range(100)]
+        now[0] += 1
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+    assert all(len(customer_id) == 9 and set(customer_id) <= set(CROCKFORD) for customer_id in ids)
+
+
+def test_a_burst_borrows_from_the_next_second_instead_of_repeating():
+    generate = TimeOrderedIdGenerator(clock=lambda: EPOCH + 5)
+    ids = [generate() for _ in range(40_000)]
+    assert len(set(ids)) == len(ids)
+    assert ids == sorted(ids)
+    assert ids[-1][:6] == encode(6, 6)
+
+
+def test_a_clock_going_backwards_keeps_ids_monotonic():
+    now = [EPOCH + 100.0]
+    generate = TimeOrderedIdGenerator(clock=lambda: now[0])
+    first = generate()
+    now[0] -= 50
+    assert generate() > first
+
+
+def test_shared_between_threads_without_repeats():
+    generate = TimeOrderedIdGenerator()
+    ids = []
+    lock = threading.Lock()
+
+    def draw():
+        drawn = [generate() for _ in range(2000)]
+        with lock:
+            ids.extend(drawn)
+
+    threads = [threading.Thread(target=draw) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(ids)) == 8000
@@ -0,0 +1,20 @@
+import sqlite3
+
+import pytest
+
+from migrations import SCHEMA_VERSION, check_sqlite_version, migrate, schema_version
+from repository import connect
+
+
+def test_old_sqlite_is_refused_with_a_clear_error():
+    with pytest.raises(sqlite3.NotSupportedError, match="3.35.0 or newer"):
+        check_sqlite_version((3, 34, 1))
+    check_sqlite_version((3, 35, 0))
+
+
+def test_migrate_reaches_the_current_version_and_is_idempotent(tmp_path):
+    conn = connect(str(tmp_path / 'customers.db'))
+    assert migrate(conn) == SCHEMA_VERSION
+    assert migrate(conn) == SCHEMA_VERSION
+    assert schema_version(conn) == SCHEMA_VERSION
+    conn.close()
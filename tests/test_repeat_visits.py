@@ -0,0 +1,51 @@
+from datetime import datetime
+
+from api_server import customer_json
+from conftest import insert_customers
+from registration import customer_of, register_batch, visit_on
+from repository import ChangeFeed, CustomerRepository, connect
+
+
+def register_visit(db_path, visit_id, customer_ref, now):
+    writer = connect(db_path)
+    try:
+        return register_batch(writer, [(visit_id, 'Nimal Silva', now, customer_ref)])[0]
+    finally:
+        writer.close()
+
+
+def test_repeat_visit_leaves_the_first_visit_alone(conn, db_path):
+    insert_customers(conn, [('FIRST1', 'Nimal Silva', '2024-01-01 09:00:00', 1)])
+    register_visit(db_path, 'VISIT1', 'FIRST1', datetime(2024, 1, 2, 9, 30))
+    assert conn.execute("SELECT date_added, daily_sequence FROM customers WHERE id = 'FIRST1'").fetchone() \
+        == ('2024-01-01', 1)
+    assert conn.execute("SELECT customers FROM daily_stats WHERE date_added = '2024-01-01'").fetchone() == (1,)
+    assert customer_of(conn, 'VISIT1') == 'FIRST1'
+    assert visit_on(conn, 'FIRST1', '2024-01-02') == (1, 'VISIT1')
+
+
+def test_views_show_the_customer_id_for_a_repeat_visit(conn, db_path):
+    insert_customers(conn, [('FIRST1', 'Nimal Silva', '2024-01-01 09:00:00', 1)])
+    feed = ChangeFeed(conn)
+    register_visit(db_path, 'VISIT1', 'FIRST1', datetime(2024, 1, 2, 9, 30))
+
+    rows, overflowed = feed.poll()
+    assert not overflowed
+    assert rows == [(1, 'FIRST1', 'Nimal Silva', '2024-01-02 09:30:00', 'VISIT1')]
+    assert customer_json(rows[0])['id'] == 'FIRST1'
+
+    repo = CustomerRepository(conn)
+    assert [row for row, _ in repo.day_query('2024-01-02').first(10)] == [rows[0][:4]]
+    assert [row[1] for row, _ in repo.directory_query().first(10)] == ['FIRST1', 'FIRST1']
+    # Paging keys stay on each row's own id
+    assert [key for _, key in repo.directory_query().first(10)][0] == ('2024-01-02 09:30:00', 'VISIT1')
+
+
+def test_id_search_finds_every_visit(conn, db_path):
+    insert_customers(conn, [('FIRST1', 'Nimal Silva', '2024-01-01 09:00:00', 1)])
+    register_visit(db_path, 'VISIT1', 'FIRST1', datetime(2024, 1, 2, 9, 30))
+    repo = CustomerRepository(conn)
+    for term in ('FIRST1', 'RST', 'F'):
+        rows = repo.search(customer_id=term)
+        assert sorted(row[3] for row in rows) == ['2024-01-01 09:00:00', '2024-01-02 09:30:00']
+        assert {row[1] for row in rows} == {'FIRST1'}
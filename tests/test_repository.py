@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+from conftest import insert_customers
+from registration import register_customer
+from repository import CustomerRepository, connect
+from write_queue import GroupCommitWriter
+
+
+def fill(conn, count=250):
+    start = datetime(2024, 1, 1, 8, 0, 0)
+    rows = []
+    for i in range(count):
+        created = start + timedelta(minutes=7 * i)
+        rows.append((f"C{i:04d}", f"Customer {i}", created.strftime("%Y-%m-%d %H:%M:%S"), i % 60 + 1))
+    insert_customers(conn, rows)
+    # Newest first, as the directory shows them
+    return [row[0] for row in reversed(rows)]
+
+
+def ids(page):
+    return [row[1] for row, _ in page]
+
+
+def test_keyset_pages_forwards_and_backwards(conn):
+    expected = fill(conn)
+    query = CustomerRepository(conn).directory_query()
+    first = query.first(100)
+    second = query.after(first[-1][1], 100)
+    third = query.after(second[-1][1], 100)
+    assert ids(first) + ids(second) + ids(third) == expected
+    assert ids(query.before(second[0][1], 100)) == expected[:100]
+    assert ids(query.before(third[0][1], 30)) == expected[170:200]
+
+
+def test_keyset_pages_ties_on_created_at_by_id(conn):
+    insert_customers(conn, [(f"T{i}", 'Same Second', '2024-01-01 09:00:00', i + 1) for i in range(5)])
+    query = CustomerRepository(conn).directory_query()
+    first = query.first(2)
+    assert ids(first) + ids(query.after(first[-1][1], 10)) == ['T4', 'T3', 'T2', 'T1', 'T0']
+
+
+def test_jumps_through_anchors_match_plain_offsets(conn):
+    expected = fill(conn)
+    query = CustomerRepository(conn).directory_query()
+    anchors, scanned = query.scan_anchors(conn, 40)
+    assert scanned == len(expected) and len(anchors) == len(expected) // 40
+    query.set_anchors(40, anchors)
+    for offset in (0, 39, 40, 41, 125, 239, 249):
+        assert ids(query.at(offset, 5)) == expected[offset:offset + 5]
+
+
+def test_counts_use_the_maintained_tables(conn):
+    fill(conn)
+    repo = CustomerRepository(conn)
+    assert repo.directory_query().count() == 250
+    day = repo.day_query('2024-01-01')
+    assert day.count() == len(repo.today_customers('2024-01-01'))
+    total, today = repo.counts('2024-01-01')
+    assert (total, today) == (250, day.count())
+
+
+def test_daily_numbers_continue_per_day(conn):
+    now = datetime(2024, 3, 1, 9, 0)
+    numbers = [register_customer(conn, f"R{i}", 'Nimal Silva', now=now)[1] for i in range(3)]
+    assert numbers == [1, 2, 3]
+    assert register_customer(conn, 'R9', 'Nimal Silva', now=now + timedelta(days=1))[1] == 1
+
+
+def test_a_clashing_id_is_redrawn(conn):
+    insert_customers(conn, [('TAKEN', 'Someone', '2024-01-01 09:00:00', 1)])
+    customer_id, _, _ = register_customer(conn, 'TAKEN', 'Nimal Silva', now=datetime(2024, 3, 1, 9, 0),
+                                          new_id=lambda: 'FRESH')
+    assert customer_id == 'FRESH'
+
+
+def test_group_commit_numbers_in_submission_order(db_path):
+    writer = GroupCommitWriter(lambda: connect(db_path))
+    try:
+        now = datetime(2024, 3, 1, 9, 0)
+        futures = [writer.submit(f"Customer {i}", now=now) for i in range(20)]
+        assert [future.result(5)[1] for future in futures] == list(range(1, 21))
+    finally:
+        writer.close()
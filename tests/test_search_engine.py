@@ -0,0 +1,83 @@
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from conftest import insert_customers
+from repository import connect
+from search_engine import BackgroundSearch, CustomerSearch
+
+
+def crowded(conn, newer=6000):
+    # One older customer behind more newer namesakes than the candidate cap keeps
+    start = datetime(2024, 1, 1, 8, 0, 0)
+    rows = [('OLD1', 'Sunil Perera', '2023-12-31 09:00:00', 7)]
+    for i in range(newer):
+        created = start + timedelta(minutes=i)
+        rows.append((f"NEW{i:05d}", 'Kamal Perera', created.strftime("%Y-%m-%d %H:%M:%S"), i % 50 + 1))
+    insert_customers(conn, rows)
+
+
+def test_id_filter_applies_before_candidate_cap(conn):
+    crowded(conn)
+    rows = CustomerSearch(conn).search(name='Perera', customer_id='OL')
+    assert [row[1] for row in rows] == ['OLD1']
+
+
+def test_sequence_filter_applies_before_candidate_cap(conn):
+    crowded(conn)
+    rows = CustomerSearch(conn).search(name='Perera', daily_sequence=7)
+    expected = conn.execute('''
+        SELECT COUNT(*) FROM customers WHERE name LIKE '%Perera%' AND daily_sequence = 7
+    ''').fetchone()[0]
+    assert len(rows) == expected
+    assert 'OLD1' in [row[1] for row in rows]
+
+
+def test_prefix_matches_rank_first(conn):
+    insert_customers(conn, [
+        ('A1', 'Nimal Silva', '2024-01-01 09:00:00', 1),
+        ('A2', 'Silva Nimal', '2024-01-01 09:01:00', 2),
+    ])
+    rows = CustomerSearch(conn).search(name='Silva')
+    assert [row[1] for row in rows] == ['A2', 'A1']
+
+
+def test_short_terms_fall_back_to_like(conn):
+    insert_customers(conn, [
+        ('A1', 'Al Perera', '2024-01-01 09:00:00', 1),
+        ('A2', 'Kamal Silva', '2024-01-01 09:01:00', 2),
+    ])
+    rows = CustomerSearch(conn).search(name='Al', daily_sequence=1)
+    assert [row[1] for row in rows] == ['A1']
+
+
+def test_negative_limit_returns_every_match(conn):
+    crowded(conn, newer=600)
+    assert len(CustomerSearch(conn, limit=10).cursor(name='Perera', limit=-1).fetchall()) == 601
+
+
+def wait_for_result(search, generation, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = search.latest()
+        if result is not None and result[0] == generation:
+            return result
+        time.sleep(0.01)
+    raise AssertionError("no search result")
+
+
+def test_background_search_reports_connect_errors_and_recovers(db_path, conn):
+    insert_customers(conn, [('A1', 'Nimal Silva', '2024-01-01 09:00:00', 1)])
+    attempts = []
+
+    def flaky_connect():
+        attempts.append(None)
+        if len(attempts) == 1:
+            raise sqlite3.OperationalError("unable to open database file")
+        return connect(db_path, check_same_thread=False)
+
+    search = BackgroundSearch(flaky_connect)
+    _, rows, error = wait_for_result(search, search.submit(name='Nimal'))
+    assert rows is None and isinstance(error, sqlite3.OperationalError)
+    _, rows, error = wait_for_result(search, search.submit(name='Nimal'))
+    assert error is None and [row[1] for row in rows] == ['A1']
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+
+
+class UiScheduler:
+    """Coalesces widget refreshes and timers by key on the Tk thread.
+
+    refresh(key, callback) queues work for the next idle pass; asking again for a
+    key that is already queued only replaces its callback, so a burst of requests
+    costs one redraw. later(key, ms, callback) keeps at most one timer per key,
+    cancelling the one it supersedes. set_text(widget, text) skips labels whose
+    text would not change and batches the rest into the same idle pass.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.pending = OrderedDict()
+        self.idle_job = None
+        self.timers = {}
+        self.texts = {}
+        self.requested = 0
+        self.unchanged = 0
+        self.ran = 0
+        self.coalesced = 0
+        self.superseded = 0
+
+    def refresh(self, key, callback):
+        self.requested += 1
+        if key in self.pending:
+            self.coalesced += 1
+        self.pending[key] = callback
+        if self.idle_job is None:
+            self.idle_job = self.root.after_idle(self.flush)
+
+    def set_text(self, widget, text):
+        key = ('text', str(widget))
+        if self.texts.get(key) == text:
+            self.unchanged += 1
+            return
+        self.texts[key] = text
+        self.refresh(key, lambda: widget.config(text=text))
+
+    def flush(self):
+        self.idle_job = None
+        # Callbacks may queue more work; that goes to the next idle pass
+        pending, self.pending = self.pending, OrderedDict()
+        for callback in pending.values():
+            self.ran += 1
+            callback()
+
+    def later(self, key, ms, callback):
+        self.cancel(key)
+
+        def run():
+            del self.timers[key]
+            callback()
+
+        self.timers[key] = self.root.after(ms, run)
+
+    def cancel(self, key):
+        job = self.timers.pop(key, None)
+        if job is not None:
+            self.root.after_cancel(job)
+            self.superseded += 1
+
+    @property
+    def saved(self):
+        """Redraws and callbacks that never ran because they were merged, unchanged or superseded."""
+        return self.coalesced + self.unchanged + self.superseded
+
+    def stats(self):
+        return {'requested': self.requested, 'ran': self.ran, 'coalesced': self.coalesced,
+                'unchanged': self.unchanged, 'superseded_timers': self.superseded, 'saved': self.saved}
@@ -0,0 +1,161 @@
+import tkinter as tk
+
+
+class VirtualTreeview:
+    """Shows a window of a large result set in a Treeview, keeping only the visible rows plus a buffer."""
+
+    def __init__(self, tree, scrollbar, format_row, row_height, buffer_rows=50):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.format_row = format_row
+        self.row_height = row_height
+        self.buffer_rows = buffer_rows
+
+        self.source = None
+        self.total = 0
+        self.top = 0
+        self.visible = max(1, int(str(tree.cget('height'))))
+        self.start = 0
+        self.rows = []
+        self.items = []
+        self.pending_top = None
+
+        scrollbar.configure(command=self.on_scrollbar)
+        tree.configure(yscrollcommand=lambda *args: None)
+        tree.bind('<Configure>', self.on_resize)
+        tree.bind('<MouseWheel>', lambda e: self.scroll_by(-3 if e.delta > 0 else 3))
+        tree.bind('<Button-4>', lambda e: self.scroll_by(-3))
+        tree.bind('<Button-5>', lambda e: self.scroll_by(3))
+        tree.bind('<Prior>', lambda e: self.scroll_by(-self.visible))
+        tree.bind('<Next>', lambda e: self.scroll_by(self.visible))
+        tree.bind('<Home>', lambda e: self.scroll_to(0))
+        tree.bind('<End>', lambda e: self.scroll_to(self.total))
+
+    def set_source(self, source, total=None, rows=None):
+        """Show `source` from the top; `total` and `rows` may be passed in when read elsewhere."""
+        self.source = source
+        self.total = source.count() if total is None else total
+        self.top = 0
+        self.start = 0
+        self.rows = source.first(self.visible + self.buffer_rows) if rows is None else list(rows)
+        self.render()
+        return self.total
+
+    def refresh(self):
+        if self.source is not None:
+            top = self.top
+            self.set_source(self.source)
+            self.scroll_to(top)
+
+    def on_resize(self, event):
+        visible = max(1, event.height // self.row_height - 1)
+        if visible != self.visible:
+            self.visible = visible
+            self.scroll_to(self.top)
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == tk.MOVETO:
+            # Dragging fires many events per frame; only the newest position is fetched
+            if self.pending_top is None:
+                self.tree.after_idle(self.flush_scroll)
+            self.pending_top = int(float(amount) * self.total)
+        elif action == tk.SCROLL:
+            step = self.visible if unit == tk.PAGES else 1
+            self.scroll_by(int(amount) * step)
+
+    def flush_scroll(self):
+        top, self.pending_top = self.pending_top, None
+        if top is not None:
+            self.scroll_to(top)
+
+    def scroll_by(self, delta):
+        self.scroll_to(self.top + delta)
+        return 'break'
+
+    def scroll_to(self, top):
+        top = max(0, min(top, self.total - self.visible))
+        self.fill_window(top)
+        self.top = top
+        self.render()
+        return 'break'
+
+    def fill_window(self, top):
+        if self.source is None:
+            return
+        end = min(top + self.visible, self.total)
+        buffer_end = self.start + len(self.rows)
+        if self.start <= top and end <= buffer_end:
+            return
+
+        capacity = self.visible + 2 * self.buffer_rows
+        if self.rows and self.start <= top <= buffer_end + self.buffer_rows:
+            self.rows.extend(self.source.after(self.rows[-1][1], end - buffer_end + self.buffer_rows))
+        elif self.rows and top < self.start and end >= self.start - self.buffer_rows:
+            rows = self.source.before(self.rows[0][1], self.start - top + self.buffer_rows)
+            self.rows[:0] = rows
+            self.start -= len(rows)
+        else:
+            self.start = max(0, top - self.buffer_rows)
+            self.rows = self.source.at(self.start, capacity)
+
+        if len(self.rows) > capacity:
+            lo = max(0, top - self.buffer_rows - self.start)
+            self.rows = self.rows[lo:lo + capacity]
+            self.start += lo
+
+    def row_tag(self, index):
+        # Count stripes from the end the new rows arrive at, so adding one never repaints the rest
+        if self.source is not None and self.source.newest_first:
+            index = self.total - 1 - index
+        return 'evenrow' if index % 2 == 0 else 'oddrow'
+
+    def prepend(self, row, key):
+        """Show a row that sorts before every other one, touching only the Treeview items that change."""
+        self.total += 1
+        if hasattr(self.source, 'note_prepended'):
+            self.source.note_prepended()
+        if self.start > 0:
+            self.start += 1
+            self.top += 1
+        else:
+            self.rows.insert(0, (row, key))
+            if self.top > 0:
+                self.top += 1
+            else:
+                self.items.insert(0, self.tree.insert('', 0, values=self.format_row(row), tags=(self.row_tag(0),)))
+                if len(self.items) > self.visible:
+                    self.tree.delete(self.items.pop())
+            if len(self.rows) > self.visible + 2 * self.buffer_rows:
+                self.rows.pop()
+        self.update_scrollbar()
+
+    def append(self, row, key):
+        """Show a row that sorts after every other one."""
+        index = self.total
+        self.total += 1
+        if self.start + len(self.rows) == index:
+            self.rows.append((row, key))
+            if len(self.items) < self.visible and self.top + len(self.items) == index:
+                self.items.append(self.tree.insert('', 'end', values=self.format_row(row),
+                                                   tags=(self.row_tag(index),)))
+        self.update_scrollbar()
+
+    def render(self):
+        offset = self.top - self.start
+        shown = self.rows[offset:offset + self.visible]
+
+        while len(self.items) < len(shown):
+            self.items.append(self.tree.insert('', 'end'))
+        while len(self.items) > len(shown):
+            self.tree.delete(self.items.pop())
+
+        for i, (item, (row, _)) in enumerate(zip(self.items, shown)):
+            self.tree.item(item, values=self.format_row(row), tags=(self.row_tag(self.top + i),))
+
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        if self.total:
+            self.scrollbar.set(self.top / self.total, min(1.0, (self.top + len(self.items)) / self.total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
@@ -0,0 +1,100 @@
+"""Write-behind registration queue with group commit.
+
+Registrations are handed to one writer thread with its own connection. It
+takes the first waiting registration, keeps collecting for up to `window`
+seconds (or until `max_batch` are waiting) and commits them all in one
+transaction, so a burst of check-ins pays for one WAL sync instead of one
+each. That makes synchronous=FULL affordable: a registration's future only
+resolves after its batch has been committed and synced, so nothing is
+confirmed that a power cut could still take back.
+
+With window=0 a batch is whatever queued up while the previous commit was
+syncing, which already grows with the load and adds no waiting; a window
+only pays off where a sync costs much more than the wait, such as on
+spinning disks or network filesystems (see benchmarks/bench_group_commit.py).
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+
+from registration import register_batch
+from repository import generate_customer_id
+
+
+class GroupCommitWriter:
+    def __init__(self, connect, window=0.0, max_batch=256, new_id=None, durable=True):
+        self.connect = connect
+        self.window = window
+        self.max_batch = max_batch
+        self.new_id = new_id or generate_customer_id
+        self.durable = durable
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.registered = 0
+        self.thread = threading.Thread(target=self.run, name='group-commit', daemon=True)
+        self.thread.start()
+
+    def submit(self, name, now=None, customer_id=None, customer_ref=None):
+        """Queue a registration; the Future resolves to (customer_id, daily_sequence, created_at).
+
+        Pass `customer_id` to know the ID before the commit; a clash still draws a new one.
+        `customer_ref` links a repeat visit to the customer's ID. Daily numbers follow
+        submission order.
+        """
+        future = Future()
+        self.queue.put((customer_id or self.new_id(), name, now or datetime.now(), customer_ref, future))
+        return future
+
+    def close(self, timeout=5):
+        """Commit whatever is queued, then stop the writer thread."""
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+    def collect(self, first):
+        batch = [first]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                # Whatever is already queued joins the batch even when the window has passed
+                item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def run(self):
+        conn = self.connect()
+        if self.durable:
+            conn.execute("PRAGMA synchronous = FULL")
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is None:
+                break
+            batch, stopping = self.collect(item)
+            self.commit(conn, batch)
+        conn.close()
+
+    def commit(self, conn, batch):
+        futures = [future for *_, future in batch]
+        try:
+            results = register_batch(conn, [item[:4] for item in batch], new_id=self.new_id)
+        except Exception as e:
+            # Nothing in the batch was committed
+            results = [e] * len(batch)
+        self.batches += 1
+        for future, result in zip(futures, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                self.registered += 1
+                future.set_result(result)
+
+    def stats(self):
+        return {'batches': self.batches, 'registered': self.registered,
+                'average_batch': self.registered / self.batches if self.batches else 0.0}